@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+整轮监控基准测试
+在本地启动替身服务（教务处、图书馆、学工处的公告列表页，招生办的
+ajax_category_article_list 接口，飞书机器人 webhook 和 OneBot HTTP 接口），
+每个替身可以单独设置响应延迟，然后在子进程中运行 qfnu_monitor.main.main()：
+
+- once：每轮启动一个 --once 进程（与 GitHub Actions、cron 相同，含启动开销）
+- daemon：启动一个常驻进程，运行指定轮数后用 Ctrl+C 信号停止
+
+每次抓取列表页时替身会发布 --publish 条新公告，第一轮为初始化（不推送），之后每轮都会
+抓取、解析、比对、写入发件箱并推送。报告每轮耗时的分位数、各阶段平均耗时、
+新公告和通知消息的吞吐，以及子进程的 CPU 时间、内存峰值、线程数和文件描述符数
+
+子进程的抓取请求由 HTTP 中间件改写到替身服务，飞书和 OneBot 通过环境变量指向替身，
+其他推送渠道、订阅规则、群组注册表都被关闭，.env 中的同名配置不会生效，整个过程不访问网络
+
+用法：
+    python -m benchmarks.cycle
+    python -m benchmarks.cycle --mode daemon --cycles 10 --interval 0.5
+    python -m benchmarks.cycle --latency 0.05 --latency zsb=0.3 --latency onebot=0.02
+    python -m benchmarks.cycle --json results.json
+
+    # 默认 OneBot 每秒 5 条的限流会占满推送阶段，只看代码耗时时可以关闭
+    ONEBOT_RATE_LIMIT=0 python -m benchmarks.cycle
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import resource
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 替身名 -> 被替换的主机
+SITE_HOSTS = {
+    "jwc": "jwc.qfnu.edu.cn",
+    "library": "lib.qfnu.edu.cn",
+    "xg": "xg.qfnu.edu.cn",
+    "zsb": "zsb.qfnu.edu.cn",
+}
+STAND_INS = (*SITE_HOSTS, "feishu", "onebot")
+
+# 子进程中替身地址的环境变量（主机 -> 替身地址的 JSON）
+STAND_IN_ENV = "BENCH_STAND_INS"
+
+
+def notice_title(path, number):
+    """替身页面中第 number 条公告的标题"""
+    if path.startswith("/ggxw/"):
+        return f"图书馆公告{number}"
+    if path.startswith("/tzgg"):
+        return f"学工处通知{number}"
+    if path.startswith("/f/"):
+        return f"招生快讯{number}"
+    return f"教务处{path[1:3]}公告{number}"
+
+
+def _list_html(path, first, count, padding):
+    """按页面路径生成与真实网站结构相同的公告列表，编号从大到小"""
+    numbers = range(first + count - 1, first - 1, -1)
+    date = datetime.now()
+    if path.startswith("/ggxw/"):
+        items = "".join(
+            f'<li><a href="info/{n}.htm"><div class="time_con">'
+            f"<h3>{date:%d}</h3><h6>{date:%Y-%m}</h6></div>"
+            f'<h5 class="overfloat-dot">{notice_title(path, n)}</h5></a></li>'
+            for n in numbers
+        )
+        body = f'<ul class="list_box_titu">{items}</ul>'
+    elif path.startswith("/tzgg"):
+        items = "".join(
+            f'<li><a href="info/{n}.htm">{notice_title(path, n)}</a>'
+            f"{date:%Y-%m-%d}</li>"
+            for n in numbers
+        )
+        body = f'<div class="list"><ul>{items}</ul></div>'
+    else:
+        items = "".join(
+            f'<li><h2><a href="info/{n}.htm">{notice_title(path, n)}</a>'
+            f'<span class="time">{date:%Y-%m-%d}</span></h2></li>'
+            for n in numbers
+        )
+        body = f'<ul class="n_listxx1">{items}</ul>'
+    # 真实页面中列表之外的导航、页脚等内容
+    filler = "<div class='nav'><a href='#'>栏目</a></div>" * (padding // 40)
+    return f"<html><body>{filler}{body}{filler}</body></html>"
+
+
+def _zsb_json(path, first, count):
+    now = int(time.time() * 1000)
+    content = [
+        {
+            "id": f"bench{n}",
+            "title": notice_title(path, n),
+            "url": f"/article/{n}",
+            "releaseDate": now,
+            "description": "招生录取工作安排" * 10,
+            "publisher": "招生办",
+            "hits": n,
+            "isNew": True,
+        }
+        for n in range(first + count - 1, first - 1, -1)
+    ]
+    return {"state": 1, "data": [{"contentList": content}]}
+
+
+class StandIn:
+    """一个替身服务：固定延迟后按路径返回内容，并统计请求数"""
+
+    def __init__(self, name, delay, items, publish, padding):
+        self.name = name
+        self.delay = delay
+        self.items = items
+        self.publish = publish
+        self.padding = padding
+        self.requests = 0
+        self._published = {}
+        self._lock = threading.Lock()
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stand_in.handle(self)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.body = self.rfile.read(length)
+                stand_in.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _next_page(self, path):
+        """每次抓取发布 publish 条新公告，返回列表中最早一条的编号"""
+        with self._lock:
+            published = self._published.get(path, self.items - self.publish)
+            published += self.publish
+            self._published[path] = published
+        return published - self.items + 1
+
+    def respond(self, path):
+        """
+        生成响应内容
+
+        Returns:
+            tuple: (Content-Type, 内容, 列表中的公告编号)
+        """
+        if self.name == "feishu":
+            return "application/json", {"code": 0, "msg": "success"}, ()
+        if self.name == "onebot":
+            return (
+                "application/json",
+                {"status": "ok", "retcode": 0, "data": {"message_id": self.requests}},
+                (),
+            )
+        first = self._next_page(path)
+        numbers = range(first, first + self.items)
+        if self.name == "zsb":
+            return "application/json", _zsb_json(path, first, self.items), numbers
+        return (
+            "text/html; charset=utf-8",
+            _list_html(path, first, self.items, self.padding),
+            numbers,
+        )
+
+    @staticmethod
+    def encode(content):
+        if not isinstance(content, str):
+            content = json.dumps(content, ensure_ascii=False)
+        return content.encode("utf-8")
+
+    @staticmethod
+    def send(handler, status, content_type, body):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def handle(self, handler):
+        time.sleep(self.delay)
+        with self._lock:
+            self.requests += 1
+        content_type, content, _ = self.respond(urlsplit(handler.path).path)
+        self.send(handler, 200, content_type, self.encode(content))
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def child(argv):
+    """子进程入口：把网站请求改写到替身服务后运行主程序"""
+    from qfnu_monitor.utils import http
+
+    targets = json.loads(os.environ[STAND_IN_ENV])
+
+    def stand_in(send, method, url, **kwargs):
+        parts = urlsplit(url)
+        target = targets.get(parts.hostname)
+        if target:
+            url = urlunsplit(urlsplit(target)[:2] + parts[2:4] + ("",))
+        return send(method, url, **kwargs)
+
+    http.add_middleware(stand_in)
+
+    from qfnu_monitor.main import main
+
+    return main(argv)
+
+
+class ProcessSampler:
+    """定时读取子进程的内存、线程数和文件描述符数（依赖 /proc，其他系统不采样）"""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.rss = self.threads = self.fds = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(interval,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _sample(self):
+        with open(f"/proc/{self.pid}/status", encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key == "VmRSS":
+                    self.rss = max(self.rss, int(value.split()[0]) * 1024)
+                elif key == "Threads":
+                    self.threads = max(self.threads, int(value))
+        self.fds = max(self.fds, len(os.listdir(f"/proc/{self.pid}/fd")))
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            try:
+                self._sample()
+            except (OSError, ValueError):
+                pass
+            self._stop.wait(interval)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def child_env(stand_ins, workdir, groups):
+    """子进程的环境变量：推送渠道只指向替身服务，关闭其他渠道"""
+    env = dict(os.environ)
+    env.update(
+        {
+            STAND_IN_ENV: json.dumps(
+                {host: stand_ins[name].url for name, host in SITE_HOSTS.items()}
+            ),
+            "PYTHONPATH": os.pathsep.join(
+                filter(None, [PROJECT_ROOT, env.get("PYTHONPATH")])
+            ),
+            "FEISHU_BOT_URL": f"{stand_ins['feishu'].url}/open-apis/bot/v2/hook/bench",
+            "FEISHU_BOT_SECRET": "bench",
+            "ONEBOT_TRANSPORT": "http",
+            "ONEBOT_HTTP_URL": stand_ins["onebot"].url,
+            "ONEBOT_WS_URL": "",
+            "ONEBOT_ACCESS_TOKEN": "",
+            "ONEBOT_TARGET_GROUPS": ",".join(str(100000 + i) for i in range(groups)),
+            "ONEBOT_GROUPS_FILE": os.path.join(workdir, "groups.json"),
+            "NOTIFY_SUBSCRIPTIONS": os.path.join(workdir, "subscriptions.json"),
+            "NOTIFY_WEBHOOK_URL": "",
+            "SMTP_HOST": "",
+            "LOG_DIR": os.path.join(workdir, "logs"),
+            "TRACE_FILE": "",
+            "STAGE_SUMMARY": "0",
+            "METRICS_FILE": os.path.join(workdir, "metrics.prom"),
+        }
+    )
+    return env
+
+
+def _child_command(data_dir, events_file, *extra):
+    return [
+        sys.executable,
+        "-m",
+        "benchmarks.cycle",
+        "--child",
+        "--data-dir",
+        data_dir,
+        "--stage-events",
+        events_file,
+        *extra,
+    ]
+
+
+def _rusage_children():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss * 1024
+
+
+def run_once_mode(args, env, data_dir, events_file):
+    """每轮启动一个 --once 进程，返回 (每个进程的耗时, 资源)"""
+    wall = []
+    sampled = {"rss": 0, "threads": 0, "fds": 0}
+    for _ in range(args.cycles):
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            _child_command(data_dir, events_file, "--once"),
+            env=env,
+            cwd=PROJECT_ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        sampler = ProcessSampler(process.pid)
+        process.wait()
+        sampler.stop()
+        wall.append(time.perf_counter() - start)
+        for key in sampled:
+            sampled[key] = max(sampled[key], getattr(sampler, key))
+    return wall, sampled
+
+
+def _completed_cycles(events_file):
+    """已完成的轮数（每轮最后一个阶段是 cycle/index）"""
+    try:
+        with open(events_file, "r", encoding="utf-8") as f:
+            return sum('"stage": "index"' in line for line in f)
+    except OSError:
+        return 0
+
+
+def run_daemon_mode(args, env, data_dir, events_file):
+    """启动常驻进程，完成指定轮数后停止"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        _child_command(
+            data_dir,
+            events_file,
+            "--interval",
+            str(args.interval),
+            "--metrics-port",
+            "0",
+        ),
+        env=env,
+        cwd=PROJECT_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    sampler = ProcessSampler(process.pid)
+    deadline = time.monotonic() + args.timeout
+    while _completed_cycles(events_file) < args.cycles:
+        if process.poll() is not None or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    sampler.stop()
+    wall = time.perf_counter() - start
+    return [wall], {
+        "rss": sampler.rss,
+        "threads": sampler.threads,
+        "fds": sampler.fds,
+    }
+
+
+def summarize_cycles(events_file):
+    """按轮汇总阶段事件：每轮耗时、新公告数、各阶段耗时"""
+    from qfnu_monitor.stages import load_events
+
+    cycles = {}
+    for event in load_events(events_file):
+        cycle = cycles.setdefault(
+            event.get("cycle", ""),
+            {"start": event["ts"], "end": 0.0, "new": 0, "stages": {}},
+        )
+        cycle["done"] = cycle.get("done") or event["stage"] == "index"
+        cycle["start"] = min(cycle["start"], event["ts"])
+        cycle["end"] = max(cycle["end"], event["ts"] + event["duration"])
+        if event["stage"] == "push":
+            cycle["new"] += event.get("notices", 0)
+        # 各网站同名阶段的耗时相加，cycle 的 dispatch、index 单独一项
+        stage = event["stage"]
+        if stage != "total":
+            cycle["stages"][stage] = cycle["stages"].get(stage, 0.0) + event["duration"]
+    # daemon 模式停止时可能有未完成的一轮
+    return [cycles[key] for key in sorted(cycles) if cycles[key]["done"]]
+
+
+def report(args, cycles, wall, resources, cpu, stand_ins):
+    from qfnu_monitor.stages import percentile
+
+    # 第一轮是初始化，不推送，单独列出
+    warmup, measured = cycles[:1], cycles[1:]
+    latencies = sorted(c["end"] - c["start"] for c in measured)
+    busy = sum(latencies)
+    new_notices = sum(c["new"] for c in measured)
+    pushed = stand_ins["feishu"].requests + stand_ins["onebot"].requests
+
+    result = {
+        "mode": args.mode,
+        "cycles": len(cycles),
+        "latency": {
+            "warmup": (
+                round(warmup[0]["end"] - warmup[0]["start"], 4) if warmup else None
+            ),
+            "p50": round(percentile(latencies, 0.5), 4) if latencies else None,
+            "p90": round(percentile(latencies, 0.9), 4) if latencies else None,
+            "max": round(latencies[-1], 4) if latencies else None,
+        },
+        "stages": {
+            stage: round(
+                sum(c["stages"].get(stage, 0.0) for c in measured)
+                / max(len(measured), 1),
+                4,
+            )
+            for stage in sorted({s for c in measured for s in c["stages"]})
+        },
+        "new_notices": new_notices,
+        "notices_per_second": round(new_notices / busy, 1) if busy else None,
+        "requests": {name: stand_ins[name].requests for name in STAND_INS},
+        "messages_per_second": round(pushed / busy, 1) if busy else None,
+        "process_seconds": [round(w, 3) for w in wall],
+        "cpu_seconds": round(cpu, 3),
+        "cpu_per_cycle": round(cpu / len(cycles), 4) if cycles else None,
+        "peak_rss_mb": round(resources["rss"] / 1024 / 1024, 1),
+        "max_threads": resources["threads"],
+        "max_fds": resources["fds"],
+    }
+
+    latency = result["latency"]
+    print(f"模式: {args.mode}，完成 {len(cycles)} 轮（第一轮为初始化）")
+    if latencies:
+        print(
+            f"每轮耗时: p50 {latency['p50'] * 1000:.1f}ms，p90 {latency['p90'] * 1000:.1f}ms，"
+            f"最大 {latency['max'] * 1000:.1f}ms（初始化 {latency['warmup'] * 1000:.1f}ms）"
+        )
+    if args.mode == "once" and wall:
+        print(
+            f"进程耗时（含启动）: 平均 {sum(wall) / len(wall) * 1000:.1f}ms，"
+            f"最大 {max(wall) * 1000:.1f}ms"
+        )
+    if result["stages"]:
+        print(
+            "各阶段平均耗时: "
+            + "，".join(f"{k} {v * 1000:.1f}ms" for k, v in result["stages"].items())
+        )
+    print(
+        f"吞吐: 新公告 {new_notices} 条（{result['notices_per_second']} 条/秒），"
+        f"通知请求 {pushed} 次（{result['messages_per_second']} 次/秒）"
+    )
+    print("替身请求数: " + "，".join(f"{k} {v}" for k, v in result["requests"].items()))
+    print(
+        f"资源: CPU {result['cpu_seconds']}秒（每轮 {result['cpu_per_cycle']}秒），"
+        f"内存峰值 {result['peak_rss_mb']}MB，线程最多 {result['max_threads']} 个，"
+        f"文件描述符最多 {result['max_fds']} 个"
+    )
+    return result
+
+
+def _parse_latency(values):
+    """解析 --latency：SECONDS 为全部替身的默认值，NAME=SECONDS 为单个替身"""
+    latency = dict.fromkeys(STAND_INS, 0.0)
+    for value in values:
+        name, _, seconds = value.rpartition("=")
+        names = [name] if name else STAND_INS
+        for item in names:
+            if item not in latency:
+                raise argparse.ArgumentTypeError(f"未知的替身: {item}")
+            latency[item] = float(seconds)
+    return latency
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--child"]:
+        return child(argv[1:])
+
+    parser = argparse.ArgumentParser(description="整轮监控基准测试")
+    parser.add_argument("--mode", choices=("once", "daemon"), default="once")
+    parser.add_argument("--cycles", type=int, default=5, help="运行轮数（含初始化）")
+    parser.add_argument(
+        "--interval", type=float, default=0.5, help="daemon 模式的监控间隔（秒）"
+    )
+    parser.add_argument(
+        "--latency",
+        action="append",
+        default=[],
+        metavar="[NAME=]SECONDS",
+        help=f"替身的响应延迟，NAME 为 {'/'.join(STAND_INS)}，省略时设置全部，可重复",
+    )
+    parser.add_argument("--items", type=int, default=20, help="每个列表的公告数")
+    parser.add_argument("--publish", type=int, default=2, help="每次抓取新发布的公告数")
+    parser.add_argument(
+        "--padding", type=int, default=30000, help="列表页中公告之外内容的字节数"
+    )
+    parser.add_argument("--groups", type=int, default=3, help="OneBot 目标群数量")
+    parser.add_argument(
+        "--timeout", type=float, default=600, help="daemon 模式最长运行秒数"
+    )
+    parser.add_argument("--json", help="结果另存为 JSON 文件")
+    parser.add_argument("--keep", action="store_true", help="保留临时目录")
+    args = parser.parse_args(argv)
+    try:
+        latency = _parse_latency(args.latency)
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+
+    workdir = tempfile.mkdtemp(prefix="qfnu-cycle-")
+    data_dir = os.path.join(workdir, "data")
+    events_file = os.path.join(workdir, "stages.jsonl")
+    stand_ins = {
+        name: StandIn(name, latency[name], args.items, args.publish, args.padding)
+        for name in STAND_INS
+    }
+    try:
+        env = child_env(stand_ins, workdir, args.groups)
+        cpu_before, _ = _rusage_children()
+        run = run_once_mode if args.mode == "once" else run_daemon_mode
+        wall, resources = run(args, env, data_dir, events_file)
+        cpu_after, maxrss = _rusage_children()
+        # 没有 /proc 时用 getrusage 的内存峰值
+        resources["rss"] = resources["rss"] or maxrss
+
+        cycles = summarize_cycles(events_file) if os.path.exists(events_file) else []
+        if not cycles:
+            print(f"没有完成任何一轮，日志见 {os.path.join(workdir, 'logs')}")
+            args.keep = True
+            return 1
+        result = report(
+            args, cycles, wall, resources, cpu_after - cpu_before, stand_ins
+        )
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+        return 0
+    finally:
+        for stand_in in stand_ins.values():
+            stand_in.close()
+        if args.keep:
+            print(f"临时目录: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+故障注入测试
+在整轮监控基准（benchmarks.cycle）的替身服务上按概率注入故障，检查抓取和推送路径在
+故障下是否仍然按时完成、状态是否保持正确：
+
+- timeout：超过 HTTP_TIMEOUT 才响应
+- reset：直接重置连接（RST）
+- slow：响应体逐段缓慢发送，每段间隔小于读取超时，但总时长超过 HTTP_DEADLINE
+- 5xx：返回 502 / 503 错误页
+- truncated：页面或 JSON 在中途截断（Content-Length 与截断后的长度一致）
+- malformed：列表页为没有公告列表的维护页，招生办接口为结构错误的 JSON，
+  飞书和 OneBot 返回 HTML
+
+测试分三个阶段，每轮启动一个 --once 进程：
+1. 初始化一轮，再无故障运行 --cycles 轮作为基线
+2. 注入故障运行 --cycles 轮
+3. 关闭故障运行一轮，并推送发件箱中全部待重试的通知
+
+然后检查：
+- 每一轮都完成，耗时不超过基线最大值加上本轮故障数 × 单次故障的上限
+  （抓取为 HTTP_DEADLINE，推送为 NOTIFY_TIMEOUT）
+- 每个网站保存和归档的公告恰好是替身成功返回过的公告：没有遗漏、没有重复、
+  没有被截断的标题
+- 初始化之后发布的每条公告都送达了飞书和每个 OneBot 群
+
+用法：
+    python -m benchmarks.faults
+    python -m benchmarks.faults --rate 0.3 --cycles 8 --seed 7
+    python -m benchmarks.faults --kinds reset,5xx,truncated --notify-kinds 5xx
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+from benchmarks.cycle import (
+    STAND_INS,
+    StandIn,
+    _child_command,
+    child_env,
+    notice_title,
+    summarize_cycles,
+)
+
+KINDS = ("timeout", "reset", "slow", "5xx", "truncated", "malformed")
+# 推送的客户端超时为 10 秒，timeout 故障默认只注入抓取路径
+NOTIFY_KINDS = ("reset", "slow", "5xx", "truncated", "malformed")
+
+# 替身页面路径 -> 网站标识
+SITE_PATHS = {
+    "/gg_j_.htm": "jwc_gg",
+    "/tz_j_.htm": "jwc_tz",
+    "/ggxw/gg.htm": "library",
+    "/tzgg1.htm": "xg_tzgg",
+    "/f/newsCenter/ajax_category_article_list": "zsb_zskx",
+}
+
+# 子进程使用的超时（秒）
+HTTP_TIMEOUT = 1.0
+HTTP_DEADLINE = 2.0
+NOTIFY_TIMEOUT = 5.0
+
+
+class FaultPlan:
+    """按概率为每个请求选择故障（固定随机种子，可复现）"""
+
+    def __init__(self, rate, kinds, notify_kinds, seed):
+        self.rate = 0.0
+        self.configured_rate = rate
+        self.kinds = kinds
+        self.notify_kinds = notify_kinds
+        self.injected = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.rate = self.configured_rate if enabled else 0.0
+
+    def pick(self, stand_in):
+        kinds = self.notify_kinds if stand_in in ("feishu", "onebot") else self.kinds
+        with self._lock:
+            if not kinds or self._random.random() >= self.rate:
+                return None
+            kind = self._random.choice(kinds)
+            self.injected.append((stand_in, kind))
+            return kind
+
+    def take(self):
+        """取出并清空已注入的故障"""
+        with self._lock:
+            injected, self.injected = self.injected, []
+        return injected
+
+
+class FaultyStandIn(StandIn):
+    """按故障计划响应的替身，记录成功返回的公告和成功接收的通知"""
+
+    def __init__(self, name, plan, *args):
+        super().__init__(name, *args)
+        self.plan = plan
+        # 页面路径 -> 成功返回过的公告编号
+        self.served = {}
+        # 成功接收的通知请求体（JSON 解码后重新编码，中文不转义）
+        self.received = []
+        # 故障会让连接异常关闭，不输出服务端的异常信息
+        self.server.handle_error = lambda request, client_address: None
+
+    def handle(self, handler):
+        time.sleep(self.delay)
+        with self._lock:
+            self.requests += 1
+        path = urlsplit(handler.path).path
+        kind = self.plan.pick(self.name)
+        content_type, content, numbers = self.respond(path)
+        body = self.encode(content)
+
+        if kind == "timeout":
+            # 客户端已经放弃，响应不算成功返回
+            time.sleep(HTTP_TIMEOUT + 0.5)
+            self.send(handler, 200, content_type, body)
+            return
+        if kind == "reset":
+            handler.connection.setsockopt(
+                socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+            )
+            handler.close_connection = True
+            handler.connection.close()
+            return
+        elif kind == "5xx":
+            page = b"<html><body><h1>502 Bad Gateway</h1></body></html>"
+            self.send(handler, 502, "text/html", page)
+            return
+        elif kind == "truncated":
+            self.send(handler, 200, content_type, body[: len(body) // 2])
+            return
+        elif kind == "malformed":
+            self.send(handler, 200, *self._malformed(content_type))
+            return
+        elif kind == "slow":
+            self._send_slowly(handler, content_type, body)
+            # 推送的客户端没有总时长限制，缓慢但完整的响应仍然算作送达
+            if self.name not in ("feishu", "onebot"):
+                return
+
+        else:
+            self.send(handler, 200, content_type, body)
+        with self._lock:
+            self.served.setdefault(path, set()).update(numbers)
+            if getattr(handler, "body", None):
+                self.received.append(self._decode(handler.body))
+
+    def _malformed(self, content_type):
+        if self.name == "zsb":
+            return content_type, b'{"state": 1, "data": {"contentList": "error"}}'
+        page = "<html><body><p>系统维护中，请稍后访问</p></body></html>"
+        return "text/html; charset=utf-8", page.encode("utf-8")
+
+    def _send_slowly(self, handler, content_type, body):
+        """分 8 段发送，总时长为 2 × HTTP_DEADLINE"""
+        pieces = 8
+        gap = HTTP_DEADLINE * 2 / pieces
+        size = -(-len(body) // pieces)
+        handler.send_response(200)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        try:
+            for start in range(0, len(body), size):
+                handler.wfile.write(body[start : start + size])
+                handler.wfile.flush()
+                time.sleep(gap)
+        except OSError:
+            handler.close_connection = True
+
+    @staticmethod
+    def _decode(body):
+        try:
+            return json.dumps(json.loads(body), ensure_ascii=False)
+        except ValueError:
+            return body.decode("utf-8", "replace")
+
+
+def run_cycle(env, data_dir, events_file):
+    process = subprocess.run(
+        _child_command(data_dir, events_file, "--once"),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return process.returncode
+
+
+def flush_outbox(env, data_dir):
+    """忽略重试等待，推送发件箱中的全部通知，返回仍待推送的事件数"""
+    from qfnu_monitor.utils.outbox import Outbox
+
+    for _ in range(3):
+        subprocess.run(
+            [sys.executable, "-m", "qfnu_monitor.dispatch", "--data-dir", data_dir]
+            + ["--all"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        pending = len(Outbox(data_dir).pending())
+        if not pending:
+            break
+    return pending
+
+
+def check_state(data_dir, stand_ins):
+    """
+    检查各网站保存和归档的公告
+
+    Returns:
+        tuple: (错误列表, 初始化后发布的公告标题)
+    """
+    from qfnu_monitor.main import load_monitor
+
+    errors = []
+    new_titles = []
+    for name in ("jwc", "library", "xg", "zsb"):
+        stand_in = stand_ins[name]
+        for path, numbers in stand_in.served.items():
+            site = SITE_PATHS[path]
+            monitor = load_monitor(site)(data_dir=data_dir)
+            notices = monitor.load_saved_notices() + monitor.archive.load()
+            titles = [notice["title"] for notice in notices]
+            expected = {notice_title(path, n) for n in numbers}
+
+            duplicates = {t for t in titles if titles.count(t) > 1}
+            unknown = set(titles) - expected
+            missing = expected - set(titles)
+            if duplicates:
+                errors.append(f"{site} 有重复的公告: {sorted(duplicates)[:5]}")
+            if unknown:
+                errors.append(f"{site} 有未发布或被截断的公告: {sorted(unknown)[:5]}")
+            if missing:
+                errors.append(f"{site} 遗漏了公告: {sorted(missing)[:5]}")
+
+            first = min(numbers) + stand_in.items
+            new_titles += [notice_title(path, n) for n in numbers if n >= first]
+    return errors, new_titles
+
+
+def check_deliveries(new_titles, stand_ins, groups):
+    """检查初始化后的每条公告是否送达飞书和每个 OneBot 群，返回 (错误, 重复送达数)"""
+    errors = []
+    duplicates = 0
+    targets = {"飞书": stand_ins["feishu"].received}
+    for group in groups:
+        targets[f"OneBot 群{group}"] = [
+            body for body in stand_ins["onebot"].received if f'"{group}"' in body
+        ]
+    for target, bodies in targets.items():
+        missing = []
+        for title in new_titles:
+            pattern = re.compile(re.escape(title) + r"(?!\d)")
+            count = sum(bool(pattern.search(body)) for body in bodies)
+            if not count:
+                missing.append(title)
+            duplicates += max(0, count - 1)
+        if missing:
+            errors.append(f"{target} 未收到: {missing[:5]}（共 {len(missing)} 条）")
+    return errors, duplicates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="抓取和推送路径的故障注入测试")
+    parser.add_argument(
+        "--cycles", type=int, default=5, help="基线和故障阶段各运行的轮数"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=0.25, help="每个请求注入故障的概率"
+    )
+    parser.add_argument(
+        "--kinds", default=",".join(KINDS), help="抓取路径的故障类型，逗号分隔"
+    )
+    parser.add_argument(
+        "--notify-kinds",
+        default=",".join(NOTIFY_KINDS),
+        help="推送路径的故障类型，逗号分隔，空字符串表示不注入",
+    )
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    parser.add_argument("--groups", type=int, default=2, help="OneBot 目标群数量")
+    parser.add_argument("--keep", action="store_true", help="保留临时目录")
+    args = parser.parse_args(argv)
+
+    kinds = [k for k in args.kinds.split(",") if k]
+    notify_kinds = [k for k in args.notify_kinds.split(",") if k]
+    unknown = set(kinds + notify_kinds) - set(KINDS)
+    if unknown:
+        parser.error(f"未知的故障类型: {','.join(sorted(unknown))}")
+
+    plan = FaultPlan(args.rate, kinds, notify_kinds, args.seed)
+    stand_ins = {
+        name: FaultyStandIn(name, plan, 0.0, 20, 2, 5000) for name in STAND_INS
+    }
+    workdir = tempfile.mkdtemp(prefix="qfnu-faults-")
+    data_dir = os.path.join(workdir, "data")
+    events_file = os.path.join(workdir, "stages.jsonl")
+    env = child_env(stand_ins, workdir, args.groups)
+    env.update(
+        HTTP_TIMEOUT=str(HTTP_TIMEOUT),
+        HTTP_DEADLINE=str(HTTP_DEADLINE),
+        NOTIFY_TIMEOUT=str(NOTIFY_TIMEOUT),
+        ONEBOT_RATE_LIMIT="0",
+    )
+    groups = env["ONEBOT_TARGET_GROUPS"].split(",")
+
+    errors = []
+    faults_per_cycle = []
+    try:
+        for phase, count in (("基线", args.cycles + 1), ("故障", args.cycles)):
+            plan.enable(phase == "故障")
+            for _ in range(count):
+                code = run_cycle(env, data_dir, events_file)
+                faults_per_cycle.append(plan.take())
+                if code:
+                    errors.append(f"{phase}阶段的进程退出码为 {code}")
+        plan.enable(False)
+        run_cycle(env, data_dir, events_file)
+        faults_per_cycle.append([])
+        pending = flush_outbox(env, data_dir)
+        if pending:
+            errors.append(f"关闭故障后仍有 {pending} 个事件未推送")
+
+        cycles = summarize_cycles(events_file)
+        if len(cycles) != len(faults_per_cycle):
+            errors.append(f"只完成了 {len(cycles)}/{len(faults_per_cycle)} 轮")
+        latencies = [c["end"] - c["start"] for c in cycles]
+        baseline = latencies[1 : args.cycles + 1]
+        faulty = latencies[args.cycles + 1 : 2 * args.cycles + 1]
+        faulty_faults = faults_per_cycle[args.cycles + 1 : 2 * args.cycles + 1]
+        budget_base = max(baseline, default=0.0)
+        for index, (latency, injected) in enumerate(zip(faulty, faulty_faults), 1):
+            fetch_faults = sum(s not in ("feishu", "onebot") for s, _ in injected)
+            notify_faults = len(injected) - fetch_faults
+            budget = (
+                budget_base
+                + fetch_faults * (HTTP_DEADLINE + 0.5)
+                + (NOTIFY_TIMEOUT + 0.5 if notify_faults else 0.0)
+                + 1.0
+            )
+            if latency > budget:
+                errors.append(
+                    f"故障阶段第 {index} 轮耗时 {latency:.2f} 秒，超过上限 {budget:.2f} 秒"
+                )
+
+        state_errors, new_titles = check_state(data_dir, stand_ins)
+        delivery_errors, duplicates = check_deliveries(new_titles, stand_ins, groups)
+        errors += state_errors + delivery_errors
+
+        injected = [fault for cycle in faults_per_cycle for fault in cycle]
+        counts = {}
+        for stand_in, kind in injected:
+            counts[f"{stand_in}/{kind}"] = counts.get(f"{stand_in}/{kind}", 0) + 1
+        print(
+            f"注入故障 {len(injected)} 次: "
+            + "，".join(f"{key} {value}" for key, value in sorted(counts.items()))
+        )
+        if baseline and faulty:
+            print(
+                f"每轮耗时: 基线平均 {sum(baseline) / len(baseline):.2f} 秒，"
+                f"故障平均 {sum(faulty) / len(faulty):.2f} 秒，最大 {max(faulty):.2f} 秒"
+            )
+        print(
+            f"初始化后发布 {len(new_titles)} 条公告，重复送达 {duplicates} 次"
+            "（推送超时后重试可能重复）"
+        )
+        if errors:
+            print("失败:")
+            for error in errors:
+                print(f"    {error}")
+            return 1
+        print("通过: 每轮按时完成，公告记录完整且没有重复，所有新公告均已送达")
+        return 0
+    finally:
+        for stand_in in stand_ins.values():
+            stand_in.close()
+        if args.keep or errors:
+            print(f"临时目录: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
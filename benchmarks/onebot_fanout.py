@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OneBot 群发基准测试
+每个账号启动一个本地模拟服务（examples/onebot_mock_server.py，独立进程），
+用投递引擎向大量群组发送一条消息，对比实际吞吐与速率上限；
+--compare 时再用原来的 send_to_specific_groups（单账号线程池）发送一次
+
+用法：
+    python -m benchmarks.onebot_fanout
+    python -m benchmarks.onebot_fanout --groups 5000 --accounts 2 --rate 250 --global-rate 400
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MOCK_SERVER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "examples",
+    "onebot_mock_server.py",
+)
+
+
+def start_mock(port, delay):
+    process = subprocess.Popen(
+        [sys.executable, MOCK_SERVER, "--port", str(port), "--delay", str(delay)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OneBot 群发基准测试")
+    parser.add_argument("--groups", type=int, default=5000, help="群组数量")
+    parser.add_argument("--accounts", type=int, default=2, help="机器人账号数量")
+    parser.add_argument("--rate", type=float, default=250, help="每个账号每秒条数")
+    parser.add_argument(
+        "--global-rate", type=float, default=400, help="全局每秒条数，0 表示不限"
+    )
+    parser.add_argument("--workers", type=int, default=16, help="每个账号的分片数")
+    parser.add_argument("--delay", type=float, default=0.02, help="模拟服务的响应延迟")
+    parser.add_argument("--port", type=int, default=5790, help="第一个模拟服务的端口")
+    parser.add_argument(
+        "--compare", action="store_true", help="同时测试原来的单账号线程池发送"
+    )
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="onebot-fanout-")
+    ports = [args.port + i for i in range(args.accounts)]
+    accounts = {
+        f"bot{i}": {
+            "http_url": f"http://127.0.0.1:{port}",
+            "rate_limit": args.rate,
+            "max_workers": args.workers,
+        }
+        for i, port in enumerate(ports[1:], 2)
+    }
+    names = ["default", *accounts]
+    groups = {
+        str(100000 + i): (
+            {}
+            if names[i % len(names)] == "default"
+            else {"account": names[i % len(names)]}
+        )
+        for i in range(args.groups)
+    }
+    registry_file = os.path.join(workdir, "groups.json")
+    with open(registry_file, "w", encoding="utf-8") as f:
+        json.dump({"accounts": accounts, "groups": groups}, f)
+
+    os.environ.update(
+        ONEBOT_HTTP_URL=f"http://127.0.0.1:{ports[0]}",
+        ONEBOT_RATE_LIMIT=str(args.rate),
+        ONEBOT_MAX_WORKERS=str(args.workers),
+        ONEBOT_GLOBAL_RATE_LIMIT=str(args.global_rate),
+        ONEBOT_GROUPS_FILE=registry_file,
+        ONEBOT_TARGET_GROUPS="",
+    )
+    logging.basicConfig(level=logging.WARNING, force=True)
+
+    from qfnu_monitor.utils.delivery import DeliveryEngine
+    from qfnu_monitor.utils.onebot import OneBotSender
+
+    mocks = [start_mock(port, args.delay) for port in ports]
+    try:
+        time.sleep(1)
+        engine = DeliveryEngine()
+        ceiling = engine.capacity(names)
+        jobs = {group_id: [("bench", "基准测试消息")] for group_id in groups}
+        delivered = []
+        stats = engine.deliver(jobs, delivered.append)
+        print(
+            f"群组数: {args.groups}，账号数: {args.accounts}，速率上限: {ceiling:g} 条/秒"
+        )
+        print(
+            f"投递引擎: {stats['sent']}/{stats['messages']} 条，耗时 {stats['elapsed']} 秒，"
+            f"{stats['throughput']} 条/秒（上限的 {stats['throughput'] / ceiling:.0%}）"
+            if ceiling
+            else f"投递引擎: {stats['sent']} 条，{stats['throughput']} 条/秒"
+        )
+        for account, account_stats in stats["accounts"].items():
+            print(f"    {account}: {account_stats['sent']} 条")
+
+        if args.compare:
+            sender = OneBotSender()
+            start = time.perf_counter()
+            summary = sender.send_to_specific_groups(list(groups), "基准测试消息")
+            elapsed = time.perf_counter() - start
+            print(
+                f"单账号线程池: {summary['success_count']}/{args.groups} 条，"
+                f"耗时 {elapsed:.3f} 秒，{summary['success_count'] / elapsed:.1f} 条/秒"
+            )
+    finally:
+        for mock in mocks:
+            mock.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+消息渲染基准测试
+对比逐条 += 拼接（原监控器中的写法）与编译后的消息模板渲染一批公告的耗时
+
+用法：
+    python -m benchmarks.render_messages
+    python -m benchmarks.render_messages --sizes 100 500 2000 --repeat 20
+"""
+
+import argparse
+import timeit
+from qfnu_monitor.utils.message import (
+    Section,
+    render_card_elements,
+    render_post,
+    render_segments,
+    render_text,
+)
+
+CONTEXT = {"site_name": "曲师大招生办招生快讯", "noun": "公告"}
+
+
+def make_notices(count):
+    """生成测试公告，字段与招生快讯一致"""
+    return [
+        {
+            "id": str(i),
+            "title": f"关于2024年第{i}批次招生录取工作的通知",
+            "date": "2024-06-30",
+            "link": f"https://zsb.qfnu.edu.cn/article/{i}",
+            "publisher": "招生办" if i % 2 else "",
+            "hits": i * 7,
+            "is_new": i % 5 == 0,
+            "description": "根据教育部和山东省教育招生考试院有关文件精神" * 5,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def legacy_feishu(notices):
+    """原 qfnu_zsb_zskx.format_feishu_message 的写法"""
+    title = f"📢 {CONTEXT['site_name']}有{len(notices)}条新公告"
+    content = ""
+
+    for i, notice in enumerate(notices, 1):
+        content += f"【{i}】{notice['title']}\n"
+        content += f"📅 发布时间：{notice['date']}\n"
+        if notice.get("publisher"):
+            content += f"👤 发布者：{notice['publisher']}\n"
+        if notice.get("hits"):
+            content += f"👁️ 浏览量：{notice['hits']}\n"
+        if notice.get("is_new"):
+            content += f"🆕 最新公告\n"
+        if notice.get("description"):
+            desc = (
+                notice["description"][:100] + "..."
+                if len(notice["description"]) > 100
+                else notice["description"]
+            )
+            content += f"📝 简介：{desc}\n"
+        content += f"🔗 链接：{notice['link']}\n\n"
+
+    return title, content
+
+
+def legacy_onebot(notices):
+    """原 qfnu_zsb_zskx.format_onebot_message 的写法"""
+    message = f"📢 {CONTEXT['site_name']}有{len(notices)}条新公告\n\n"
+
+    for i, notice in enumerate(notices, 1):
+        message += f"【{i}】{notice['title']}\n"
+        message += f"📅 发布时间：{notice['date']}\n"
+        if notice.get("publisher"):
+            message += f"👤 发布者：{notice['publisher']}\n"
+        if notice.get("hits"):
+            message += f"👁️ 浏览量：{notice['hits']}\n"
+        if notice.get("is_new"):
+            message += f"🆕 最新公告\n"
+        if notice.get("description"):
+            desc = (
+                notice["description"][:80] + "..."
+                if len(notice["description"]) > 80
+                else notice["description"]
+            )
+            message += f"📝 简介：{desc}\n"
+        message += f"🔗 {notice['link']}\n\n"
+
+    return message
+
+
+def main():
+    parser = argparse.ArgumentParser(description="消息渲染基准测试")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[100, 500, 1000, 5000],
+        help="每批公告数量",
+    )
+    parser.add_argument("--repeat", type=int, default=10, help="每项重复次数")
+    args = parser.parse_args()
+
+    print(f"{'公告数':>6}  {'渲染方式':<24}{'耗时(ms)':>10}")
+    for size in args.sizes:
+        notices = make_notices(size)
+        sections = [Section("detailed", CONTEXT, notices)]
+
+        # 两种写法的输出必须一致
+        assert legacy_feishu(notices) == render_post(sections, "feishu")
+        assert legacy_onebot(notices) == render_text(sections, "onebot")
+
+        cases = [
+            ("+= 拼接（飞书）", lambda: legacy_feishu(notices)),
+            ("模板 post（飞书）", lambda: render_post(sections, "feishu")),
+            ("模板 card（飞书）", lambda: render_card_elements(sections, "feishu")),
+            ("+= 拼接（OneBot）", lambda: legacy_onebot(notices)),
+            ("模板 text（OneBot）", lambda: render_text(sections, "onebot")),
+            ("模板 segments（OneBot）", lambda: render_segments(sections, "onebot")),
+        ]
+        # 小批量时每次计时连续渲染多遍，减少计时误差
+        number = max(1, 2000 // size)
+        for name, func in cases:
+            best = min(timeit.repeat(func, number=number, repeat=args.repeat)) / number
+            print(f"{size:>6}  {name:<24}{best * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+订阅匹配基准测试
+对比逐条规则用 in 查找关键词与 Aho-Corasick 自动机一次扫描，
+匹配一批公告标题的耗时随规则数量的变化
+
+用法：
+    python -m benchmarks.route_subscriptions
+    python -m benchmarks.route_subscriptions --rules 10 100 1000 --notices 500
+"""
+
+import argparse
+import random
+import timeit
+from qfnu_monitor.utils.subscriptions import AhoCorasick
+
+WORDS = "考试 成绩 招生 选课 补考 转专业 奖学金 讲座 毕业 实习 竞赛 报名 教材 宿舍 体测".split()
+
+
+def make_rules(count, rng):
+    """每条规则 3 个关键词，关键词由常见词和随机后缀组成，模拟大量不同的订阅"""
+    return [
+        [f"{rng.choice(WORDS)}{rng.randrange(count)}" for _ in range(3)]
+        for _ in range(count)
+    ]
+
+
+def make_titles(count, rng):
+    return [
+        f"关于{rng.choice(WORDS)}{rng.randrange(1000)}工作的通知（第{i}期）"
+        for i in range(count)
+    ]
+
+
+def naive_match(rules, titles):
+    """逐条规则、逐个关键词查找"""
+    return [
+        [i for i, keywords in enumerate(rules) if any(k in title for k in keywords)]
+        for title in titles
+    ]
+
+
+def automaton_match(automaton, word_rules, titles):
+    """自动机扫描一次标题，再由命中的关键词找到规则"""
+    matched = []
+    for title in titles:
+        rules = set()
+        for index in automaton.search(title):
+            rules.update(word_rules[index])
+        matched.append(sorted(rules))
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="订阅匹配基准测试")
+    parser.add_argument(
+        "--rules", type=int, nargs="+", default=[10, 100, 1000, 5000], help="规则数量"
+    )
+    parser.add_argument("--notices", type=int, default=200, help="每批公告数量")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    titles = make_titles(args.notices, rng)
+    print(f"{'规则数':>6}  {'逐条查找(ms)':>14}{'自动机(ms)':>12}{'构建(ms)':>10}")
+    for count in args.rules:
+        rules = make_rules(count, rng)
+        word_rules = {}
+        for i, keywords in enumerate(rules):
+            for keyword in keywords:
+                word_rules.setdefault(keyword, []).append(i)
+        start = timeit.default_timer()
+        automaton = AhoCorasick(word_rules)
+        build = timeit.default_timer() - start
+        word_rules = list(word_rules.values())
+
+        # 两种方式的结果必须一致
+        assert naive_match(rules, titles) == automaton_match(
+            automaton, word_rules, titles
+        )
+
+        naive = min(
+            timeit.repeat(
+                lambda: naive_match(rules, titles), number=1, repeat=args.repeat
+            )
+        )
+        scan = min(
+            timeit.repeat(
+                lambda: automaton_match(automaton, word_rules, titles),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print(
+            f"{count:>6}  {naive * 1000:>14.2f}{scan * 1000:>12.2f}{build * 1000:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
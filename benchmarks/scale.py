@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+网站数量扩展测试
+生成 N 个合成网站（沿用教务处公告监控器，只替换地址、网站标识和数据文件），
+由本地桩服务提供列表页，在一个进程中按 main.run_cycle 串行检查若干轮，
+观察每轮耗时、内存、文件描述符、线程数和数据文件数随 N 的增长
+
+- 每个 N 在独立的子进程中运行，互不影响内存统计
+- --publish-rate 为每个网站每轮发布新公告的概率（按网站错开，结果可复现），
+  第一轮为初始化，之后每轮约有 N × rate 个网站有新公告
+- 默认不配置推送渠道（有新公告时不写入发件箱）；--notify 时 OneBot 指向桩服务且不限流，
+  推送阶段的耗时随之计入
+- 所有合成网站在同一主机上，共用一个连接池
+
+用法：
+    python -m benchmarks.scale
+    python -m benchmarks.scale --sites 50 100 200 400 --cycles 4 --publish-rate 0.2
+    python -m benchmarks.scale --sites 100 --latency 0.05 --notify --json scale.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import resource
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 黄金分割比，用于错开各网站发布公告的轮次
+PHASE = 0.6180339887
+
+
+class StubServer:
+    """合成网站的列表页：/site0001/list.htm，每次抓取按发布率决定是否发布新公告"""
+
+    def __init__(self, delay, items, rate, padding):
+        self.delay = delay
+        self.items = items
+        self.rate = rate
+        self.filler = "<div class='nav'><a href='#'>栏目</a></div>" * (padding // 40)
+        self.requests = 0
+        self._fetches = {}
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stub.handle(self, stub.list_page(self.path))
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.handle(self, '{"status": "ok", "retcode": 0, "data": {}}')
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def list_page(self, path):
+        site = path.strip("/").split("/")[0]
+        with self._lock:
+            fetches = self._fetches.get(site, 0) + 1
+            self._fetches[site] = fetches
+        # 第 k 次抓取时累计发布 floor(k × rate + 相位) 条
+        index = int(site[4:] or 0)
+        latest = self.items + int(fetches * self.rate + (index * PHASE) % 1)
+        items = "".join(
+            f'<li><h2><a href="info/{n}.htm">{site}公告{n}</a>'
+            f'<span class="time">2026-01-01</span></h2></li>'
+            for n in range(latest, latest - self.items, -1)
+        )
+        return (
+            f"<html><body>{self.filler}<ul class='n_listxx1'>{items}</ul>"
+            f"{self.filler}</body></html>"
+        )
+
+    def handle(self, handler, content):
+        time.sleep(self.delay)
+        with self._lock:
+            self.requests += 1
+        body = content.encode("utf-8")
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def synthetic_monitors(count, base_url):
+    """
+    生成合成网站的监控器
+
+    Args:
+        count (int): 网站数量
+        base_url (str): 桩服务地址
+
+    Returns:
+        dict: 网站标识 -> 监控器类，与 main.MONITORS 相同
+    """
+    from qfnu_monitor.core.qfnu_jwc_gg import QFNUJWCGGMonitor
+    from qfnu_monitor.utils.archive import ShardedArchive
+
+    def make(site_key):
+        class SyntheticMonitor(QFNUJWCGGMonitor):
+            def __init__(self, data_dir="data"):
+                super().__init__(data_dir)
+                self.site_key = site_key
+                self.url = f"{base_url}/{site_key}/list.htm"
+                self.base_url = f"{base_url}/{site_key}/"
+                self.data_file = os.path.join(self.data_dir, f"{site_key}_notices.json")
+                self.archive = ShardedArchive(self.archive_dir, site_key)
+
+        SyntheticMonitor.__name__ = f"SyntheticMonitor_{site_key}"
+        return SyntheticMonitor
+
+    return {f"site{i:04d}": make(f"site{i:04d}") for i in range(1, count + 1)}
+
+
+def _process_status():
+    """当前进程的内存（字节）和文件描述符数，没有 /proc 时为 None"""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            rss = next(
+                int(line.split()[1]) * 1024 for line in f if line.startswith("VmRSS:")
+            )
+        return rss, len(os.listdir("/proc/self/fd"))
+    except (OSError, StopIteration):
+        return None, None
+
+
+def child(args):
+    """子进程：检查 N 个合成网站若干轮，把每轮的测量结果以 JSON 写到标准输出"""
+    from qfnu_monitor import main as monitor_main
+    from qfnu_monitor.utils import instrument
+
+    monitor_main.MONITORS = synthetic_monitors(args.sites[0], args.stub_url)
+
+    stages = {}
+    instrument.configure(events="", summary=False)
+    instrument.add_sink(
+        lambda event: stages.__setitem__(
+            event["stage"], stages.get(event["stage"], 0.0) + event["duration"]
+        )
+    )
+
+    data_dir = os.path.join(args.workdir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    cycles = []
+    for _ in range(args.cycles):
+        stages.clear()
+        start = time.perf_counter()
+        cpu = time.process_time()
+        monitor_main.run_cycle(data_dir)
+        rss, fds = _process_status()
+        files = sum(len(names) for _, _, names in os.walk(data_dir))
+        cycles.append(
+            {
+                "seconds": round(time.perf_counter() - start, 4),
+                "cpu": round(time.process_time() - cpu, 4),
+                "rss": rss,
+                "fds": fds,
+                "threads": threading.active_count(),
+                "files": files,
+                "stages": {k: round(v, 4) for k, v in stages.items() if k != "total"},
+            }
+        )
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        *(c["rss"] or 0 for c in cycles),
+    )
+    print(json.dumps({"sites": args.sites[0], "cycles": cycles, "peak_rss": peak}))
+    return 0
+
+
+def run_child(args, sites, stub):
+    workdir = tempfile.mkdtemp(prefix=f"qfnu-scale-{sites}-")
+    env = dict(os.environ)
+    env.update(
+        {
+            "PYTHONPATH": os.pathsep.join(
+                filter(None, [PROJECT_ROOT, env.get("PYTHONPATH")])
+            ),
+            "LOG_DIR": os.path.join(workdir, "logs"),
+            "FEISHU_BOT_URL": "",
+            "ONEBOT_HTTP_URL": stub.url if args.notify else "",
+            "ONEBOT_TRANSPORT": "http",
+            "ONEBOT_TARGET_GROUPS": "100001" if args.notify else "",
+            "ONEBOT_RATE_LIMIT": "0",
+            "ONEBOT_GROUPS_FILE": os.path.join(workdir, "groups.json"),
+            "NOTIFY_SUBSCRIPTIONS": os.path.join(workdir, "subscriptions.json"),
+            "NOTIFY_WEBHOOK_URL": "",
+            "SMTP_HOST": "",
+            "TRACE_FILE": "",
+            "STAGE_EVENTS": "",
+        }
+    )
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.scale",
+        "--child",
+        "--sites",
+        str(sites),
+        "--cycles",
+        str(args.cycles),
+        "--stub-url",
+        stub.url,
+        "--workdir",
+        workdir,
+    ]
+    try:
+        output = subprocess.run(
+            command,
+            env=env,
+            cwd=PROJECT_ROOT,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            check=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _mb(value):
+    return f"{value / 1024 / 1024:.1f}" if value else "-"
+
+
+def report(results):
+    print(
+        f"{'网站数':>6}{'初始化':>9}{'每轮':>9}{'每站':>9}{'CPU':>8}"
+        f"{'内存':>8}{'峰值':>8}{'描述符':>7}{'线程':>5}{'文件':>7}  阶段（每轮合计，秒）"
+    )
+    for result in results:
+        cycles = result["cycles"]
+        warmup, measured = cycles[0], cycles[1:] or cycles[:1]
+        seconds = sum(c["seconds"] for c in measured) / len(measured)
+        cpu = sum(c["cpu"] for c in measured) / len(measured)
+        last = cycles[-1]
+        stages = {}
+        for cycle in measured:
+            for stage, value in cycle["stages"].items():
+                stages[stage] = stages.get(stage, 0.0) + value / len(measured)
+        print(
+            f"{result['sites']:>9}{warmup['seconds']:>11.2f}{seconds:>11.2f}"
+            f"{seconds / result['sites'] * 1000:>9.1f}ms{cpu:>8.2f}"
+            f"{_mb(last['rss']):>10}{_mb(result['peak_rss']):>10}"
+            f"{last['fds'] if last['fds'] is not None else '-':>10}"
+            f"{last['threads']:>7}{last['files']:>9}  "
+            + " ".join(
+                f"{k}={v:.2f}" for k, v in sorted(stages.items(), key=lambda i: -i[1])
+            )
+        )
+    print(
+        "（初始化、每轮为秒，每站为每轮耗时 / 网站数，内存为最后一轮结束时，单位 MB）"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="网站数量扩展测试")
+    parser.add_argument(
+        "--sites",
+        type=int,
+        nargs="+",
+        default=[10, 50, 100, 200],
+        help="依次测试的网站数量",
+    )
+    parser.add_argument(
+        "--cycles", type=int, default=3, help="每个数量运行的轮数（含初始化）"
+    )
+    parser.add_argument(
+        "--publish-rate",
+        type=float,
+        default=0.1,
+        help="每个网站每轮发布新公告的概率，大于 1 时为每轮发布的条数",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.01, help="桩服务响应延迟（秒）"
+    )
+    parser.add_argument("--items", type=int, default=20, help="每个列表页的公告数")
+    parser.add_argument(
+        "--padding", type=int, default=30000, help="列表页中公告之外内容的字节数"
+    )
+    parser.add_argument(
+        "--notify", action="store_true", help="OneBot 指向桩服务，有新公告时推送"
+    )
+    parser.add_argument("--json", help="结果另存为 JSON 文件")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--stub-url", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return child(args)
+
+    stub = StubServer(args.latency, args.items, args.publish_rate, args.padding)
+    results = []
+    try:
+        for sites in args.sites:
+            start = time.perf_counter()
+            try:
+                results.append(run_child(args, sites, stub))
+            except (subprocess.CalledProcessError, ValueError, IndexError) as e:
+                print(f"{sites} 个网站的测试失败: {e}")
+                continue
+            print(f"{sites} 个网站完成，用时 {time.perf_counter() - start:.1f} 秒")
+    finally:
+        stub.close()
+
+    if not results:
+        return 1
+    print()
+    report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
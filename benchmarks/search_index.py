@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+检索索引基准测试
+生成 N 条合成公告建立索引，测量建立索引的耗时和文件大小，以及不同选择性的查询
+（几乎每条公告都有的词、常见词、少见词、多个词）在 search 和 query 中的耗时
+
+用法：
+    python -m benchmarks.search_index
+    python -m benchmarks.search_index --sizes 10000 100000 --repeat 20
+    python -m benchmarks.search_index --sizes 100000 --json search.json
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from qfnu_monitor.utils.search_index import NoticeIndex, tokenize
+
+SITES = ["jwc_gg", "jwc_tz", "library", "xg_tzgg", "zsb_zskx"]
+# 按出现频率从高到低
+WORDS = (
+    "考试 选课 成绩 补考 讲座 报名 竞赛 实习 毕业 招生 教材 奖学金 转专业 体测 宿舍 "
+    "图书 馆藏 数据库 培训 志愿 交流 访学 答辩 论文 开题 评教 课表 停课 调课 缓考"
+).split()
+
+# 查询 -> 说明
+QUERIES = {
+    "通知": "几乎每条都有",
+    "考试": "常见词",
+    "缓考": "少见词",
+    "补考 安排": "两个词",
+    "关于2021年转专业工作": "长查询",
+}
+
+
+def make_notice(i, rng):
+    # 词的出现频率按 1/排名 递减，与真实公告标题类似
+    word = WORDS[min(int(rng.paretovariate(1.0)) - 1, len(WORDS) - 1)]
+    year = 2015 + i % 10
+    month = 1 + i % 12
+    return {
+        "id": str(i),
+        "title": f"关于{year}年{word}{rng.choice(['安排', '工作', '事项'])}的通知（第{i}号）",
+        "link": f"https://example.edu.cn/info/{i}.htm",
+        "date": f"{year}-{month:02d}-{1 + i % 28:02d}",
+        "description": f"{rng.choice(WORDS)}相关{rng.choice(WORDS)}事宜，请各单位及时通知学生。",
+    }
+
+
+def build(data_dir, size, seed):
+    """建立 size 条公告的索引，返回 (秒数, 索引文件字节数)"""
+    rng = random.Random(seed)
+    index_file = os.path.join(data_dir, "index", "notices.sqlite3")
+    start = time.perf_counter()
+    with NoticeIndex(data_dir, index_file) as index:
+        with index.conn:
+            batch = []
+            for i in range(size):
+                batch.append(make_notice(i, rng))
+                if len(batch) == 5000:
+                    index.add(SITES[i % len(SITES)], batch)
+                    batch = []
+            index.add(SITES[0], batch)
+        index.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return time.perf_counter() - start, os.path.getsize(index_file)
+
+
+def time_call(func, repeat):
+    """重复调用 func，返回 (中位数毫秒, 最大毫秒, 结果数)"""
+    samples = []
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(func())
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples), count
+
+
+def measure(size, repeat, seed):
+    data_dir = tempfile.mkdtemp(prefix=f"qfnu-search-{size}-")
+    try:
+        seconds, file_size = build(data_dir, size, seed)
+        index_file = os.path.join(data_dir, "index", "notices.sqlite3")
+        with NoticeIndex(data_dir, index_file) as index:
+            queries = {}
+            for query in QUERIES:
+                df = index.conn.execute(
+                    "SELECT MAX(n) FROM (SELECT COUNT(*) AS n FROM postings "
+                    "WHERE term IN (SELECT value FROM json_each(?)) GROUP BY term)",
+                    (json.dumps(list(dict.fromkeys(tokenize(query)))),),
+                ).fetchone()[0]
+                search = time_call(lambda: index.search(query, limit=20), repeat)
+                # 每个查询都能命中，避免测到提前返回的空结果
+                assert search[2] > 0, query
+                keyword = time_call(
+                    lambda: list(index.query(keyword=query, limit=20)), repeat
+                )
+                queries[query] = {"df": df, "search": search, "query": keyword}
+        return {
+            "size": size,
+            "build_seconds": round(seconds, 2),
+            "index_bytes": file_size,
+            "queries": queries,
+        }
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def report(results):
+    for result in results:
+        print(
+            f"\n{result['size']} 条公告：建立索引 {result['build_seconds']} 秒，"
+            f"索引文件 {result['index_bytes'] / 1024 / 1024:.1f}MB"
+        )
+        print(
+            f"  {'查询':<16}{'说明':<10}{'最大文档频率':>10}"
+            f"{'search 中位':>12}{'最大':>8}{'query 中位':>12}{'最大':>8}"
+        )
+        for query, stats in result["queries"].items():
+            search, keyword = stats["search"], stats["query"]
+            print(
+                f"  {query:<16}{QUERIES[query]:<10}{stats['df'] or 0:>10}"
+                f"{search[0]:>12.1f}{search[1]:>8.1f}{keyword[0]:>12.1f}{keyword[1]:>8.1f}"
+            )
+    print("（单位毫秒；search 为 BM25 排序取前 20 条，query 为按日期取前 20 条）")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="检索索引基准测试")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10000, 100000],
+        help="依次测试的公告数量",
+    )
+    parser.add_argument("--repeat", type=int, default=10, help="每个查询的重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="生成公告的随机种子")
+    parser.add_argument("--json", help="结果另存为 JSON 文件")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        results.append(measure(size, args.repeat, args.seed))
+    report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+启动耗时测试
+在全新的解释器中导入各命令行入口，用 python -X importtime 统计每个模块的导入耗时，
+报告进程总耗时（减去空解释器的启动耗时）、入口的导入耗时、本项目各模块的导入耗时
+和按顶层包汇总的第三方库、标准库耗时
+
+- 每个入口运行 --repeat 次，耗时取最小值（受其他进程干扰最少的一次，与 timeit 相同），
+  先运行一次预热，使用已有的 .pyc（与 cron 中反复运行相同）
+- once 入口在导入 qfnu_monitor.main 之后再加载全部监控器，即 --once 运行一轮之前的全部导入；
+  main 只导入主程序，是 --help、--profile 单个网站等不需要全部监控器的运行的开销
+
+用法：
+    python -m benchmarks.startup
+    python -m benchmarks.startup --targets once main dispatch --repeat 20 --top 15
+    python -m benchmarks.startup --json startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 入口 -> 在新解释器中执行的代码
+TARGETS = {
+    "once": "import qfnu_monitor.main as m; [m.load_monitor(s) for s in m.MONITORS]",
+    "main": "import qfnu_monitor.main",
+    "dispatch": "import qfnu_monitor.dispatch",
+    "search": "import qfnu_monitor.search",
+    "query": "import qfnu_monitor.query",
+    "groups": "import qfnu_monitor.groups",
+    "churn": "import qfnu_monitor.churn",
+}
+
+# 写在入口代码之前，区分解释器自身启动时的导入
+MARKER = "--- startup ---"
+
+
+def _env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [PROJECT_ROOT, env.get("PYTHONPATH")])
+    )
+    return env
+
+
+def _run(code, importtime=False):
+    """运行一次，返回 (进程耗时秒数, 标准错误输出)"""
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", f"import sys; sys.stderr.write({MARKER!r} + '\\n'); {code}"]
+    start = time.perf_counter()
+    process = subprocess.run(
+        command,
+        env=_env(),
+        cwd=PROJECT_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if process.returncode:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+    return elapsed, process.stderr
+
+
+def parse_importtime(output):
+    """
+    解析 -X importtime 的输出
+
+    Args:
+        output (str): 标准错误输出
+
+    Returns:
+        list: 入口代码导入的模块，每项为 (模块名, 自身微秒, 累计微秒, 层级)
+    """
+    modules = []
+    started = False
+    for line in output.splitlines():
+        if line == MARKER:
+            started = True
+            continue
+        if not started or not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return modules
+
+
+def measure(code, repeat):
+    """
+    多次运行同一入口
+
+    Returns:
+        dict: wall（进程耗时最小值，秒）、imports（入口导入耗时最小值，秒）、
+            modules（模块 -> [自身, 累计] 最小值，微秒）
+    """
+    _run(code)
+    wall = [_run(code)[0] for _ in range(repeat)]
+
+    samples = {}
+    totals = []
+    for _ in range(repeat):
+        modules = parse_importtime(_run(code, importtime=True)[1])
+        totals.append(sum(cumulative for _, _, cumulative, d in modules if d == 0))
+        for name, own, cumulative, _ in modules:
+            samples.setdefault(name, []).append((own, cumulative))
+    return {
+        "wall": min(wall),
+        "imports": min(totals) / 1e6,
+        "modules": {
+            name: [min(s[0] for s in values), min(s[1] for s in values)]
+            for name, values in samples.items()
+        },
+    }
+
+
+def _group(name):
+    """汇总用的分组：本项目按模块，其他按顶层包"""
+    return name if name.startswith("qfnu_monitor") else name.split(".")[0]
+
+
+def report(results, baseline, top):
+    print(f"空解释器启动: {baseline * 1000:.1f}ms")
+    print(f"{'入口':<10}{'进程':>10}{'扣除启动':>10}{'导入':>10}{'模块数':>8}")
+    for target, result in results.items():
+        print(
+            f"{target:<10}{result['wall'] * 1000:>10.1f}"
+            f"{(result['wall'] - baseline) * 1000:>10.1f}"
+            f"{result['imports'] * 1000:>10.1f}{len(result['modules']):>8}"
+        )
+    print("（单位毫秒；导入为 -X importtime 统计的入口导入耗时，含统计本身的开销）")
+
+    for target, result in results.items():
+        groups = {}
+        for name, (own, _) in result["modules"].items():
+            groups[_group(name)] = groups.get(_group(name), 0) + own
+        ranked = sorted(groups.items(), key=lambda item: -item[1])[:top]
+        print(f"\n{target}: 导入耗时最多的模块和包（自身耗时合计，毫秒）")
+        for name, own in ranked:
+            cumulative = result["modules"].get(name, [0, 0])[1]
+            extra = f"（含依赖 {cumulative / 1000:.1f}）" if cumulative > own else ""
+            print(f"  {own / 1000:>7.1f}  {name}{extra}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="启动耗时测试")
+    parser.add_argument(
+        "--targets",
+        nargs="+",
+        choices=list(TARGETS),
+        default=["once", "main", "dispatch", "search"],
+        help="测试的入口",
+    )
+    parser.add_argument("--repeat", type=int, default=10, help="每个入口的运行次数")
+    parser.add_argument("--top", type=int, default=12, help="每个入口列出的模块数")
+    parser.add_argument("--json", help="结果另存为 JSON 文件")
+    args = parser.parse_args(argv)
+
+    baseline = min(_run("pass")[0] for _ in range(args.repeat))
+    results = {}
+    for target in args.targets:
+        try:
+            results[target] = measure(TARGETS[target], args.repeat)
+        except RuntimeError as e:
+            print(f"{target} 运行失败: {e}")
+    if not results:
+        return 1
+
+    report(results, baseline, args.top)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"baseline": baseline, "targets": results},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,13 +12,14 @@
 4. 添加到主程序中
 """
 
-import requests
 import json
 import os
 from bs4 import BeautifulSoup
-from qfnu_monitor.utils.feishu import feishu
-from qfnu_monitor.utils.onebot import onebot_send_all
-from qfnu_monitor.utils import logger
+from qfnu_monitor.utils.archive import ShardedArchive
+from qfnu_monitor.utils.storage import reorder_notices, write_notices
+from qfnu_monitor.utils.message import Section
+from qfnu_monitor.utils.outbox import Outbox
+from qfnu_monitor.utils import http, instrument, logger, metrics
 
 
 class WebsiteMonitorTemplate:
@@ -28,7 +29,9 @@ class WebsiteMonitorTemplate:
     需要修改的配置项：
     - __init__ 中的 URL 和文件名
     - get_notices 中的选择器和解析逻辑
-    - push_to_* 方法中的消息标题
+    - message_template 消息模板
+
+    推送由发件箱统一处理，监控器只抓取、解析并在 push_notifications 中入队
     """
 
     def __init__(self, data_dir="data"):
@@ -43,6 +46,7 @@ class WebsiteMonitorTemplate:
         self.base_url = "https://example.com/"  # 网站基础URL
         self.site_name = "示例网站"  # 网站名称（用于日志和通知）
         self.data_file_prefix = "example"  # 数据文件前缀
+        self.message_template = "standard"  # 消息模板，见 message_section
         # ===========================
 
         self.data_dir = data_dir
@@ -56,9 +60,8 @@ class WebsiteMonitorTemplate:
         self.data_file = os.path.join(
             self.data_dir, f"{self.data_file_prefix}_notices.json"
         )
-        self.archive_file = os.path.join(
-            self.archive_dir, f"{self.data_file_prefix}_notices_archive.json"
-        )
+        self.archive = ShardedArchive(self.archive_dir, self.data_file_prefix)
+        self.outbox = Outbox(self.data_dir)
         self.max_notices = 30  # 最多保留的通知数量，应大于网站公告数量
 
     def get_html(self):
@@ -71,9 +74,7 @@ class WebsiteMonitorTemplate:
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
-        response = requests.get(self.url, headers=headers, timeout=10)
-        response.encoding = "utf-8"
-        return response.text
+        return http.get_html(self.url, headers=headers, timeout=10)
 
     def parse_html(self, html):
         """
@@ -148,27 +149,24 @@ class WebsiteMonitorTemplate:
 
         try:
             with open(self.data_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+                return reorder_notices(self.data_file, json.load(f))
         except Exception as e:
             logger.error(f"读取{self.site_name}公告记录失败: {e}")
             return []
 
-    def load_archived_notices(self):
+    def load_archived_notices(self, start_date=None, end_date=None):
         """
-        加载已存档的公告
+        加载已存档的公告，只读取日期范围涉及的月分片
+
+        Args:
+            start_date (str, optional): 起始日期（含），如 "2024-05-01"
+            end_date (str, optional): 结束日期（含）
 
         Returns:
             list: 已存档的公告列表
         """
-        if (
-            not os.path.exists(self.archive_file)
-            or os.path.getsize(self.archive_file) == 0
-        ):
-            return []
-
         try:
-            with open(self.archive_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return self.archive.load(start_date, end_date)
         except Exception as e:
             logger.error(f"读取{self.site_name}公告存档记录失败: {e}")
             return []
@@ -183,8 +181,8 @@ class WebsiteMonitorTemplate:
         latest_notices = (
             notices[-self.max_notices :] if len(notices) > self.max_notices else notices
         )
-        with open(self.data_file, "w", encoding="utf-8") as f:
-            json.dump(latest_notices, f, ensure_ascii=False, indent=2)
+        # 每条公告一行、键有序，内容不变时不写文件，尽量减少数据提交的变更
+        write_notices(self.data_file, latest_notices)
 
         # 如果有超过max_notices的公告，归档多余的公告
         if len(notices) > self.max_notices:
@@ -200,13 +198,10 @@ class WebsiteMonitorTemplate:
         if not notices_to_archive:
             return
 
-        archived_notices = self.load_archived_notices()
-        all_archived = archived_notices + notices_to_archive
-
-        with open(self.archive_file, "w", encoding="utf-8") as f:
-            json.dump(all_archived, f, ensure_ascii=False, indent=2)
+        # 只追加到公告所属的月分片，不重写历史存档
+        self.archive.append(notices_to_archive)
 
-        logger.info(f"已归档{len(notices_to_archive)}条公告到{self.archive_file}")
+        logger.info(f"已归档{len(notices_to_archive)}条公告到{self.archive.site_dir}")
 
     def append_new_notices(self, new_notices):
         """
@@ -216,7 +211,8 @@ class WebsiteMonitorTemplate:
             new_notices (list): 新公告列表
         """
         saved_notices = self.load_saved_notices()
-        all_notices = saved_notices + new_notices
+        # 网站列表最新的在前；保存的公告按发布先后排列，超出数量时先归档最早的公告
+        all_notices = saved_notices + new_notices[::-1]
         self.save_notices(all_notices)
 
     def find_new_notices(self, current_notices, saved_notices):
@@ -238,58 +234,30 @@ class WebsiteMonitorTemplate:
             notice for notice in current_notices if notice["title"] not in saved_titles
         ]
 
-    def push_to_feishu(self, new_notices):
+    def message_section(self, new_notices):
         """
-        推送新公告到飞书
+        新公告及其消息模板
 
-        Args:
-            new_notices (list): 新公告列表
-        """
-        if not new_notices:
-            return
-
-        # ====== 可以修改消息格式 ======
-        title = f"📢 {self.site_name}有{len(new_notices)}条新公告"
-        content = ""
-
-        for i, notice in enumerate(new_notices, 1):
-            content += f"【{i}】{notice['title']}\n"
-            content += f"📅 {notice['date']}\n"
-            content += f"🔗 {notice['link']}\n\n"
-        # ============================
-
-        feishu(title, content)
-
-    def push_to_onebot(self, new_notices):
-        """
-        通过OneBot发送新公告通知
+        模板名对应 qfnu_monitor.utils.message 中注册的模板（内置 standard、detailed），
+        需要其他格式时用 register_template 注册新模板，飞书、OneBot、邮件等渠道共用
 
         Args:
             new_notices (list): 新公告列表
-        """
-        if not new_notices:
-            return
-
-        # ====== 可以修改消息格式 ======
-        message = f"📢 {self.site_name}有{len(new_notices)}条新公告\n\n"
-
-        for i, notice in enumerate(new_notices, 1):
-            message += f"【{i}】{notice['title']}\n"
-            message += f"📅 {notice['date']}\n"
-            message += f"🔗 {notice['link']}\n\n"
-        # ============================
 
-        # 发送到所有配置的群组
-        result = onebot_send_all(message)
-
-        if "error" in result:
-            logger.error(f"OneBot发送失败: {result['error']}")
-        else:
-            logger.info(f"OneBot发送成功: {result.get('success_count', 0)} 个群组")
+        Returns:
+            Section: 消息小节
+        """
+        return Section(
+            self.message_template,
+            {"site_name": self.site_name, "noun": "公告"},
+            new_notices,
+        )
 
     def push_notifications(self, new_notices):
         """
-        推送通知到所有配置的平台
+        将通知加入发件箱，由分发器在监控周期结束后推送到所有配置的平台
+
+        写入失败时抛出异常，本轮不记录新公告，下次运行会重新发现
 
         Args:
             new_notices (list): 新公告列表
@@ -297,17 +265,10 @@ class WebsiteMonitorTemplate:
         if not new_notices:
             return
 
-        # 推送到飞书
-        try:
-            self.push_to_feishu(new_notices)
-        except Exception as e:
-            logger.error(f"飞书推送失败: {e}")
-
-        # 推送到OneBot群组
-        try:
-            self.push_to_onebot(new_notices)
-        except Exception as e:
-            logger.error(f"OneBot推送失败: {e}")
+        section = self.message_section(new_notices)
+        self.outbox.enqueue(
+            self.data_file_prefix, new_notices, section.template, section.context
+        )
 
     def monitor(self):
         """
@@ -315,35 +276,52 @@ class WebsiteMonitorTemplate:
         """
         try:
             # 获取当前公告
-            html = self.get_html()
-            soup = self.parse_html(html)
-            current_notices = self.get_notices(soup)
+            with instrument.stage(self.data_file_prefix, "fetch"):
+                html = self.get_html()
+            with instrument.stage(self.data_file_prefix, "parse") as event:
+                soup = self.parse_html(html)
+                current_notices = self.get_notices(soup)
+                event.set(notices=len(current_notices))
 
             if not current_notices:
                 logger.warning(f"未从{self.site_name}获取到任何公告")
                 return
 
             # 加载已保存的公告
-            saved_notices = self.load_saved_notices()
-            
+            with instrument.stage(self.data_file_prefix, "load") as event:
+                saved_notices = self.load_saved_notices()
+                event.set(saved=len(saved_notices))
+
             # 检查是否为初始化（第一次运行）
             is_first_run = not saved_notices
 
             # 查找新公告
-            new_notices = self.find_new_notices(current_notices, saved_notices)
+            with instrument.stage(self.data_file_prefix, "diff") as event:
+                new_notices = self.find_new_notices(current_notices, saved_notices)
+                event.set(new=len(new_notices))
 
             if new_notices:
                 if is_first_run:
                     # 第一次运行，只初始化数据，不推送消息
-                    logger.info(f"首次运行{self.site_name}监控器，初始化{len(new_notices)}条公告数据，不推送消息")
-                    # 直接保存所有当前公告作为初始数据
-                    self.save_notices(current_notices)
+                    logger.info(
+                        f"首次运行{self.site_name}监控器，初始化{len(new_notices)}条公告数据，不推送消息"
+                    )
+                    # 直接保存所有当前公告作为初始数据，与追加时一样按发布先后排列
+                    with instrument.stage(self.data_file_prefix, "save"):
+                        self.save_notices(current_notices[::-1])
                 else:
                     # 非首次运行，正常推送新公告
                     logger.info(f"从{self.site_name}发现{len(new_notices)}条新公告")
-                    self.push_notifications(new_notices)
+                    metrics.NEW_NOTICES.inc(
+                        len(new_notices), site=self.data_file_prefix
+                    )
+                    with instrument.stage(
+                        self.data_file_prefix, "push", notices=len(new_notices)
+                    ):
+                        self.push_notifications(new_notices)
                     # 更新保存的公告，添加新公告而不覆盖已有公告
-                    self.append_new_notices(new_notices)
+                    with instrument.stage(self.data_file_prefix, "save"):
+                        self.append_new_notices(new_notices)
             else:
                 logger.info(f"{self.site_name}没有新公告")
 
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地 OneBot v11 模拟服务
+同时支持 HTTP API（POST /<action>）和正向 WebSocket（同一端口），
+收到的 send_group_msg 都返回成功，可设置处理延迟，用于本地调试和对比两种传输方式
+
+用法：
+    python examples/onebot_mock_server.py --port 5700 --delay 0.2
+
+    # HTTP 传输
+    ONEBOT_HTTP_URL=http://127.0.0.1:5700
+    # WebSocket 传输
+    ONEBOT_TRANSPORT=ws
+    ONEBOT_WS_URL=ws://127.0.0.1:5700
+"""
+
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WS_MAGIC = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+_message_ids = itertools.count(1)
+
+
+def handle_action(action: str, params: dict) -> dict:
+    """模拟 OneBot 动作，返回响应字典"""
+    if action in ("send_group_msg", "send_msg", "send_private_msg"):
+        return {
+            "status": "ok",
+            "retcode": 0,
+            "data": {"message_id": next(_message_ids)},
+        }
+    if action == "get_status":
+        return {"status": "ok", "retcode": 0, "data": {"online": True, "good": True}}
+    return {"status": "failed", "retcode": 1404, "message": f"不支持的动作: {action}"}
+
+
+def read_frame(rfile):
+    """读取一个 WebSocket 帧，返回 (opcode, payload)，连接关闭时返回 None"""
+    header = rfile.read(2)
+    if len(header) < 2:
+        return None
+    opcode = header[0] & 0x0F
+    masked = header[1] & 0x80
+    length = header[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", rfile.read(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", rfile.read(8))[0]
+    mask = rfile.read(4) if masked else b""
+    payload = rfile.read(length)
+    if masked:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+def build_frame(payload: bytes, opcode: int = 0x1) -> bytes:
+    """构造服务端发出的 WebSocket 帧（不加掩码）"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+class MockOneBotHandler(BaseHTTPRequestHandler):
+    """HTTP API 与 WebSocket 请求处理"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.0
+    access_token = None
+    quiet = False
+
+    def _authorized(self) -> bool:
+        if not self.access_token:
+            return True
+        return self.headers.get("Authorization") == f"Bearer {self.access_token}"
+
+    def _send_json(self, status: int, data: dict):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self._authorized():
+            self._send_json(401, {"status": "failed", "retcode": 1401})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"status": "failed", "retcode": 1400})
+            return
+        time.sleep(self.delay)
+        self._send_json(200, handle_action(self.path.strip("/"), params))
+
+    def do_GET(self):
+        if self.headers.get("Upgrade", "").lower() != "websocket":
+            self._send_json(404, {"status": "failed", "retcode": 1404})
+            return
+        if not self._authorized():
+            self._send_json(401, {"status": "failed", "retcode": 1401})
+            return
+
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(
+            hashlib.sha1((key + WS_MAGIC).encode()).digest()
+        ).decode()
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        self._serve_websocket()
+
+    def _serve_websocket(self):
+        """逐帧读取动作请求，每个请求在独立线程中延迟后响应（模拟并行处理）"""
+        write_lock = threading.Lock()
+
+        def respond(request: dict):
+            time.sleep(self.delay)
+            response = handle_action(request.get("action", ""), request.get("params"))
+            if "echo" in request:
+                response["echo"] = request["echo"]
+            frame = build_frame(json.dumps(response, ensure_ascii=False).encode())
+            with write_lock:
+                try:
+                    self.wfile.write(frame)
+                    self.wfile.flush()
+                except OSError:
+                    pass
+
+        while True:
+            frame = read_frame(self.rfile)
+            if frame is None:
+                return
+            opcode, payload = frame
+            if opcode == 0x8:
+                with write_lock:
+                    self.wfile.write(build_frame(b"", 0x8))
+                return
+            if opcode == 0x9:
+                with write_lock:
+                    self.wfile.write(build_frame(payload, 0xA))
+                continue
+            if opcode != 0x1:
+                continue
+            try:
+                request = json.loads(payload)
+            except ValueError:
+                continue
+            threading.Thread(target=respond, args=(request,), daemon=True).start()
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def start_server(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    delay: float = 0.0,
+    access_token: str = None,
+    quiet: bool = True,
+) -> ThreadingHTTPServer:
+    """
+    在后台线程启动模拟服务
+
+    Args:
+        host (str): 监听地址
+        port (int): 端口，0 表示随机端口
+        delay (float): 每个动作的处理延迟秒数
+        access_token (str, optional): 访问令牌
+        quiet (bool): 是否关闭访问日志
+
+    Returns:
+        ThreadingHTTPServer: 服务实例，server.server_address 为实际监听地址
+    """
+    handler = type(
+        "Handler",
+        (MockOneBotHandler,),
+        {"delay": delay, "access_token": access_token, "quiet": quiet},
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 OneBot v11 模拟服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=5700, help="监听端口")
+    parser.add_argument(
+        "--delay", type=float, default=0.0, help="每个动作的处理延迟秒数"
+    )
+    parser.add_argument("--access-token", help="访问令牌")
+    args = parser.parse_args()
+
+    server = start_server(
+        args.host, args.port, args.delay, args.access_token, quiet=False
+    )
+    host, port = server.server_address[:2]
+    print(f"OneBot 模拟服务已启动: http://{host}:{port} / ws://{host}:{port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
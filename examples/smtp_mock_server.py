@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地 SMTP 模拟服务
+接受任意发件人和收件人（不校验登录），收到的邮件打印到控制台，用于调试邮件通知渠道
+
+用法：
+    python examples/smtp_mock_server.py --port 2525
+
+    SMTP_HOST=127.0.0.1
+    SMTP_PORT=2525
+    SMTP_SECURITY=none
+    SMTP_TO=someone@example.com
+"""
+
+import argparse
+import email
+import socketserver
+import threading
+from email import policy
+from typing import List
+
+
+class MockSMTPHandler(socketserver.StreamRequestHandler):
+    """处理一个 SMTP 会话（HELO/EHLO、AUTH、MAIL、RCPT、DATA、RSET、QUIT）"""
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode("utf-8"))
+
+    def handle(self):
+        self.reply("220 qfnu-monitor mock SMTP")
+        sender, recipients = None, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            command = raw.decode("utf-8", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+
+            if verb == "EHLO":
+                self.reply("250-qfnu-monitor")
+                self.reply("250-AUTH PLAIN LOGIN")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 qfnu-monitor")
+            elif verb == "AUTH":
+                self.reply("235 Authentication successful")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip(" <>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip(" <>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b".\r\n", b".\n"):
+                        break
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                self.server.received(sender, recipients, b"".join(lines))
+                self.reply("250 OK: queued")
+            elif verb == "RSET":
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class MockSMTPServer(socketserver.ThreadingTCPServer):
+    """保存收到的邮件，messages 中为解析后的 email.message.EmailMessage"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, quiet: bool = True):
+        super().__init__(address, MockSMTPHandler)
+        self.quiet = quiet
+        self.messages: List[email.message.EmailMessage] = []
+        self._lock = threading.Lock()
+
+    def received(self, sender: str, recipients: List[str], data: bytes):
+        message = email.message_from_bytes(data, policy=policy.default)
+        with self._lock:
+            self.messages.append(message)
+        if not self.quiet:
+            print(f"--- {sender} -> {', '.join(recipients)}")
+            print(f"Subject: {message['Subject']}")
+            print(f"Message-ID: {message['Message-ID']}")
+            print(message.get_content())
+
+
+def start_server(
+    host: str = "127.0.0.1", port: int = 0, quiet: bool = True
+) -> MockSMTPServer:
+    """
+    在后台线程启动模拟服务
+
+    Args:
+        host (str): 监听地址
+        port (int): 端口，0 表示随机端口
+        quiet (bool): 是否不打印收到的邮件
+
+    Returns:
+        MockSMTPServer: 服务实例，server.server_address 为实际监听地址
+    """
+    server = MockSMTPServer((host, port), quiet=quiet)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 SMTP 模拟服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=2525, help="监听端口")
+    args = parser.parse_args()
+
+    server = start_server(args.host, args.port, quiet=False)
+    host, port = server.server_address[:2]
+    print(f"SMTP 模拟服务已启动: {host}:{port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
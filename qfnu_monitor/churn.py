@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据目录变更量统计
+定时任务每轮会把 data/ 提交到仓库，本工具统计每轮变更的行数、字节数，
+以及新增 git 对象的大小（zlib 压缩后的松散对象大小，即仓库增长的上限）
+
+用法：
+    python -m qfnu_monitor.churn                # 工作区相对 HEAD 的变更（本轮）
+    python -m qfnu_monitor.churn --history 100  # 最近 100 次修改 data/ 的提交
+    python -m qfnu_monitor.churn --history 100 --json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import zlib
+from typing import Dict, List, Optional
+
+
+def run_git(args: List[str], cwd: str) -> bytes:
+    """执行 git 命令并返回标准输出"""
+    return subprocess.run(
+        ["git", *args], cwd=cwd, capture_output=True, check=True
+    ).stdout
+
+
+def read_blob(repo: str, rev: Optional[str], path: str) -> bytes:
+    """读取某个版本（rev 为空时为工作区）的文件内容，不存在时返回空"""
+    if rev is None:
+        full_path = os.path.join(repo, path)
+        if not os.path.exists(full_path):
+            return b""
+        with open(full_path, "rb") as f:
+            return f.read()
+    try:
+        return run_git(["cat-file", "blob", f"{rev}:{path}"], repo)
+    except subprocess.CalledProcessError:
+        return b""
+
+
+def diff_stats(
+    repo: str, base: Optional[str], target: Optional[str], path: str
+) -> Dict[str, int]:
+    """
+    统计两个版本之间 path 下的变更量
+
+    Args:
+        repo (str): 仓库根目录
+        base (str, optional): 基准版本，为空时表示空树
+        target (str, optional): 目标版本，为空时表示工作区
+        path (str): 统计的目录
+
+    Returns:
+        dict: files、lines_added、lines_removed、bytes_added、bytes_removed、object_bytes
+    """
+    revs = [rev for rev in (base, target) if rev]
+    if base is None and target:
+        # 根提交与空树比较
+        revs = ["4b825dc642cb6eb9a060e54bf8d69288fbee4904", target]
+    diff = run_git(
+        ["diff", "--no-color", "--no-renames", "--unified=0", *revs, "--", path], repo
+    )
+
+    stats = {
+        "files": 0,
+        "lines_added": 0,
+        "lines_removed": 0,
+        "bytes_added": 0,
+        "bytes_removed": 0,
+        "object_bytes": 0,
+    }
+    changed_files = []
+    for line in diff.splitlines():
+        if line.startswith(b"diff --git "):
+            changed_files.append(line.split(b" b/", 1)[-1].decode("utf-8"))
+        elif line.startswith(b"+++") or line.startswith(b"---"):
+            continue
+        elif line.startswith(b"+"):
+            stats["lines_added"] += 1
+            stats["bytes_added"] += len(line)
+        elif line.startswith(b"-"):
+            stats["lines_removed"] += 1
+            stats["bytes_removed"] += len(line)
+
+    if target is None:
+        # 工作区中尚未跟踪的新文件
+        untracked = run_git(
+            ["ls-files", "--others", "--exclude-standard", "--", path], repo
+        )
+        for name in untracked.decode("utf-8").splitlines():
+            content = read_blob(repo, None, name)
+            changed_files.append(name)
+            stats["lines_added"] += content.count(b"\n")
+            stats["bytes_added"] += len(content)
+
+    stats["files"] = len(changed_files)
+    for name in changed_files:
+        content = read_blob(repo, target, name)
+        if content:
+            header = f"blob {len(content)}\0".encode()
+            stats["object_bytes"] += len(zlib.compress(header + content))
+    return stats
+
+
+def history(repo: str, path: str, count: int) -> List[Dict]:
+    """统计最近 count 次修改 path 的提交"""
+    log = run_git(
+        ["log", f"-n{count}", "--format=%H %P|%ct", "--", path], repo
+    ).decode()
+    records = []
+    for line in log.splitlines():
+        revs, timestamp = line.split("|")
+        commit, *parents = revs.split()
+        stats = diff_stats(repo, parents[0] if parents else None, commit, path)
+        stats["commit"] = commit[:10]
+        stats["time"] = int(timestamp)
+        records.append(stats)
+    return records
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def print_table(records: List[Dict]):
+    print(
+        f"{'提交':<12}{'文件':>5}{'+行':>7}{'-行':>7}"
+        f"{'+字节':>10}{'-字节':>10}{'对象':>10}"
+    )
+    for stats in records:
+        print(
+            f"{stats.get('commit', '工作区'):<12}{stats['files']:>5}"
+            f"{stats['lines_added']:>7}{stats['lines_removed']:>7}"
+            f"{format_bytes(stats['bytes_added']):>10}"
+            f"{format_bytes(stats['bytes_removed']):>10}"
+            f"{format_bytes(stats['object_bytes']):>10}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="统计数据目录每轮的 git 变更量")
+    parser.add_argument(
+        "--history", type=int, help="统计最近 N 次修改数据目录的提交，默认统计工作区"
+    )
+    parser.add_argument("--path", default="data", help="统计的目录，默认 data")
+    parser.add_argument(
+        "--repo",
+        default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        help="仓库根目录",
+    )
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    args = parser.parse_args(argv)
+
+    if args.history:
+        records = history(args.repo, args.path, args.history)
+    else:
+        records = [diff_stats(args.repo, "HEAD", None, args.path)]
+
+    if args.json:
+        print(json.dumps(records, ensure_ascii=False, indent=2))
+        return 0
+
+    print_table(records)
+    if len(records) > 1:
+        total_objects = sum(stats["object_bytes"] for stats in records)
+        changed = sum(
+            stats["bytes_added"] + stats["bytes_removed"] for stats in records
+        )
+        print(
+            f"\n平均每轮变更{format_bytes(changed / len(records))}，"
+            f"新增对象{format_bytes(total_objects / len(records))}"
+        )
+        span = records[0]["time"] - records[-1]["time"]
+        if span > 0:
+            per_day = (len(records) - 1) / span * 86400
+            yearly = total_objects / len(records) * per_day * 365
+            print(
+                f"约每天{per_day:.1f}次数据提交，"
+                f"预计每年仓库增长不超过{format_bytes(yearly)}（未计入打包增量压缩）"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,18 @@
-import requests
 import json
 import os
 from bs4 import BeautifulSoup
-from qfnu_monitor.utils.feishu import feishu
-from qfnu_monitor.utils.onebot import onebot_send_all
-from qfnu_monitor.utils import logger
+from qfnu_monitor.utils.archive import ShardedArchive
+from qfnu_monitor.utils.storage import reorder_notices, write_notices
+from qfnu_monitor.utils.message import Section
+from qfnu_monitor.utils.outbox import Outbox
+from qfnu_monitor.utils import http, instrument, logger, metrics
 
 
 class QFNUXGTZGGMonitor:
     def __init__(self, data_dir="data"):
         self.url = "https://xg.qfnu.edu.cn/tzgg1.htm#/"
         self.base_url = "https://xg.qfnu.edu.cn/"
+        self.site_key = "xg_tzgg"
         self.data_dir = data_dir
         # 确保数据目录存在
         os.makedirs(self.data_dir, exist_ok=True)
@@ -18,15 +20,12 @@ class QFNUXGTZGGMonitor:
         self.archive_dir = os.path.join(self.data_dir, "archive")
         os.makedirs(self.archive_dir, exist_ok=True)
         self.data_file = os.path.join(self.data_dir, "xg_tzgg_notices.json")
-        self.archive_file = os.path.join(
-            self.archive_dir, "xg_tzgg_notices_archive.json"
-        )
+        self.archive = ShardedArchive(self.archive_dir, "xg_tzgg")
+        self.outbox = Outbox(self.data_dir)
         self.max_notices = 30  # 最多保留的通知数量，应大于网站公告数量
 
     def get_html(self):
-        response = requests.get(self.url)
-        response.encoding = "utf-8"
-        return response.text
+        return http.get_html(self.url)
 
     def parse_html(self, html):
         soup = BeautifulSoup(html, "html.parser")
@@ -55,22 +54,15 @@ class QFNUXGTZGGMonitor:
 
         try:
             with open(self.data_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+                return reorder_notices(self.data_file, json.load(f))
         except Exception as e:
             logger.error(f"读取曲阜师范大学学工处通知公告记录失败: {e}")
             return []
 
-    def load_archived_notices(self):
+    def load_archived_notices(self, start_date=None, end_date=None):
         """加载已存档的公告"""
-        if (
-            not os.path.exists(self.archive_file)
-            or os.path.getsize(self.archive_file) == 0
-        ):
-            return []
-
         try:
-            with open(self.archive_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return self.archive.load(start_date, end_date)
         except Exception as e:
             logger.error(f"读取曲阜师范大学学工处通知公告存档记录失败: {e}")
             return []
@@ -80,8 +72,8 @@ class QFNUXGTZGGMonitor:
         latest_notices = (
             notices[-self.max_notices :] if len(notices) > self.max_notices else notices
         )
-        with open(self.data_file, "w", encoding="utf-8") as f:
-            json.dump(latest_notices, f, ensure_ascii=False, indent=2)
+        # 每条公告一行、键有序，内容不变时不写文件，尽量减少数据提交的变更
+        write_notices(self.data_file, latest_notices)
 
         # 如果有超过max_notices的公告，归档多余的公告
         if len(notices) > self.max_notices:
@@ -92,18 +84,16 @@ class QFNUXGTZGGMonitor:
         if not notices_to_archive:
             return
 
-        archived_notices = self.load_archived_notices()
-        all_archived = archived_notices + notices_to_archive
+        # 只追加到公告所属的月分片，不重写历史存档
+        self.archive.append(notices_to_archive)
 
-        with open(self.archive_file, "w", encoding="utf-8") as f:
-            json.dump(all_archived, f, ensure_ascii=False, indent=2)
-
-        logger.info(f"已归档{len(notices_to_archive)}条公告到{self.archive_file}")
+        logger.info(f"已归档{len(notices_to_archive)}条公告到{self.archive.site_dir}")
 
     def append_new_notices(self, new_notices):
         """将新公告添加到已保存的公告列表中"""
         saved_notices = self.load_saved_notices()
-        all_notices = saved_notices + new_notices
+        # 网站列表最新的在前；保存的公告按发布先后排列，超出数量时先归档最早的公告
+        all_notices = saved_notices + new_notices[::-1]
         self.save_notices(all_notices)
 
     def find_new_notices(self, current_notices, saved_notices):
@@ -115,77 +105,48 @@ class QFNUXGTZGGMonitor:
             notice for notice in current_notices if notice["title"] not in saved_titles
         ]
 
-    def push_to_feishu(self, new_notices):
-        if not new_notices:
-            return
-
-        title = f"📢 曲阜师范大学学工处有{len(new_notices)}条新通知"
-        content = ""
-
-        for i, notice in enumerate(new_notices, 1):
-            content += f"【{i}】{notice['title']}\n"
-            content += f"📅 {notice['date']}\n"
-            content += f"🔗 {notice['link']}\n\n"
-
-        feishu(title, content)
-
-    def push_to_onebot(self, new_notices):
-        """通过OneBot发送新通知"""
-        if not new_notices:
-            return
-
-        # 构建消息内容
-        message = f"📢 曲阜师范大学学工处有{len(new_notices)}条新通知\n\n"
-
-        for i, notice in enumerate(new_notices, 1):
-            message += f"【{i}】{notice['title']}\n"
-            message += f"📅 {notice['date']}\n"
-            message += f"🔗 {notice['link']}\n\n"
-
-        # 发送到所有配置的群组
-        result = onebot_send_all(message)
-
-        if "error" in result:
-            logger.error(f"OneBot发送失败: {result['error']}")
-        else:
-            logger.info(f"OneBot发送成功: {result.get('success_count', 0)} 个群组")
+    def message_section(self, new_notices):
+        """新公告及其消息模板（模板见 qfnu_monitor.utils.message）"""
+        return Section(
+            "standard", {"site_name": "曲阜师范大学学工处", "noun": "通知"}, new_notices
+        )
 
     def push_notifications(self, new_notices):
-        """推送通知到所有配置的平台"""
+        """将通知加入发件箱，由分发器在监控周期结束后推送到所有配置的平台"""
         if not new_notices:
             return
 
-        # 推送到飞书
-        try:
-            self.push_to_feishu(new_notices)
-        except Exception as e:
-            logger.error(f"飞书推送失败: {e}")
-
-        # 推送到OneBot群组
-        try:
-            self.push_to_onebot(new_notices)
-        except Exception as e:
-            logger.error(f"OneBot推送失败: {e}")
+        section = self.message_section(new_notices)
+        self.outbox.enqueue(
+            self.site_key, new_notices, section.template, section.context
+        )
 
     def monitor(self):
         try:
             # 获取当前公告
-            html = self.get_html()
-            soup = self.parse_html(html)
-            current_notices = self.get_notices(soup)
+            with instrument.stage(self.site_key, "fetch"):
+                html = self.get_html()
+            with instrument.stage(self.site_key, "parse") as event:
+                soup = self.parse_html(html)
+                current_notices = self.get_notices(soup)
+                event.set(notices=len(current_notices))
 
             if not current_notices:
                 logger.warning("未获取到任何公告")
                 return
 
             # 加载已保存的公告
-            saved_notices = self.load_saved_notices()
+            with instrument.stage(self.site_key, "load") as event:
+                saved_notices = self.load_saved_notices()
+                event.set(saved=len(saved_notices))
 
             # 检查是否为初始化（第一次运行）
             is_first_run = not saved_notices
 
             # 查找新公告
-            new_notices = self.find_new_notices(current_notices, saved_notices)
+            with instrument.stage(self.site_key, "diff") as event:
+                new_notices = self.find_new_notices(current_notices, saved_notices)
+                event.set(new=len(new_notices))
 
             if new_notices:
                 if is_first_run:
@@ -193,14 +154,20 @@ class QFNUXGTZGGMonitor:
                     logger.info(
                         f"首次运行曲阜师范大学学工处通知公告监控器，初始化{len(new_notices)}条公告数据，不推送消息"
                     )
-                    # 直接保存所有当前公告作为初始数据
-                    self.save_notices(current_notices)
+                    # 直接保存所有当前公告作为初始数据，与追加时一样按发布先后排列
+                    with instrument.stage(self.site_key, "save"):
+                        self.save_notices(current_notices[::-1])
                 else:
                     # 非首次运行，正常推送新公告
                     logger.info(f"发现{len(new_notices)}条新公告")
-                    self.push_notifications(new_notices)
+                    metrics.NEW_NOTICES.inc(len(new_notices), site=self.site_key)
+                    with instrument.stage(
+                        self.site_key, "push", notices=len(new_notices)
+                    ):
+                        self.push_notifications(new_notices)
                     # 更新保存的公告，添加新公告而不覆盖已有公告
-                    self.append_new_notices(new_notices)
+                    with instrument.stage(self.site_key, "save"):
+                        self.append_new_notices(new_notices)
             else:
                 logger.info("没有新公告")
 
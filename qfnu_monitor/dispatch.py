@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+通知发件箱命令行
+
+用法：
+    python -m qfnu_monitor.dispatch            # 推送到期的通知
+    python -m qfnu_monitor.dispatch --all      # 忽略重试等待时间，立即推送全部通知
+    python -m qfnu_monitor.dispatch --status   # 查看待推送的通知
+
+设置 HTTP_RECORD / HTTP_REPLAY 时录制或回放推送请求（见 utils/cassette）
+"""
+
+import argparse
+import datetime
+import sys
+from qfnu_monitor.utils import cassette, logger
+from qfnu_monitor.utils.config import default_data_dir, load_env
+from qfnu_monitor.utils.notifiers import event_notices
+from qfnu_monitor.utils.outbox import Outbox
+
+
+def format_time(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def print_status(outbox):
+    events = outbox.pending()
+    if not events:
+        print("发件箱为空")
+        return
+
+    for event in events:
+        print(
+            f"{event['id']}  {format_time(event['created_at'])}  "
+            f"{len(event_notices(event))}条公告"
+        )
+        for channel, state in event["channels"].items():
+            line = f"    {channel:<8}{state['status']:<10}已尝试{state['attempts']}次"
+            if state["status"] == "pending" and state["attempts"]:
+                line += f"，下次重试 {format_time(state['next_attempt'])}"
+            if state.get("last_error"):
+                line += f"，最近错误: {state['last_error']}"
+            print(line)
+
+
+def main(argv=None):
+    load_env()
+    logger.setup()
+    parser = argparse.ArgumentParser(description="推送发件箱中的公告通知")
+    parser.add_argument("--data-dir", default=default_data_dir(), help="数据目录")
+    parser.add_argument("--status", action="store_true", help="只查看待推送的通知")
+    parser.add_argument(
+        "--all", action="store_true", help="忽略重试等待时间，立即推送全部通知"
+    )
+    args = parser.parse_args(argv)
+
+    outbox = Outbox(args.data_dir)
+    if args.status:
+        print_status(outbox)
+        return 0
+
+    cassette.configure()
+    try:
+        summary = outbox.dispatch(force=args.all)
+    finally:
+        cassette.close()
+    for name, stats in summary["notifiers"].items():
+        print(
+            f"{name:<8}成功{stats['sent']}次，失败{stats['failed']}次，"
+            f"跳过{stats['skipped']}次，最长耗时{stats['elapsed']}秒"
+        )
+    print(
+        f"成功{summary['sent']}次，失败{summary['failed']}次，"
+        f"跳过{summary['skipped']}次，待重试{summary['pending']}个事件"
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
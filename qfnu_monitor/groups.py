@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OneBot 群组注册表命令行
+
+用法：
+    python -m qfnu_monitor.groups list                      # 查看已登记的群组
+    python -m qfnu_monitor.groups add 123456 654321 --account bot2
+    python -m qfnu_monitor.groups remove 123456
+    python -m qfnu_monitor.groups import groups.txt         # 每行一个群号
+"""
+
+import argparse
+import sys
+from qfnu_monitor.utils import logger
+from qfnu_monitor.utils.config import load_env
+from qfnu_monitor.utils.groups import DEFAULT_ACCOUNT, GroupRegistry, groups_file
+
+
+def print_groups(registry, account=None):
+    entries = registry.entries
+    if account:
+        entries = {
+            group_id: entry
+            for group_id, entry in entries.items()
+            if entry.get("account", DEFAULT_ACCOUNT) == account
+        }
+    if not entries:
+        print("注册表中没有群组")
+        return
+
+    counts = {}
+    for group_id, entry in entries.items():
+        name = entry.get("account", DEFAULT_ACCOUNT)
+        enabled = entry.get("enabled", True)
+        if enabled:
+            counts[name] = counts.get(name, 0) + 1
+        line = f"{group_id:<14}{name:<12}"
+        if not enabled:
+            line += "已停用  "
+        print(line + entry.get("name", ""))
+    print(
+        f"共{len(entries)}个群组，启用："
+        + "，".join(f"{name} {count}个" for name, count in sorted(counts.items()))
+    )
+
+
+def read_group_ids(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [
+            line.split("#", 1)[0].strip() for line in f if line.split("#", 1)[0].strip()
+        ]
+
+
+def main(argv=None):
+    load_env()
+    logger.setup()
+    parser = argparse.ArgumentParser(description="管理 OneBot 群组注册表")
+    parser.add_argument("--file", default=groups_file(), help="注册表文件")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="查看已登记的群组")
+    list_parser.add_argument("--account", help="只显示该账号的群组")
+
+    add_parser = subparsers.add_parser("add", help="登记群组")
+    add_parser.add_argument("groups", nargs="+", help="群号")
+    add_parser.add_argument("--account", help="发送账号，默认为 default")
+    add_parser.add_argument("--name", help="群组备注")
+    add_parser.add_argument("--disable", action="store_true", help="登记为停用")
+
+    remove_parser = subparsers.add_parser("remove", help="移除群组")
+    remove_parser.add_argument("groups", nargs="+", help="群号")
+
+    import_parser = subparsers.add_parser("import", help="从文件批量登记群组")
+    import_parser.add_argument("path", help="群号文件，每行一个，# 后为注释")
+    import_parser.add_argument("--account", help="发送账号，默认为 default")
+    args = parser.parse_args(argv)
+
+    registry = GroupRegistry(args.file)
+    if args.command == "list":
+        print_groups(registry, args.account)
+        return 0
+
+    account = getattr(args, "account", None)
+    if account and account != DEFAULT_ACCOUNT and account not in registry.accounts:
+        print(f"账号未配置: {account}，请先在 {args.file} 的 accounts 中添加")
+        return 1
+
+    if args.command == "add":
+        fields = {"enabled": not args.disable}
+        if args.name:
+            fields["name"] = args.name
+        registry.add(args.groups, account, **fields)
+        print(f"已登记{len(args.groups)}个群组")
+    elif args.command == "import":
+        group_ids = read_group_ids(args.path)
+        registry.add(group_ids, account)
+        print(f"已导入{len(group_ids)}个群组")
+    else:
+        print(f"已移除{registry.remove(args.groups)}个群组")
+
+    registry.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
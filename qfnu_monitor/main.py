@@ -3,39 +3,303 @@
 
 """
 曲阜师范大学公告监控主程序
+
+默认常驻运行，每隔 --interval 秒检查一轮，并在本地端口提供运行指标；
+--once 只检查一轮，结束后把运行指标写入文本文件
+每轮结束时输出各网站各阶段的耗时表，--stage-events 指定时每个阶段的事件写入 JSON Lines 文件，
+--trace 指定时每轮的链路追踪导出为 Chrome Trace 文件
+--profile 用 cProfile 和 tracemalloc 剖析一轮或单个监控器，写出函数耗时和内存峰值报告后退出
+--record-http 把全部 HTTP 请求录制到文件，--replay-http 离线回放录制的请求（见 utils/cassette）
+--sites 只检查指定的网站
+
+监控器模块在第一次检查对应网站时才导入，发件箱和推送渠道在推送时导入，
+剖析、HTTP 录制回放、检索索引、指标服务等只在用到时导入，
+不需要的监控器和依赖库（如只检查招生办时的 BeautifulSoup）不增加启动耗时
+（python -m benchmarks.startup）
 """
 
+import argparse
+import importlib
 import os
-from qfnu_monitor.utils import logger
-from qfnu_monitor.core.qfnu_jwc_gg import QFNUJWCGGMonitor
-from qfnu_monitor.core.qfnu_jwc_tz import QFNUJWCTZMonitor
-from qfnu_monitor.core.qfnu_library_gg import QFNULibraryGGMonitor
-from qfnu_monitor.core.qfnu_xg_tzgg import QFNUXGTZGGMonitor
-from qfnu_monitor.core.qfnu_zsb_zskx import QFNUZSBZSKXMonitor
+import time
+from qfnu_monitor.utils import config, instrument, logger, metrics, tracing
 
+# 每轮按顺序检查的网站：网站标识 -> 监控器类（或 "模块.类名"，第一次用到时导入）
+MONITORS = {
+    "jwc_gg": "qfnu_monitor.core.qfnu_jwc_gg.QFNUJWCGGMonitor",
+    "jwc_tz": "qfnu_monitor.core.qfnu_jwc_tz.QFNUJWCTZMonitor",
+    "library": "qfnu_monitor.core.qfnu_library_gg.QFNULibraryGGMonitor",
+    "xg_tzgg": "qfnu_monitor.core.qfnu_xg_tzgg.QFNUXGTZGGMonitor",
+    "zsb_zskx": "qfnu_monitor.core.qfnu_zsb_zskx.QFNUZSBZSKXMonitor",
+}
 
-def main():
-    # 确保数据目录存在
-    data_dir = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"
+
+def load_monitor(site):
+    """
+    获取网站的监控器类，需要时导入所在模块
+
+    Args:
+        site (str): 网站标识
+
+    Returns:
+        type: 监控器类
+    """
+    target = MONITORS[site]
+    if isinstance(target, str):
+        module_name, _, class_name = target.rpartition(".")
+        target = getattr(importlib.import_module(module_name), class_name)
+    return target
+
+
+def run_cycle(data_dir, sites=None):
+    """检查一轮网站（默认全部），然后推送通知、更新检索索引"""
+    start = time.perf_counter()
+    instrument.RECORDER.begin_cycle()
+    with tracing.span("cycle", "cycle", cycle=instrument.RECORDER.cycle):
+        for site in sites or MONITORS:
+            with instrument.stage(site, "total"):
+                try:
+                    monitor_class = load_monitor(site)
+                except ImportError as e:
+                    logger.error(f"加载{site}的监控器失败: {e}")
+                    continue
+                monitor_class(data_dir=data_dir).run()
+
+        # 所有站点检查完毕后再推送，推送耗时不影响新公告的发现
+        with instrument.stage("cycle", "dispatch"):
+            dispatch_notifications(data_dir)
+
+        with instrument.stage("cycle", "index"):
+            update_search_index(data_dir)
+
+        metrics.update_archive_sizes(data_dir)
+    elapsed = time.perf_counter() - start
+    metrics.CYCLE_SECONDS.observe(elapsed)
+    metrics.LAST_CYCLE.set(time.time())
+
+    table = instrument.RECORDER.summary_table() if instrument.RECORDER.summary else ""
+    if table:
+        logger.info(f"本轮各阶段耗时（毫秒，共{elapsed:.2f}秒）:\n{table}")
+
+    try:
+        trace_file = tracing.TRACER.export(instrument.RECORDER.cycle)
+        if trace_file:
+            logger.info(f"本轮链路追踪已导出: {trace_file}")
+    except OSError as e:
+        logger.error(f"导出链路追踪失败: {e}")
+
+
+def main(argv=None):
+    # 先加载 .env，参数默认值和日志配置都可能来自其中
+    config.load_env()
+    parser = argparse.ArgumentParser(description="曲阜师范大学公告监控")
+    parser.add_argument(
+        "--interval", type=float, default=3600, help="监控间隔时间（秒），默认 3600"
+    )
+    parser.add_argument(
+        "--data-dir", default=config.default_data_dir(), help="数据存储目录"
+    )
+    parser.add_argument("--once", action="store_true", help="仅运行一次，不循环监控")
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=int(os.environ.get("METRICS_PORT", "9108")),
+        help="常驻运行时提供运行指标的本机端口，0 表示不提供",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="--once 时运行指标写入的文件，默认 data/metrics/qfnu_monitor.prom",
+    )
+    parser.add_argument(
+        "--stage-events",
+        help="每个阶段的事件写入的 JSON Lines 文件（- 为标准错误输出），默认读取 STAGE_EVENTS",
+    )
+    parser.add_argument(
+        "--no-stage-summary", action="store_true", help="不输出每轮的阶段耗时表"
+    )
+    parser.add_argument(
+        "--trace",
+        help="每轮的链路追踪导出文件（Chrome Trace 格式，{cycle} 替换为轮次），默认读取 TRACE_FILE",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="cycle",
+        choices=["cycle", *MONITORS],
+        help="剖析一轮（cycle，默认）或指定网站的监控器后退出",
+    )
+    parser.add_argument(
+        "--profile-dir", help="剖析报告目录，默认 data/metrics/profiles"
+    )
+    parser.add_argument(
+        "--profile-limit", type=int, default=30, help="报告中每种排序列出的函数数"
+    )
+    parser.add_argument(
+        "--no-profile-memory",
+        action="store_true",
+        help="不统计内存（tracemalloc 会拖慢 Python 代码，只看耗时时可关闭）",
     )
+    parser.add_argument(
+        "--record-http",
+        help="把全部 HTTP 请求录制到文件（.gz 结尾时压缩），默认读取 HTTP_RECORD",
+    )
+    parser.add_argument(
+        "--replay-http",
+        help="回放录制文件中的 HTTP 请求，不访问网络，默认读取 HTTP_REPLAY",
+    )
+    parser.add_argument(
+        "--replay-timing",
+        # 与 cassette.TIMINGS 相同，解析参数时不导入 cassette
+        choices=("original", "fast"),
+        help="回放时按录制的耗时等待（original，默认）或立即返回（fast）",
+    )
+    parser.add_argument(
+        "--sites",
+        nargs="+",
+        choices=list(MONITORS),
+        metavar="SITE",
+        help=f"只检查这些网站（{'、'.join(MONITORS)}），默认全部",
+    )
+    args = parser.parse_args(argv)
+    logger.setup()
+    tracing.configure(args.trace)
+    instrument.configure(
+        events=args.stage_events, summary=False if args.no_stage_summary else None
+    )
+
+    cassette = None
+    if any(
+        [
+            args.record_http,
+            args.replay_http,
+            os.environ.get("HTTP_RECORD"),
+            os.environ.get("HTTP_REPLAY"),
+        ]
+    ):
+        from qfnu_monitor.utils import cassette
+
+        try:
+            cassette.configure(args.record_http, args.replay_http, args.replay_timing)
+        except (OSError, ValueError) as e:
+            logger.error(f"HTTP 录制或回放文件无法使用: {e}")
+            return 1
+    try:
+        return run(args)
+    finally:
+        if cassette is not None:
+            cassette.close()
+
+
+def run(args):
+    """按参数运行一轮、常驻运行或剖析"""
+    # 确保数据目录存在
+    data_dir = os.path.abspath(args.data_dir)
     logger.info(f"数据存储目录：{data_dir}")
     os.makedirs(data_dir, exist_ok=True)
 
-    qfnu_jwc_gg_monitor = QFNUJWCGGMonitor(data_dir=data_dir)
-    qfnu_jwc_gg_monitor.run()
+    if args.profile:
+        return run_profile(args, data_dir)
+
+    if args.once:
+        run_cycle(data_dir, args.sites)
+        metrics_file = args.metrics_file or metrics.default_metrics_file(data_dir)
+        try:
+            metrics.write_textfile(metrics_file)
+        except OSError as e:
+            logger.error(f"写入运行指标失败: {e}")
+        return
+
+    if args.metrics_port:
+        try:
+            metrics.start_http_server(args.metrics_port)
+        except OSError as e:
+            logger.error(f"指标服务启动失败（端口 {args.metrics_port}）: {e}")
+
+    try:
+        while True:
+            run_cycle(data_dir, args.sites)
+            logger.info(f"本轮监控结束，{args.interval:g}秒后开始下一轮")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        logger.info("监控已停止")
+
+
+def run_profile(args, data_dir):
+    """剖析一轮或单个监控器，写出报告"""
+    from qfnu_monitor.utils import profiling
+
+    def target():
+        if args.profile == "cycle":
+            run_cycle(data_dir, args.sites)
+            return
+        # 单个监控器只检查并写入发件箱，不推送
+        instrument.RECORDER.begin_cycle()
+        with instrument.stage(args.profile, "total"):
+            load_monitor(args.profile)(data_dir=data_dir).run()
+
+    output_dir = args.profile_dir or os.path.join(data_dir, "metrics", "profiles")
+    logger.info(f"开始剖析 {args.profile}")
+    try:
+        result = profiling.profile_call(
+            target,
+            args.profile,
+            output_dir,
+            limit=args.profile_limit,
+            memory=not args.no_profile_memory,
+        )
+    except OSError as e:
+        logger.error(f"写入剖析报告失败: {e}")
+        return 1
+
+    peak = result["peak"]
+    logger.info(
+        f"剖析完成，耗时{result['elapsed']:.2f}秒"
+        + (f"，内存峰值{peak / 1024 / 1024:.1f}MB" if peak is not None else "")
+        + f"\n报告: {result['report']}\n原始数据: {result['stats']}"
+    )
+    return 0
+
+
+def dispatch_notifications(data_dir):
+    """推送发件箱中到期的通知（包括之前运行中失败待重试的通知）"""
+    from qfnu_monitor.utils.outbox import Outbox
+
+    try:
+        summary = Outbox(data_dir).dispatch()
+    except Exception as e:
+        logger.error(f"推送通知失败: {e}")
+        return
+
+    if summary["notifiers"] or summary["pending"]:
+        elapsed = "，".join(
+            f"{name}{stats['elapsed']}秒"
+            for name, stats in summary["notifiers"].items()
+        )
+        logger.info(
+            f"通知推送完成: 成功{summary['sent']}次，失败{summary['failed']}次，"
+            f"跳过{summary['skipped']}次，待重试{summary['pending']}个事件"
+            + (f"（最长耗时 {elapsed}）" if elapsed else "")
+        )
+
 
-    qfnu_jwc_tz_monitor = QFNUJWCTZMonitor(data_dir=data_dir)
-    qfnu_jwc_tz_monitor.run()
+def update_search_index(data_dir):
+    """
+    增量更新检索索引
 
-    qfnu_library_gg_monitor = QFNULibraryGGMonitor(data_dir=data_dir)
-    qfnu_library_gg_monitor.run()
+    索引是派生数据，只有在已经建立过索引（执行过 python -m qfnu_monitor.search）
+    时才随监控周期更新，避免每次全新检出后都重建
+    """
+    index_file = os.path.join(data_dir, "index", "notices.sqlite3")
+    if not os.path.exists(index_file):
+        return
 
-    qfnu_xg_tzgg_monitor = QFNUXGTZGGMonitor(data_dir=data_dir)
-    qfnu_xg_tzgg_monitor.run()
+    from qfnu_monitor.utils.search_index import NoticeIndex
 
-    qfnu_zsb_zskx_monitor = QFNUZSBZSKXMonitor(data_dir=data_dir)
-    qfnu_zsb_zskx_monitor.run()
+    try:
+        with NoticeIndex(data_dir, index_file) as index:
+            index.sync()
+    except Exception as e:
+        logger.error(f"更新检索索引失败: {e}")
 
 
 if __name__ == "__main__":
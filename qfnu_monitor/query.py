@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+公告查询命令行
+按站点、日期范围和关键词列出公告，结果逐条输出
+
+用法：
+    python -m qfnu_monitor.query --site jwc_gg --since 2024-01 --until 2024-06
+    python -m qfnu_monitor.query --keyword 考试 --limit 20 --offset 20
+    python -m qfnu_monitor.query --since 2024-09-01 --format jsonl
+"""
+
+import argparse
+import json
+import sys
+from qfnu_monitor.utils.config import default_data_dir
+from qfnu_monitor.utils.search_index import NoticeIndex
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="查询曲阜师范大学公告（含归档）")
+    parser.add_argument(
+        "--site", help="站点，如 jwc_gg、jwc_tz、library、xg_tzgg、zsb_zskx"
+    )
+    parser.add_argument("--since", help="起始日期（含），如 2024-01-01 或 2024-01")
+    parser.add_argument("--until", help="结束日期（含），如 2024-06-30 或 2024-06")
+    parser.add_argument("--keyword", help="标题、简介或正文中包含的关键词")
+    parser.add_argument("--limit", type=int, help="最多输出的数量")
+    parser.add_argument("--offset", type=int, default=0, help="跳过的数量")
+    parser.add_argument("--asc", action="store_true", help="按日期升序输出")
+    parser.add_argument(
+        "--format", choices=["table", "jsonl"], default="table", help="输出格式"
+    )
+    parser.add_argument("--data-dir", default=default_data_dir(), help="数据目录")
+    parser.add_argument("--no-sync", action="store_true", help="查询前不同步索引")
+    args = parser.parse_args(argv)
+
+    with NoticeIndex(args.data_dir) as index:
+        if not args.no_sync:
+            index.sync()
+
+        rows = index.query(
+            site=args.site,
+            start_date=args.since,
+            end_date=args.until,
+            keyword=args.keyword,
+            limit=args.limit,
+            offset=args.offset,
+            ascending=args.asc,
+        )
+
+        count = 0
+        for notice in rows:
+            if args.format == "jsonl":
+                print(json.dumps(notice, ensure_ascii=False))
+            else:
+                print(
+                    f"{notice.get('date', ''):<10}  {notice['site']:<10}  "
+                    f"{notice.get('title', '')}  {notice.get('link', '')}"
+                )
+            count += 1
+
+    print(f"共{count}条公告", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+公告全文检索命令行
+
+用法：
+    python -m qfnu_monitor.search 补考
+    python -m qfnu_monitor.search 转专业 --site jwc_tz --limit 5
+    python -m qfnu_monitor.search --rebuild
+"""
+
+import argparse
+import json
+import sys
+import time
+from qfnu_monitor.utils.config import default_data_dir
+from qfnu_monitor.utils.search_index import NoticeIndex
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="检索已存档的曲阜师范大学公告")
+    parser.add_argument("query", nargs="?", help="查询文本，如 补考")
+    parser.add_argument("--site", help="只检索指定站点，如 jwc_gg")
+    parser.add_argument("--limit", type=int, default=20, help="最多返回的结果数量")
+    parser.add_argument("--data-dir", default=default_data_dir(), help="数据目录")
+    parser.add_argument("--rebuild", action="store_true", help="清空并重建索引")
+    parser.add_argument("--no-sync", action="store_true", help="检索前不同步索引")
+    parser.add_argument("--json", action="store_true", help="以 JSON Lines 输出结果")
+    args = parser.parse_args(argv)
+
+    with NoticeIndex(args.data_dir) as index:
+        start = time.perf_counter()
+        if args.rebuild:
+            count = index.rebuild()
+            print(f"索引重建完成，共{count}条公告", file=sys.stderr)
+        elif not args.no_sync:
+            index.sync()
+        sync_ms = (time.perf_counter() - start) * 1000
+
+        if not args.query:
+            return 0
+
+        start = time.perf_counter()
+        results = index.search(args.query, site=args.site, limit=args.limit)
+        search_ms = (time.perf_counter() - start) * 1000
+
+    for item in results:
+        if args.json:
+            print(json.dumps(item, ensure_ascii=False))
+        else:
+            print(
+                f"{item['score']:>8.3f}  {item.get('date', ''):<10}  "
+                f"{item['site']:<10}  {item.get('title', '')}"
+            )
+            print(f"{'':>8}  {item.get('link', '')}")
+
+    print(
+        f"共{len(results)}条结果，同步耗时{sync_ms:.1f}ms，检索耗时{search_ms:.1f}ms",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+阶段事件统计命令行
+读取 --stage-events / STAGE_EVENTS 写出的 JSON Lines 文件，统计各网站各阶段耗时的分位数，
+并列出最慢的几轮中耗时最多的阶段
+
+用法：
+    python -m qfnu_monitor.stages data/metrics/stages.jsonl
+    python -m qfnu_monitor.stages data/metrics/stages.jsonl --site jwc_gg --slowest 5
+"""
+
+import argparse
+import json
+import os
+import sys
+from qfnu_monitor.utils import logger
+from qfnu_monitor.utils.config import load_env
+
+
+def load_events(path, site=None, stage=None):
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if site and event.get("site") != site:
+                continue
+            if stage and event.get("stage") != stage:
+                continue
+            events.append(event)
+    return events
+
+
+def percentile(values, q):
+    """最近秩法分位数，values 已排序"""
+    index = max(0, min(len(values) - 1, int(len(values) * q + 0.5) - 1))
+    return values[index]
+
+
+def print_percentiles(events):
+    durations = {}
+    errors = {}
+    for event in events:
+        key = (event["site"], event["stage"])
+        durations.setdefault(key, []).append(event["duration"] * 1000)
+        errors[key] = errors.get(key, 0) + (not event.get("ok", True))
+
+    print(
+        f"{'网站':<12}{'阶段':<10}{'次数':>4}{'p50':>10}{'p90':>10}"
+        f"{'p99':>10}{'最大':>8}{'错误':>4}"
+    )
+    for key in sorted(durations):
+        values = sorted(durations[key])
+        print(
+            f"{key[0]:<14}{key[1]:<12}{len(values):>6}"
+            f"{percentile(values, 0.5):>10.1f}{percentile(values, 0.9):>10.1f}"
+            f"{percentile(values, 0.99):>10.1f}{values[-1]:>10.1f}{errors[key]:>6}"
+        )
+    print("（单位：毫秒）")
+
+
+def print_slowest(events, count):
+    """按轮汇总（各网站 total 与 cycle 的推送、索引阶段之和），列出最慢的几轮"""
+    cycles = {}
+    for event in events:
+        if event["stage"] == "total" or event["site"] == "cycle":
+            cycle = cycles.setdefault(event.get("cycle", ""), [0.0, []])
+            cycle[0] += event["duration"]
+        if event["stage"] != "total":
+            cycles.setdefault(event.get("cycle", ""), [0.0, []])[1].append(event)
+
+    slowest = sorted(cycles.items(), key=lambda item: item[1][0], reverse=True)
+    for cycle, (total, stages) in slowest[:count]:
+        top = sorted(stages, key=lambda e: e["duration"], reverse=True)[:5]
+        print(f"\n{cycle or '(无轮次)'}  共{total:.2f}秒")
+        for event in top:
+            extra = "，".join(
+                f"{k}={v}"
+                for k, v in event.items()
+                if k not in ("ts", "cycle", "site", "stage", "duration", "ok")
+            )
+            print(
+                f"    {event['site']:<12}{event['stage']:<10}"
+                f"{event['duration'] * 1000:>10.1f}ms  {extra}"
+            )
+
+
+def main(argv=None):
+    load_env()
+    logger.setup()
+    parser = argparse.ArgumentParser(description="统计监控各阶段的耗时")
+    parser.add_argument(
+        "path", nargs="?", default=os.environ.get("STAGE_EVENTS"), help="事件文件"
+    )
+    parser.add_argument("--site", help="只统计该网站")
+    parser.add_argument("--stage", help="只统计该阶段")
+    parser.add_argument("--slowest", type=int, default=3, help="列出最慢的几轮")
+    args = parser.parse_args(argv)
+
+    if not args.path or not os.path.exists(args.path):
+        print("事件文件不存在，请用 --stage-events 或 STAGE_EVENTS 记录阶段事件")
+        return 1
+
+    events = load_events(args.path, args.site, args.stage)
+    if not events:
+        print("没有符合条件的事件")
+        return 0
+
+    print_percentiles(events)
+    if args.slowest:
+        print_slowest(events, args.slowest)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+公告存档组件
+按站点、按月分片存储归档公告，并用一个小清单文件记录各分片信息
+
+目录结构：
+    data/archive/<站点>/manifest.json    分片清单
+    data/archive/<站点>/2024-05.jsonl    按月分片，每行一条公告
+
+大规模分析可使用 ArchiveReader：通过内存映射读取分片，按需解码单条记录
+"""
+
+import bisect
+import json
+import mmap
+import os
+import re
+import datetime
+import logging
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Union
+from qfnu_monitor.utils.storage import dumps_record, write_json
+
+MANIFEST_VERSION = 1
+
+_DATE_PATTERN = re.compile(r"(\d{4})\D{1,3}(\d{1,2})(?:\D{1,3}(\d{1,2}))?")
+
+
+def normalize_date(date_str: str) -> str:
+    """
+    将各网站的日期字符串统一为 YYYY-MM-DD（只有年月时为 YYYY-MM）
+
+    Args:
+        date_str (str): 原始日期字符串，如 "2024-05-01"、"2024年5月1日"
+
+    Returns:
+        str: 标准化后的日期，无法识别时返回空字符串
+    """
+    if not date_str:
+        return ""
+
+    match = _DATE_PATTERN.search(str(date_str))
+    if not match:
+        return ""
+
+    year, month, day = match.groups()
+    if not 1 <= int(month) <= 12:
+        return ""
+    if day:
+        return f"{year}-{int(month):02d}-{int(day):02d}"
+    return f"{year}-{int(month):02d}"
+
+
+class ShardedArchive:
+    """按月分片的公告存档"""
+
+    def __init__(self, archive_dir: str, site: str):
+        """
+        初始化存档
+
+        Args:
+            archive_dir (str): 存档根目录
+            site (str): 站点标识，同时作为分片子目录名
+        """
+        self.archive_dir = archive_dir
+        self.site = site
+        self.site_dir = os.path.join(archive_dir, site)
+        self.manifest_file = os.path.join(self.site_dir, "manifest.json")
+        # 旧版单文件存档，首次访问时自动迁移到分片
+        self.legacy_file = os.path.join(archive_dir, f"{site}_notices_archive.json")
+        self._manifest = None
+
+    def shard_key(self, notice: Dict[str, Any]) -> str:
+        """
+        计算公告所属分片（YYYY-MM）
+
+        无法识别日期的公告归入归档当月的分片
+        """
+        date = normalize_date(notice.get("date", ""))
+        if date:
+            return date[:7]
+        return datetime.date.today().strftime("%Y-%m")
+
+    def shard_path(self, key: str) -> str:
+        """分片文件路径"""
+        return os.path.join(self.site_dir, f"{key}.jsonl")
+
+    @property
+    def manifest(self) -> Dict[str, Any]:
+        """分片清单，首次访问时加载"""
+        if self._manifest is None:
+            self._manifest = self._load_manifest()
+            self._migrate_legacy()
+        return self._manifest
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        """读取清单，清单缺失或损坏时根据分片文件重建"""
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+                if manifest.get("version") == MANIFEST_VERSION:
+                    return manifest
+            except Exception as e:
+                logging.error(f"读取存档清单失败，将重建: {self.manifest_file}, {e}")
+
+        return self._rebuild_manifest()
+
+    def _rebuild_manifest(self) -> Dict[str, Any]:
+        """扫描分片文件重建清单"""
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "site": self.site,
+            "total": 0,
+            "shards": {},
+        }
+        if not os.path.isdir(self.site_dir):
+            return manifest
+
+        for filename in sorted(os.listdir(self.site_dir)):
+            if not filename.endswith(".jsonl"):
+                continue
+            key = filename[: -len(".jsonl")]
+            entry = {"file": filename, "count": 0, "first_date": "", "last_date": ""}
+            for notice in self._read_shard(key):
+                self._update_entry(entry, notice)
+            manifest["shards"][key] = entry
+            manifest["total"] += entry["count"]
+
+        if manifest["shards"]:
+            self._write_manifest(manifest)
+        return manifest
+
+    def _migrate_legacy(self):
+        """将旧版单文件存档拆分到分片，迁移完成后删除旧文件"""
+        if not os.path.exists(self.legacy_file):
+            return
+
+        try:
+            if os.path.getsize(self.legacy_file) > 0:
+                with open(self.legacy_file, "r", encoding="utf-8") as f:
+                    legacy_notices = json.load(f)
+            else:
+                legacy_notices = []
+        except Exception as e:
+            logging.error(f"读取旧版存档失败，暂不迁移: {self.legacy_file}, {e}")
+            return
+
+        self._append(legacy_notices)
+        os.remove(self.legacy_file)
+        logging.info(
+            f"已将旧版存档{self.legacy_file}的{len(legacy_notices)}条公告迁移到{self.site_dir}"
+        )
+
+    @staticmethod
+    def _update_entry(entry: Dict[str, Any], notice: Dict[str, Any]):
+        """用一条公告更新分片清单项的计数和日期范围"""
+        entry["count"] += 1
+        date = normalize_date(notice.get("date", ""))
+        if date:
+            if not entry["first_date"] or date < entry["first_date"]:
+                entry["first_date"] = date
+            if not entry["last_date"] or date > entry["last_date"]:
+                entry["last_date"] = date
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        """原子写入清单，内容不变时不写"""
+        os.makedirs(self.site_dir, exist_ok=True)
+        write_json(self.manifest_file, manifest)
+
+    def _append(self, notices: List[Dict[str, Any]]):
+        """按分片追加公告，只写入涉及的分片文件"""
+        if not notices:
+            return
+
+        buckets: Dict[str, List[Dict[str, Any]]] = {}
+        for notice in notices:
+            buckets.setdefault(self.shard_key(notice), []).append(notice)
+
+        os.makedirs(self.site_dir, exist_ok=True)
+        shards = self._manifest["shards"]
+        for key, bucket in buckets.items():
+            with open(self.shard_path(key), "a", encoding="utf-8") as f:
+                for notice in bucket:
+                    f.write(dumps_record(notice) + "\n")
+
+            entry = shards.setdefault(
+                key,
+                {"file": f"{key}.jsonl", "count": 0, "first_date": "", "last_date": ""},
+            )
+            for notice in bucket:
+                self._update_entry(entry, notice)
+
+        self._manifest["total"] = sum(entry["count"] for entry in shards.values())
+        self._write_manifest(self._manifest)
+
+    def append(self, notices: List[Dict[str, Any]]):
+        """
+        追加归档公告
+
+        Args:
+            notices (list): 需要归档的公告列表
+        """
+        # 确保清单已加载（并完成旧版迁移）
+        _ = self.manifest
+        self._append(notices)
+
+    def shard_keys(
+        self, start_date: Optional[str] = None, end_date: Optional[str] = None
+    ) -> List[str]:
+        """
+        返回与日期范围有交集的分片，按时间升序
+
+        Args:
+            start_date (str, optional): 起始日期（含），YYYY-MM-DD 或 YYYY-MM
+            end_date (str, optional): 结束日期（含），YYYY-MM-DD 或 YYYY-MM
+        """
+        start_key = normalize_date(start_date)[:7] if start_date else ""
+        end_key = normalize_date(end_date)[:7] if end_date else ""
+        return [
+            key
+            for key in sorted(self.manifest["shards"])
+            if (not start_key or key >= start_key) and (not end_key or key <= end_key)
+        ]
+
+    def _read_shard(self, key: str) -> Iterator[Dict[str, Any]]:
+        """逐行读取一个分片"""
+        path = self.shard_path(key)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    logging.error(f"存档分片中存在损坏记录，已跳过: {path}, {e}")
+
+    def iter_notices(
+        self, start_date: Optional[str] = None, end_date: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        按分片顺序迭代归档公告，只读取日期范围需要的分片
+
+        Args:
+            start_date (str, optional): 起始日期（含）
+            end_date (str, optional): 结束日期（含）
+        """
+        start = normalize_date(start_date) if start_date else ""
+        end = normalize_date(end_date) if end_date else ""
+
+        for key in self.shard_keys(start_date, end_date):
+            for notice in self._read_shard(key):
+                # 无法识别日期的公告按分片月份参与比较
+                date = normalize_date(notice.get("date", "")) or key
+                if start and date[: len(start)] < start[: len(date)]:
+                    continue
+                if end and date[: len(end)] > end[: len(date)]:
+                    continue
+                yield notice
+
+    def load(
+        self, start_date: Optional[str] = None, end_date: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        加载归档公告
+
+        Args:
+            start_date (str, optional): 起始日期（含）
+            end_date (str, optional): 结束日期（含）
+
+        Returns:
+            list: 归档公告列表
+        """
+        return list(self.iter_notices(start_date, end_date))
+
+    def count(self) -> int:
+        """归档公告总数，只读取清单"""
+        return self.manifest["total"]
+
+    def open_reader(
+        self, start_date: Optional[str] = None, end_date: Optional[str] = None
+    ) -> "ArchiveReader":
+        """
+        以内存映射方式打开存档，用于大规模历史数据分析
+
+        Args:
+            start_date (str, optional): 起始日期，按月选择分片
+            end_date (str, optional): 结束日期，按月选择分片
+        """
+        return ArchiveReader(self, start_date, end_date)
+
+
+class MappedShard:
+    """
+    内存映射的存档分片
+
+    打开时只映射文件，首次按下标访问时扫描换行符建立偏移索引，
+    记录在访问时才解码
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        # 空文件无法映射
+        self._mm = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        )
+        self._offsets = None
+
+    @property
+    def offsets(self) -> array:
+        """每条记录的起始偏移，最后一项为结束位置"""
+        if self._offsets is None:
+            offsets = array("q")
+            mm = self._mm
+            if mm is not None:
+                pos, size = 0, len(mm)
+                while pos < size:
+                    end = mm.find(b"\n", pos)
+                    if end == -1:
+                        # 末尾未写完的行不计入
+                        break
+                    if end > pos:
+                        offsets.append(pos)
+                    pos = end + 1
+            offsets.append(pos if mm is not None else 0)
+            self._offsets = offsets
+        return self._offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def raw(self, index: int) -> bytes:
+        """第 index 条记录的原始字节（不解码）"""
+        offsets = self.offsets
+        if index < 0:
+            index += len(offsets) - 1
+        if not 0 <= index < len(offsets) - 1:
+            raise IndexError(index)
+        start = offsets[index]
+        end = self._mm.find(b"\n", start)
+        return self._mm[start:end]
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return json.loads(self.raw(index))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """顺序解码，无需建立偏移索引"""
+        if self._mm is None:
+            return
+        mm, pos, size = self._mm, 0, len(self._mm)
+        while pos < size:
+            end = mm.find(b"\n", pos)
+            if end == -1:
+                break
+            if end > pos:
+                yield json.loads(mm[pos:end])
+            pos = end + 1
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+
+class ArchiveReader:
+    """
+    基于内存映射的只读存档视图
+
+    打开时不读取任何分片；首次取长度或按下标访问时映射各分片并扫描换行符得到
+    记录数（与 MappedShard 的偏移索引一致，清单的计数跳过了损坏记录，不能用于定位），
+    之后只解码访问的记录，顺序扫描的内存占用与存档大小无关
+    """
+
+    def __init__(
+        self,
+        archive: ShardedArchive,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ):
+        """
+        Args:
+            archive (ShardedArchive): 存档
+            start_date (str, optional): 起始日期，按月选择分片
+            end_date (str, optional): 结束日期，按月选择分片
+        """
+        self.archive = archive
+        self.keys = archive.shard_keys(start_date, end_date)
+        self._bounds: Optional[List[int]] = None
+        self._shards: Dict[str, MappedShard] = {}
+
+    def shard(self, key: str) -> MappedShard:
+        """按需映射分片"""
+        if key not in self._shards:
+            self._shards[key] = MappedShard(self.archive.shard_path(key))
+        return self._shards[key]
+
+    @property
+    def bounds(self) -> List[int]:
+        """各分片的累计记录数，用于二分定位下标所在的分片"""
+        if self._bounds is None:
+            bounds = []
+            total = 0
+            for key in self.keys:
+                total += len(self.shard(key))
+                bounds.append(total)
+            self._bounds = bounds
+        return self._bounds
+
+    def __len__(self) -> int:
+        return self.bounds[-1] if self.bounds else 0
+
+    def _locate(self, index: int):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        bounds = self.bounds
+        shard_index = bisect.bisect_right(bounds, index)
+        start = bounds[shard_index - 1] if shard_index else 0
+        return self.keys[shard_index], index - start
+
+    def raw(self, index: int) -> bytes:
+        """第 index 条记录的原始字节（不解码）"""
+        key, local_index = self._locate(index)
+        return self.shard(key).raw(local_index)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        key, local_index = self._locate(index)
+        return self.shard(key)[local_index]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """逐个分片顺序扫描，扫描完的分片立即解除映射"""
+        for key in self.keys:
+            if key in self._shards:
+                yield from self._shards[key]
+                continue
+            shard = MappedShard(self.archive.shard_path(key))
+            try:
+                yield from shard
+            finally:
+                shard.close()
+
+    def close(self):
+        """解除所有分片映射"""
+        for shard in self._shards.values():
+            shard.close()
+        self._shards.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
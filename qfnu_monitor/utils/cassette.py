@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+HTTP 录制与回放
+录制一次运行中的全部 HTTP 请求（列表页、招生办接口、详情页以及飞书、OneBot、webhook 推送），
+之后离线回放，用于在本地复现线上问题，或在相同输入下比较解析、存储改动的性能
+
+--record-http / HTTP_RECORD 指定录制文件，--replay-http / HTTP_REPLAY 指定回放文件；
+文件为 JSON Lines，以 .gz 结尾时用 gzip 压缩。每行一个请求：方法、地址、请求体摘要、
+状态码、少量响应头、响应体（解压后的内容）、耗时，以及连接失败、读取中断等错误
+
+回放时不访问网络，按方法和地址（忽略 ts 等时间戳参数）匹配录制的请求，同一地址按录制顺序
+依次返回；请求体相同的录制优先，因此并行推送到多个群时各群的响应不会错配。
+--replay-timing original（默认）按录制的耗时等待后再返回，fast 立即返回
+（推送渠道的本地限流仍然生效，需要时用 ONEBOT_RATE_LIMIT=0 关闭）。
+没有对应录制的请求按连接失败处理
+
+录制文件中不保存密钥：地址中的 access_token、token、secret 等查询参数，hook 之后的路径
+（如飞书机器人 /hook/<token>）和用户名密码都换成 redacted-<摘要>，错误信息和 Location
+响应头中同样替换（请求头不录制）；回放时先对请求地址做相同的替换再匹配，不同的机器人仍然对应不同的录制
+
+回放结果依赖运行前的数据：复现时应使用录制开始时数据目录的副本，否则发现的新公告和推送请求会不同
+
+录制和回放都在 requests 的 HTTPAdapter 上进行，覆盖共享 Session 和各推送渠道各自的 Session；
+OneBot WebSocket 不经过 HTTP，不录制
+"""
+
+import base64
+import datetime
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError
+
+# 匹配时忽略的查询参数（时间戳、防缓存参数）
+IGNORED_PARAMS = {"ts", "t", "_", "timestamp"}
+# 录制的响应头，其余（如 Content-Length、Content-Encoding）与解压后的响应体不再对应
+KEPT_HEADERS = ("Content-Type", "Location", "Retry-After", "Last-Modified", "ETag")
+TIMINGS = ("original", "fast")
+# 录制时替换的查询参数（不区分大小写），以及其后路径都替换的路径段
+SECRET_PARAMS = {"access_token", "token", "secret", "key", "sign", "signature"}
+SECRET_SEGMENTS = {"hook", "hooks", "webhook", "webhooks"}
+REDACTED = "redacted-"
+
+Key = Tuple[str, str]
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """回放文件中没有对应的请求"""
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _redact(value: str) -> str:
+    """替换一个密钥，相同的密钥替换结果相同，已替换过的不再替换"""
+    if not value or value.startswith(REDACTED):
+        return value
+    return REDACTED + hashlib.sha1(value.encode("utf-8")).hexdigest()[:8]
+
+
+def _secrets(url: str) -> List[str]:
+    """地址中的密钥：密钥参数的值、hook 之后的路径段、用户名密码"""
+    parts = urlsplit(url)
+    secrets = [v for k, v in parse_qsl(parts.query, True) if k.lower() in SECRET_PARAMS]
+    segments = parts.path.split("/")
+    for i, segment in enumerate(segments):
+        if segment.lower() in SECRET_SEGMENTS:
+            secrets += segments[i + 1 :]
+            break
+    if "@" in parts.netloc:
+        secrets += parts.netloc.rpartition("@")[0].split(":", 1)
+    return [secret for secret in secrets if secret and not secret.startswith(REDACTED)]
+
+
+def redact_url(url: str) -> str:
+    """把地址中的密钥换成 redacted-<摘要>，没有密钥的地址原样返回"""
+    if not _secrets(url):
+        return url
+    parts = urlsplit(url)
+    query = urlencode(
+        [
+            (k, _redact(v) if k.lower() in SECRET_PARAMS else v)
+            for k, v in parse_qsl(parts.query, True)
+        ]
+    )
+    segments = parts.path.split("/")
+    for i, segment in enumerate(segments):
+        if segment.lower() in SECRET_SEGMENTS:
+            segments[i + 1 :] = map(_redact, segments[i + 1 :])
+            break
+    netloc = parts.netloc
+    if "@" in netloc:
+        userinfo, _, host = netloc.rpartition("@")
+        netloc = ":".join(map(_redact, userinfo.split(":", 1))) + "@" + host
+    return urlunsplit(
+        parts._replace(netloc=netloc, path="/".join(segments), query=query)
+    )
+
+
+def redact_text(text: str, url: str) -> str:
+    """替换文本（如错误信息）中出现的该地址的密钥"""
+    for secret in sorted(_secrets(url), key=len, reverse=True):
+        text = text.replace(secret, _redact(secret))
+    return text
+
+
+def request_key(method: str, url: str) -> Key:
+    """匹配用的键：方法和去掉时间戳参数、替换密钥后的地址"""
+    parts = urlsplit(redact_url(url))
+    query = urlencode(
+        [(k, v) for k, v in parse_qsl(parts.query, True) if k not in IGNORED_PARAMS]
+    )
+    return method.upper(), urlunsplit(parts._replace(query=query, fragment=""))
+
+
+def body_digest(body: Any) -> Optional[str]:
+    """请求体摘要，没有请求体或流式上传等无法取得内容时为 None"""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if not body or not isinstance(body, bytes):
+        return None
+    return hashlib.sha1(body).hexdigest()[:16]
+
+
+def _encode_body(entry: Dict[str, Any], body: bytes):
+    try:
+        entry["text"] = body.decode("utf-8")
+    except UnicodeDecodeError:
+        entry["base64"] = base64.b64encode(body).decode("ascii")
+
+
+def _decode_body(entry: Dict[str, Any]) -> bytes:
+    if "base64" in entry:
+        return base64.b64decode(entry["base64"])
+    return entry.get("text", "").encode("utf-8")
+
+
+class _RecordingRaw:
+    """包装 urllib3 响应，读取响应体的同时保存内容，读完或中断时写入一条录制"""
+
+    def __init__(self, raw, finish):
+        self._raw = raw
+        self._finish = finish
+        self._chunks: List[bytes] = []
+        self._done = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def _end(self, error: Optional[str] = None):
+        if not self._done:
+            self._done = True
+            self._finish(b"".join(self._chunks), error)
+
+    def stream(self, amt=None, decode_content=True):
+        try:
+            for chunk in self._raw.stream(amt, decode_content=decode_content):
+                self._chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            self._end(type(e).__name__)
+            raise
+        self._end()
+
+    def read(self, amt=None, decode_content=True, **kwargs):
+        chunk = self._raw.read(amt, decode_content=decode_content, **kwargs)
+        self._chunks.append(chunk)
+        if not chunk or amt is None:
+            self._end()
+        return chunk
+
+    def close(self):
+        # 未读完就关闭：超过 HTTP_DEADLINE 或调用方放弃读取
+        self._end("ReadTimeout")
+        self._raw.close()
+
+
+class _ReplayRaw:
+    """回放的响应体，可选按录制的耗时逐步返回，录制时读取中断的在相同位置抛出异常"""
+
+    def __init__(self, body: bytes, error: Optional[str], delay: float):
+        self._body = body
+        self._error = error
+        self._delay = delay
+        self._offset = 0
+
+    def stream(self, amt=None, decode_content=True):
+        amt = amt or len(self._body) or 1
+        while self._offset < len(self._body):
+            yield self.read(amt)
+        if self._delay:
+            time.sleep(self._delay)
+            self._delay = 0
+        # requests 把 urllib3 的异常转换为对应的 requests 异常，与录制时相同
+        message = f"录制时读取响应失败（{self._error}）"
+        if self._error == "ReadTimeout":
+            raise requests.exceptions.ReadTimeout(message)
+        if self._error == "ReadTimeoutError":
+            raise ReadTimeoutError(None, None, message)
+        if self._error == "DecodeError":
+            raise DecodeError(message)
+        if self._error:
+            raise ProtocolError(message)
+
+    def read(self, amt=None, decode_content=True, **kwargs):
+        end = len(self._body) if amt is None else self._offset + amt
+        chunk = self._body[self._offset : end]
+        self._offset += len(chunk)
+        return chunk
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class Cassette:
+    """录制或回放一组 HTTP 请求"""
+
+    def __init__(self, path: str, mode: str, timing: str = "original"):
+        """
+        Args:
+            path (str): 录制文件路径
+            mode (str): record 或 replay
+            timing (str): 回放时 original 按录制的耗时等待，fast 立即返回
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"未知的模式: {mode}")
+        if timing not in TIMINGS:
+            raise ValueError(f"未知的回放速度: {timing}")
+        self.path = path
+        self.mode = mode
+        self.timing = timing
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._start = time.time()
+        self._file = None
+        self._entries: List[Dict[str, Any]] = []
+        self._by_body: Dict[Tuple[str, str, Optional[str]], Deque[int]] = {}
+        self._by_key: Dict[Key, Deque[int]] = {}
+        self._used: set = set()
+
+        if mode == "record":
+            self._file = _open(path, "w")
+            self._write(
+                {
+                    "cassette": 1,
+                    "recorded": datetime.datetime.now().isoformat(timespec="seconds"),
+                }
+            )
+        else:
+            self._load()
+
+    def _write(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + "\n")
+            # 逐条落盘，进程被终止时已录制的请求仍可回放
+            self._file.flush()
+
+    def _load(self):
+        with _open(self.path, "r") as f:
+            for line in f:
+                entry = json.loads(line)
+                if "method" not in entry:
+                    continue
+                index = len(self._entries)
+                self._entries.append(entry)
+                key = request_key(entry["method"], entry["url"])
+                self._by_key.setdefault(key, deque()).append(index)
+                self._by_body.setdefault((*key, entry.get("body")), deque()).append(
+                    index
+                )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _take(self, queue: Optional[Deque[int]]) -> Optional[int]:
+        while queue:
+            index = queue.popleft()
+            if index not in self._used:
+                self._used.add(index)
+                return index
+        return None
+
+    def match(self, method: str, url: str, body: Any) -> Optional[Dict[str, Any]]:
+        """取出与请求对应的下一条录制，请求体相同的优先"""
+        key = request_key(method, url)
+        with self._lock:
+            index = self._take(self._by_body.get((*key, body_digest(body))))
+            if index is None:
+                index = self._take(self._by_key.get(key))
+            if index is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._entries[index]
+
+    def record(self, adapter: HTTPAdapter, send, request, **kwargs):
+        """发出真实请求并录制，响应体在调用方读取时保存"""
+        entry: Dict[str, Any] = {
+            "at": round(time.time() - self._start, 3),
+            "method": request.method,
+            "url": redact_url(request.url),
+        }
+        digest = body_digest(request.body)
+        if digest:
+            entry["body"] = digest
+        start = time.perf_counter()
+        try:
+            response = send(adapter, request, **kwargs)
+        except requests.exceptions.RequestException as e:
+            entry.update(
+                elapsed=round(time.perf_counter() - start, 4),
+                error=type(e).__name__,
+                message=redact_text(str(e), request.url)[:200],
+            )
+            self._write(entry)
+            raise
+
+        entry.update(
+            status=response.status_code,
+            reason=response.reason,
+            headers={
+                name: (
+                    redact_url(response.headers[name])
+                    if name == "Location"
+                    else response.headers[name]
+                )
+                for name in KEPT_HEADERS
+                if name in response.headers
+            },
+            first=round(time.perf_counter() - start, 4),
+        )
+
+        def finish(body: bytes, error: Optional[str]):
+            entry["elapsed"] = round(time.perf_counter() - start, 4)
+            if error:
+                entry["error"] = error
+            _encode_body(entry, body)
+            self._write(entry)
+
+        response.raw = _RecordingRaw(response.raw, finish)
+        return response
+
+    def replay(self, adapter: HTTPAdapter, request, **kwargs) -> requests.Response:
+        """按录制构造响应，不访问网络"""
+        entry = self.match(request.method, request.url, request.body)
+        if entry is None:
+            raise CassetteMiss(
+                f"回放文件中没有该请求: {request.method} {redact_url(request.url)}",
+                request=request,
+            )
+
+        original = self.timing == "original"
+        if "status" not in entry:
+            # 录制时未收到响应：连接失败、超时等
+            if original:
+                time.sleep(entry.get("elapsed", 0))
+            error = getattr(
+                requests.exceptions, entry["error"], requests.exceptions.ConnectionError
+            )
+            raise error(entry.get("message", ""), request=request)
+
+        first = entry.get("first", 0)
+        if original:
+            time.sleep(first)
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason")
+        response.headers = CaseInsensitiveDict(entry.get("headers", {}))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _ReplayRaw(
+            _decode_body(entry),
+            entry.get("error"),
+            max(entry.get("elapsed", first) - first, 0) if original else 0,
+        )
+        response.url = request.url
+        response.request = request
+        response.connection = adapter
+        return response
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self.mode == "replay":
+            unused = len(self._entries) - len(self._used)
+            logging.info(
+                f"HTTP 回放结束: 命中{self.hits}个请求，未命中{self.misses}个，"
+                f"未使用的录制{unused}个"
+            )
+
+
+CASSETTE: Optional[Cassette] = None
+_patched = False
+
+
+def _patch_adapter():
+    """让所有 HTTPAdapter 经过当前的录制或回放"""
+    global _patched
+    if _patched:
+        return
+    _patched = True
+
+    send = HTTPAdapter.send
+
+    def cassette_send(adapter, request, **kwargs):
+        cassette = CASSETTE
+        if cassette is None:
+            return send(adapter, request, **kwargs)
+        if cassette.mode == "replay":
+            return cassette.replay(adapter, request, **kwargs)
+        return cassette.record(adapter, send, request, **kwargs)
+
+    HTTPAdapter.send = cassette_send
+
+
+def configure(
+    record: Optional[str] = None,
+    replay: Optional[str] = None,
+    timing: Optional[str] = None,
+):
+    """
+    按参数或环境变量启用录制或回放
+
+    Args:
+        record (str, optional): 录制文件，默认读取 HTTP_RECORD
+        replay (str, optional): 回放文件，默认读取 HTTP_REPLAY，与录制同时指定时只回放
+        timing (str, optional): 回放速度 original / fast，默认读取 HTTP_REPLAY_TIMING
+    """
+    global CASSETTE
+    record = os.environ.get("HTTP_RECORD") if record is None else record
+    replay = os.environ.get("HTTP_REPLAY") if replay is None else replay
+    timing = timing or os.environ.get("HTTP_REPLAY_TIMING") or "original"
+
+    close()
+    if replay:
+        CASSETTE = Cassette(replay, "replay", timing)
+        logging.info(
+            f"HTTP 回放: {replay}（{len(CASSETTE)}个请求，{timing}），不访问网络"
+        )
+    elif record:
+        CASSETTE = Cassette(record, "record")
+        logging.info(f"HTTP 录制: {record}")
+    else:
+        return
+    _patch_adapter()
+
+
+def close():
+    """结束录制或回放"""
+    global CASSETTE
+    if CASSETTE is not None:
+        CASSETTE.close()
+        CASSETTE = None
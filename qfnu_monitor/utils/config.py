@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+配置加载组件
+从项目根目录的 .env 读取环境变量，并支持在 .env 修改后重新加载
+
+各命令行入口在读取配置之前调用一次 load_env()，其他模块导入时不读取 .env；
+没有 .env 时（如 GitHub Actions 直接设置环境变量）不导入 python-dotenv
+"""
+
+import os
+import threading
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+PROJECT_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir)
+)
+ENV_FILE = os.path.join(PROJECT_ROOT, ".env")
+
+
+def default_data_dir() -> str:
+    """各命令行入口默认的数据目录（项目根目录下的 data）"""
+    return os.path.join(PROJECT_ROOT, "data")
+
+
+_lock = threading.Lock()
+_env_mtime: Optional[float] = None
+# 由 .env 写入的变量，重新加载时只更新这些变量，不覆盖进程本身的环境变量
+_env_loaded: Dict[str, str] = {}
+
+
+def _env_file_mtime() -> float:
+    try:
+        return os.path.getmtime(ENV_FILE)
+    except OSError:
+        return 0.0
+
+
+def _apply_env_file():
+    """读取 .env，写入未被进程环境显式设置的变量"""
+    global _env_mtime
+    values = {}
+    if os.path.exists(ENV_FILE):
+        from dotenv import dotenv_values
+
+        values = dotenv_values(ENV_FILE)
+    for key, value in values.items():
+        if value is None:
+            continue
+        current = os.environ.get(key)
+        if current is None or _env_loaded.get(key) == current:
+            os.environ[key] = value
+            _env_loaded[key] = value
+    # .env 中已删除的变量也从环境中移除
+    for key in list(_env_loaded):
+        if key not in values and os.environ.get(key) == _env_loaded[key]:
+            del os.environ[key]
+            del _env_loaded[key]
+    _env_mtime = _env_file_mtime()
+
+
+def load_env():
+    """加载 .env（只在第一次调用时读取文件）"""
+    with _lock:
+        if _env_mtime is None:
+            _apply_env_file()
+
+
+def reload_env_if_changed() -> bool:
+    """
+    .env 修改后重新加载
+
+    Returns:
+        bool: 是否重新加载
+    """
+    with _lock:
+        if _env_mtime is None:
+            _apply_env_file()
+            return False
+        if _env_file_mtime() == _env_mtime:
+            return False
+        _apply_env_file()
+    logging.info("检测到 .env 变化，已重新加载配置")
+    return True
+
+
+def env_fingerprint(keys: Iterable[str]) -> Tuple[Optional[str], ...]:
+    """一组环境变量当前取值，用于判断配置是否变化"""
+    return tuple(os.environ.get(key) for key in keys)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OneBot 群消息投递引擎
+面向大量群组的推送：
+- 群组按所属账号（见群组注册表）分组，每个账号的群组按群号哈希分到多个分片，
+  每个分片一个工作线程（分片数为账号的 max_workers），同一群组的多条消息由同一线程按顺序发送
+- 每次发送先取账号的令牌桶（账号的 rate_limit），再取所有账号共用的全局令牌桶
+  （ONEBOT_GLOBAL_RATE_LIMIT，0 表示不限），总速率不超过平台限制
+- 每条消息送达后立即回调，发件箱据此写入检查点，进程中断后从断点继续
+- 统计每次投递的条数、成功失败数、耗时和吞吐（条/秒），并按账号分别统计
+"""
+
+import json
+import os
+import time
+import logging
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from qfnu_monitor.utils import metrics, tracing
+from qfnu_monitor.utils.groups import DEFAULT_ACCOUNT, get_registry
+from qfnu_monitor.utils.onebot import OneBotSender, get_onebot_sender
+from qfnu_monitor.utils.ratelimit import get_bucket
+
+# 全局令牌桶的键，所有账号共用
+GLOBAL_BUCKET_KEY = "onebot#global"
+
+
+class DeliveryEngine:
+    """分片并发的 OneBot 群消息投递引擎"""
+
+    def __init__(self, global_rate: Optional[float] = None):
+        """
+        初始化投递引擎
+
+        Args:
+            global_rate (float, optional): 所有账号合计每秒最多发送条数，
+                默认读取 ONEBOT_GLOBAL_RATE_LIMIT，0 表示不限
+        """
+        self._global_rate = global_rate
+        self._senders: Dict[str, Tuple[str, OneBotSender]] = {}
+        self._lock = threading.Lock()
+        # 最近一次投递的统计
+        self.last_stats: Optional[Dict[str, Any]] = None
+
+    @property
+    def global_rate(self) -> float:
+        if self._global_rate is not None:
+            return self._global_rate
+        return float(os.environ.get("ONEBOT_GLOBAL_RATE_LIMIT", "0"))
+
+    def sender(self, account: str, acquire: bool = False) -> OneBotSender:
+        """
+        获取账号的发送器，账号配置变化时重建，旧发送器在进行中的发送结束后关闭
+
+        Args:
+            account (str): 账号名
+            acquire (bool): 同时标记为使用中，发送结束后须调用 release()
+
+        Raises:
+            ValueError: 账号未配置
+        """
+        if account == DEFAULT_ACCOUNT:
+            return get_onebot_sender(acquire)
+
+        options = get_registry().accounts.get(account)
+        if options is None:
+            raise ValueError(f"OneBot账号未配置: {account}")
+        fingerprint = json.dumps(options, sort_keys=True)
+        with self._lock:
+            cached = self._senders.get(account)
+            if cached is None or cached[0] != fingerprint:
+                previous = cached
+                cached = (fingerprint, OneBotSender.from_account(options))
+                self._senders[account] = cached
+                if previous is not None:
+                    # 旧发送器可能仍有分片在发送，发送结束后再关闭
+                    previous[1].retire()
+            if acquire:
+                cached[1].acquire()
+            return cached[1]
+
+    def capacity(self, accounts: Iterable[str]) -> float:
+        """
+        这些账号合计的每秒发送上限
+
+        Returns:
+            float: 每秒条数，0 表示不限
+        """
+        total = 0.0
+        for account in set(accounts):
+            try:
+                rate = self.sender(account).rate_limit
+            except ValueError:
+                continue
+            if rate <= 0:
+                total = 0.0
+                break
+            total += rate
+        if self.global_rate > 0:
+            total = self.global_rate if total <= 0 else min(total, self.global_rate)
+        return total
+
+    def _shards(
+        self, group_ids: Iterable[str], errors: Dict[str, str]
+    ) -> Dict[Tuple[str, int], List[str]]:
+        """按账号和群号哈希分片，账号不可用的群组记入 errors"""
+        registry = get_registry()
+        shards: Dict[Tuple[str, int], List[str]] = {}
+        for group_id in group_ids:
+            account = registry.account_of(group_id)
+            try:
+                workers = self.sender(account).max_workers
+            except ValueError as e:
+                errors[group_id] = str(e)
+                continue
+            shard = zlib.crc32(group_id.encode("utf-8")) % workers
+            shards.setdefault((account, shard), []).append(group_id)
+        return shards
+
+    def deliver(
+        self,
+        jobs: Dict[str, List[Tuple[str, Any]]],
+        on_delivered: Callable[[str], None],
+    ) -> Dict[str, Any]:
+        """
+        投递消息
+
+        Args:
+            jobs (dict): 群号 -> [(幂等键, 消息)]，同一群组按顺序发送，
+                某条失败时不再发送该群组的后续消息
+            on_delivered (callable): 每条送达后以 "幂等键:群号" 调用（可能在多个线程中调用）
+
+        Returns:
+            dict: 统计信息，messages、sent、failed（失败的群组数）、elapsed、
+                throughput（条/秒）、accounts（按账号的 sent、failed）、errors（群号 -> 错误）
+        """
+        start = time.perf_counter()
+        errors: Dict[str, str] = {}
+        shards = self._shards(jobs, errors)
+        global_rate = self.global_rate
+        global_bucket = (
+            get_bucket(GLOBAL_BUCKET_KEY, global_rate) if global_rate > 0 else None
+        )
+
+        def run(account: str, group_ids: List[str]) -> Tuple[str, int, int]:
+            # 整个分片发送期间标记为使用中，配置变化时旧发送器等分片发完再关闭
+            sender = self.sender(account, acquire=True)
+            try:
+                bucket = get_bucket(
+                    sender.endpoint, sender.rate_limit, sender.rate_burst
+                )
+                sent = failed = 0
+                for group_id in group_ids:
+                    for key, message in jobs[group_id]:
+                        bucket.acquire()
+                        if global_bucket is not None:
+                            global_bucket.acquire()
+                        with tracing.span(
+                            "onebot send", "notify", account=account, group=group_id
+                        ) as span:
+                            result = sender.send_group_message(group_id, message)
+                            if "error" in result:
+                                span.set(error=result["error"])
+                        if "error" in result:
+                            errors[group_id] = result["error"]
+                            failed += 1
+                            break
+                        on_delivered(f"{key}:{group_id}")
+                        sent += 1
+            finally:
+                sender.release()
+            return account, sent, failed
+
+        accounts: Dict[str, Dict[str, int]] = {}
+        if shards:
+            with ThreadPoolExecutor(
+                max_workers=len(shards), thread_name_prefix="onebot-shard"
+            ) as executor:
+                futures = [
+                    executor.submit(run, account, group_ids)
+                    for (account, _), group_ids in shards.items()
+                ]
+                for future in futures:
+                    account, sent, failed = future.result()
+                    stats = accounts.setdefault(account, {"sent": 0, "failed": 0})
+                    stats["sent"] += sent
+                    stats["failed"] += failed
+
+        elapsed = time.perf_counter() - start
+        sent = sum(stats["sent"] for stats in accounts.values())
+        summary = {
+            "messages": sum(len(parts) for parts in jobs.values()),
+            "sent": sent,
+            "failed": len(errors),
+            "elapsed": round(elapsed, 3),
+            "throughput": round(sent / elapsed, 1) if elapsed > 0 else 0.0,
+            "accounts": accounts,
+            "errors": errors,
+        }
+        self.last_stats = summary
+        for account, stats in accounts.items():
+            metrics.ONEBOT_MESSAGES.inc(stats["sent"], account=account, result="sent")
+            metrics.ONEBOT_MESSAGES.inc(
+                stats["failed"], account=account, result="failed"
+            )
+        if summary["messages"]:
+            metrics.ONEBOT_THROUGHPUT.set(summary["throughput"])
+            per_account = "，".join(
+                f"{account} {stats['sent']}条" for account, stats in accounts.items()
+            )
+            logging.info(
+                f"OneBot投递完成: {sent}/{summary['messages']}条，"
+                f"{len(errors)}个群组失败，耗时{summary['elapsed']}秒，"
+                f"{summary['throughput']}条/秒（{per_account}）"
+            )
+        return summary
+
+
+_engine: Optional[DeliveryEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_delivery_engine() -> DeliveryEngine:
+    """获取共享的投递引擎"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = DeliveryEngine()
+        return _engine
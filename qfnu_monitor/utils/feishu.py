@@ -1,14 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+飞书自定义机器人消息发送组件
+复用连接、按自定义机器人的频率限制限流（每秒 5 次、每分钟 100 次），
+遇到限流错误时退避重试，超过请求体大小限制的内容按公告边界切分为多条按顺序发送
+
+便捷函数 feishu() 共用一个长期存在的客户端，相关环境变量或 .env 变化时自动重建
+"""
+
 import time
 import hmac
 import hashlib
 import base64
 import requests
 import json
-import os
 import logging
-from dotenv import load_dotenv
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from qfnu_monitor.utils import metrics, tracing
+from qfnu_monitor.utils.config import env_fingerprint, reload_env_if_changed
+from qfnu_monitor.utils.message import (
+    build_card,
+    json_length,
+    pack_items,
+    split_message,
+)
+from qfnu_monitor.utils.ratelimit import get_bucket
+
+# 影响客户端的环境变量，任一变化都会重建共享客户端
+FEISHU_CONFIG_KEYS = ("FEISHU_BOT_URL", "FEISHU_BOT_SECRET")
+
+# 飞书自定义机器人请求体不超过 20KB，预留签名、标题等字段的空间
+FEISHU_CONTENT_LIMIT = 18 * 1024
+
+# 飞书限流错误码：9499 请求过于频繁，11232 触发频控
+RATE_LIMIT_CODES = (9499, 11232)
+
+
+class FeishuClient:
+    """飞书自定义机器人客户端"""
+
+    def __init__(
+        self,
+        webhook_url: str,
+        secret: str,
+        timeout: float = 10,
+        max_retries: int = 3,
+        rate_per_second: float = 5,
+        rate_per_minute: float = 100,
+    ):
+        """
+        初始化飞书客户端
+
+        Args:
+            webhook_url (str): 机器人 webhook 地址
+            secret (str): 机器人签名校验密钥
+            timeout (float): 请求超时秒数
+            max_retries (int): 遇到限流或网络错误时的最大重试次数
+            rate_per_second (float): 每秒最多请求数
+            rate_per_minute (float): 每分钟最多请求数
+        """
+        self.webhook_url = webhook_url
+        self.secret = secret
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+        # 同一机器人的两个限额，多个客户端实例共用
+        self.second_bucket = get_bucket(webhook_url, rate_per_second)
+        self.minute_bucket = get_bucket(
+            f"{webhook_url}#minute", rate_per_minute / 60, rate_per_minute
+        )
+
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
+
+    def _sign(self, timestamp: str) -> str:
+        """计算签名"""
+        string_to_sign = f"{timestamp}\n{self.secret}"
+        hmac_code = hmac.new(
+            string_to_sign.encode("utf-8"), digestmod=hashlib.sha256
+        ).digest()
+        return base64.b64encode(hmac_code).decode("utf-8")
+
+    def split(self, title: str, content: str) -> List[Tuple[str, str]]:
+        """
+        按请求体大小限制切分消息
+
+        Args:
+            title (str): 消息标题
+            content (str): 消息内容
+
+        Returns:
+            List[Tuple[str, str]]: 各部分的 (标题, 内容)，切分后标题带有序号
+        """
+        parts = split_message(content, FEISHU_CONTENT_LIMIT, json_length)
+        if len(parts) == 1:
+            return [(title, content)]
+        return [
+            (f"{title}（{index}/{len(parts)}）", part)
+            for index, part in enumerate(parts, 1)
+        ]
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        # 4xx、5xx 的 Response 布尔值为 False，需要与 None 区分
+        retry_after = (
+            response.headers.get("Retry-After") if response is not None else None
+        )
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return min(2**attempt, 30)
+
+    def split_card(
+        self, title: str, elements: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        按请求体大小限制把卡片元素分成多张卡片
+
+        Args:
+            title (str): 卡片标题
+            elements (list): 卡片元素
+
+        Returns:
+            List[dict]: 各张卡片，多张时标题带有序号
+        """
+        groups = pack_items(
+            elements, FEISHU_CONTENT_LIMIT, lambda element: len(json.dumps(element))
+        )
+        cards = []
+        for index, group in enumerate(groups, 1):
+            # 分割线不放在卡片开头
+            while group and group[0].get("tag") == "hr":
+                group = group[1:]
+            part_title = (
+                title if len(groups) == 1 else f"{title}（{index}/{len(groups)}）"
+            )
+            cards.append(build_card(part_title, group))
+        return cards
+
+    def send_post(self, title: str, content: str) -> Dict[str, Any]:
+        """
+        发送一条富文本消息（不切分），限流时退避重试
+
+        Args:
+            title (str): 消息标题
+            content (str): 消息内容
+
+        Returns:
+            dict: 接口返回结果，失败时包含 error
+        """
+        return self._send(
+            {
+                "msg_type": "post",
+                "content": {
+                    "post": {
+                        "zh_cn": {
+                            "title": title,
+                            "content": [[{"tag": "text", "text": content}]],
+                        }
+                    }
+                },
+            }
+        )
+
+    def send_card(self, card: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        发送一张消息卡片（不切分），限流时退避重试
+
+        Args:
+            card (dict): 卡片内容，见 message.build_card
+
+        Returns:
+            dict: 接口返回结果，失败时包含 error
+        """
+        return self._send({"msg_type": "interactive", "card": card})
+
+    def _send(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """签名并发送消息，限流或网络错误时退避重试"""
+        error = "未知错误"
+        for attempt in range(self.max_retries + 1):
+            self.second_bucket.acquire()
+            self.minute_bucket.acquire()
+
+            # 签名时间戳需与发送时间接近，每次请求重新计算
+            timestamp = str(int(time.time()))
+            msg = {"timestamp": timestamp, "sign": self._sign(timestamp), **payload}
+
+            response = None
+            try:
+                with tracing.span("feishu send", "notify", attempt=attempt) as span:
+                    response = self.session.post(
+                        self.webhook_url, data=json.dumps(msg), timeout=self.timeout
+                    )
+                    span.set(status=response.status_code)
+                result = response.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                error = f"网络请求失败: {str(e)}"
+                status = response.status_code if response is not None else None
+                # 4xx（限流除外）重试也不会成功
+                if status and 400 <= status < 500 and status != 429:
+                    break
+            else:
+                code = result.get("code", result.get("StatusCode", 0))
+                if response.status_code != 429 and not code:
+                    logging.info(f"飞书发送通知消息成功🎉\n{result}")
+                    return result
+                error = result.get("msg") or f"飞书返回错误码{code}"
+                if response.status_code != 429 and code not in RATE_LIMIT_CODES:
+                    break
+
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt, response)
+                logging.warning(f"飞书发送失败，{delay:.0f}秒后重试: {error}")
+                metrics.RETRIES.inc(channel="feishu", kind="request")
+                time.sleep(delay)
+
+        logging.error(f"飞书发送通知消息失败😞\n{error}")
+        return {"error": error}
+
+    def send(self, title: str, content: str) -> Dict[str, Any]:
+        """
+        发送消息，超过大小限制时切分为多条按顺序发送，某一条失败时不再发送后续部分
+
+        Args:
+            title (str): 消息标题
+            content (str): 消息内容
+
+        Returns:
+            dict: 最后一条的接口返回结果，失败时包含 error
+        """
+        result: Dict[str, Any] = {}
+        for part_title, part_content in self.split(title, content):
+            result = self.send_post(part_title, part_content)
+            if "error" in result:
+                break
+        return result
 
-load_dotenv()
+
+_client: Optional[FeishuClient] = None
+_client_fingerprint = None
+_client_lock = threading.Lock()
+
+
+def get_feishu_client() -> FeishuClient:
+    """
+    获取共享的飞书客户端
+
+    首次调用时创建，之后直接复用；.env 或相关环境变量变化时重新创建
+
+    Returns:
+        FeishuClient: 客户端
+
+    Raises:
+        ValueError: 飞书webhook未配置
+    """
+    global _client, _client_fingerprint
+
+    reload_env_if_changed()
+    fingerprint = env_fingerprint(FEISHU_CONFIG_KEYS)
+    with _client_lock:
+        if _client is None or fingerprint != _client_fingerprint:
+            webhook_url, secret = fingerprint
+            if not webhook_url or not secret:
+                raise ValueError("飞书webhook未配置")
+            _client = FeishuClient(webhook_url, secret)
+            _client_fingerprint = fingerprint
+        return _client
 
 
 def feishu(title: str, content: str) -> dict:
@@ -22,51 +287,9 @@ def feishu(title: str, content: str) -> dict:
     Returns:
         dict: 接口返回结果
     """
-    # 读取环境变量
-    FEISHU_BOT_URL = os.environ.get("FEISHU_BOT_URL")
-    FEISHU_BOT_SECRET = os.environ.get("FEISHU_BOT_SECRET")
-
-    if not FEISHU_BOT_URL or not FEISHU_BOT_SECRET:
-        logging.error("飞书webhook未配置")
-        return {"error": "飞书webhook未配置"}
-
-    feishu_webhook = FEISHU_BOT_URL
-    feishu_secret = FEISHU_BOT_SECRET
-    timestamp = str(int(time.time()))
-
-    # 计算签名
-    string_to_sign = f"{timestamp}\n{feishu_secret}"
-    hmac_code = hmac.new(
-        string_to_sign.encode("utf-8"), digestmod=hashlib.sha256
-    ).digest()
-    sign = base64.b64encode(hmac_code).decode("utf-8")
-
-    # 构建请求头
-    headers = {"Content-Type": "application/json"}
-
-    # 构建消息内容
-    msg = {
-        "timestamp": timestamp,
-        "sign": sign,
-        "msg_type": "post",
-        "content": {
-            "post": {
-                "zh_cn": {
-                    "title": title,
-                    "content": [[{"tag": "text", "text": content}]],
-                }
-            }
-        },
-    }
-
-    # 发送请求
     try:
-        if not isinstance(feishu_webhook, str):
-            logging.error(f"飞书webhook未配置")
-            return {"error": "飞书webhook未配置"}
-        response = requests.post(feishu_webhook, headers=headers, data=json.dumps(msg))
-        logging.info(f"飞书发送通知消息成功🎉\n{response.json()}")
-        return response.json()
-    except Exception as e:
-        logging.error(f"飞书发送通知消息失败😞\n{e}")
+        client = get_feishu_client()
+    except ValueError as e:
+        logging.error(str(e))
         return {"error": str(e)}
+    return client.send(title, content)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OneBot 群组注册表
+群组较多时不再写在 ONEBOT_TARGET_GROUPS 中，而是保存在注册表文件里，
+并可以分配给不同的机器人账号：
+
+    {
+        "accounts": {
+            "bot2": {"http_url": "http://127.0.0.1:5701", "rate_limit": 5}
+        },
+        "groups": {
+            "123456": {},
+            "654321": {"account": "bot2", "name": "招生咨询群"},
+            "111111": {"enabled": false}
+        }
+    }
+
+- accounts 中的键为去掉 ONEBOT_ 前缀的小写环境变量名（transport、http_url、ws_url、
+  access_token、rate_limit、rate_burst、max_workers）
+- 未指定账号的群组使用环境变量配置的默认账号 default
+- ONEBOT_TARGET_GROUPS 中的群组同样属于 default 账号
+
+注册表文件默认为项目根目录的 groups.json，可用环境变量 ONEBOT_GROUPS_FILE 指定，
+可用 python -m qfnu_monitor.groups 管理。账号配置可能包含 access_token，文件不纳入版本库
+（见 examples/groups.example.json）
+"""
+
+import json
+import os
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+from qfnu_monitor.utils.config import PROJECT_ROOT
+from qfnu_monitor.utils.storage import write_json
+
+DEFAULT_GROUPS_FILE = os.path.join(PROJECT_ROOT, "groups.json")
+
+# 由环境变量配置的账号
+DEFAULT_ACCOUNT = "default"
+
+
+class GroupRegistry:
+    """OneBot 群组注册表"""
+
+    def __init__(self, path: Optional[str]):
+        """
+        加载注册表，文件不存在时为空
+
+        Args:
+            path (str, optional): 注册表文件路径，为空时为空注册表
+        """
+        self.path = path
+        self.accounts: Dict[str, Dict[str, Any]] = {}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.accounts = data.get("accounts", {})
+            groups = data.get("groups", {})
+            # 也支持只写群号列表
+            if isinstance(groups, list):
+                groups = {group_id: {} for group_id in groups}
+            self.entries = {str(k): dict(v or {}) for k, v in groups.items()}
+
+        unknown = {
+            entry["account"]
+            for entry in self.entries.values()
+            if entry.get("account", DEFAULT_ACCOUNT) != DEFAULT_ACCOUNT
+            and entry["account"] not in self.accounts
+        }
+        if unknown:
+            logging.warning(f"群组注册表中的账号未配置: {', '.join(sorted(unknown))}")
+
+    def groups(self, extra: Iterable[str] = ()) -> Dict[str, str]:
+        """
+        启用的群组及其账号
+
+        Args:
+            extra (Iterable[str]): 注册表之外的群组（如 ONEBOT_TARGET_GROUPS 中的），
+                已在注册表中的以注册表为准
+
+        Returns:
+            Dict[str, str]: 群号 -> 账号名
+        """
+        groups = {str(group_id): DEFAULT_ACCOUNT for group_id in extra}
+        for group_id, entry in self.entries.items():
+            if not entry.get("enabled", True):
+                groups.pop(group_id, None)
+                continue
+            groups[group_id] = entry.get("account", DEFAULT_ACCOUNT)
+        return groups
+
+    def account_of(self, group_id: str) -> str:
+        """群组所属的账号，未登记的群组属于默认账号"""
+        return self.entries.get(str(group_id), {}).get("account", DEFAULT_ACCOUNT)
+
+    def add(self, group_ids: Iterable[str], account: Optional[str] = None, **fields):
+        """登记群组（已存在时更新），account 为空时使用默认账号"""
+        for group_id in group_ids:
+            entry = self.entries.setdefault(str(group_id), {})
+            entry.update(fields)
+            if account and account != DEFAULT_ACCOUNT:
+                entry["account"] = account
+            elif account:
+                entry.pop("account", None)
+
+    def remove(self, group_ids: Iterable[str]) -> int:
+        """移除群组，返回实际移除的数量"""
+        return sum(
+            self.entries.pop(str(group_id), None) is not None for group_id in group_ids
+        )
+
+    def save(self):
+        """写回注册表文件"""
+        write_json(self.path, {"accounts": self.accounts, "groups": self.entries})
+
+
+_registry: Optional[GroupRegistry] = None
+_registry_key: Optional[Tuple[str, float]] = None
+_registry_lock = threading.Lock()
+
+
+def groups_file() -> str:
+    """注册表文件路径"""
+    return os.environ.get("ONEBOT_GROUPS_FILE") or DEFAULT_GROUPS_FILE
+
+
+def get_registry() -> GroupRegistry:
+    """
+    获取共享的群组注册表，文件修改后重新加载
+
+    文件格式错误时记录错误并继续使用上一次的注册表
+
+    Returns:
+        GroupRegistry: 群组注册表
+    """
+    global _registry, _registry_key
+
+    path = groups_file()
+    try:
+        key = (path, os.path.getmtime(path))
+    except OSError:
+        key = (path, 0.0)
+
+    with _registry_lock:
+        if _registry is None or key != _registry_key:
+            try:
+                _registry = GroupRegistry(path)
+                if key[1]:
+                    logging.info(
+                        f"已加载群组注册表: {path}（{len(_registry.entries)}个群组）"
+                    )
+            except (ValueError, AttributeError, TypeError) as e:
+                logging.error(f"群组注册表 {path} 格式错误: {e}")
+                if _registry is None:
+                    _registry = GroupRegistry(None)
+            _registry_key = key
+        return _registry
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+抓取网站用的 HTTP 客户端
+所有监控器共用一个 requests.Session（复用连接），请求经过一串中间件后再真正发出：
+
+    def middleware(send, method, url, **kwargs):
+        response = send(method, url, **kwargs)
+        ...
+        return response
+
+    add_middleware(middleware)
+
+- 每个请求的耗时和状态码记入运行指标（按 metrics.current_site 标记网站），
+  响应字节数累加到所在阶段的事件（见 instrument），启用追踪时记录一个 span（见 tracing）
+- 未指定 timeout 的请求使用 HTTP_TIMEOUT（秒，默认 30），这是连接和每次读取的超时；
+  整个请求（含读取响应体）不超过 HTTP_DEADLINE（秒，默认 60），服务器缓慢地逐段发送
+  响应体时也会按时失败
+- get_html() 检查状态码和页面是否完整，避免把错误页或被截断的页面当作公告列表解析
+"""
+
+import os
+import time
+import threading
+from functools import partial
+from typing import Callable, List, Optional
+from urllib.parse import urlsplit
+import requests
+from qfnu_monitor.utils import instrument, metrics, tracing
+
+Send = Callable[..., requests.Response]
+Middleware = Callable[..., requests.Response]
+
+# 读取响应体的块大小
+CHUNK_SIZE = 16 * 1024
+
+_middlewares: List[Middleware] = []
+
+
+def add_middleware(middleware: Middleware, first: bool = False):
+    """
+    添加中间件
+
+    Args:
+        middleware (callable): middleware(send, method, url, **kwargs) -> Response
+        first (bool): 放在最外层（最先执行），默认放在最内层
+    """
+    if first:
+        _middlewares.insert(0, middleware)
+    else:
+        _middlewares.append(middleware)
+
+
+def remove_middleware(middleware: Middleware):
+    """移除中间件，不存在时忽略"""
+    if middleware in _middlewares:
+        _middlewares.remove(middleware)
+
+
+def _instrument(send: Send, method: str, url: str, **kwargs) -> requests.Response:
+    """记录请求耗时、状态码和字节数"""
+    site = metrics.current_site.get()
+    host = urlsplit(url).hostname or ""
+    start = time.perf_counter()
+    with tracing.span(f"HTTP {method}", "http", site=site, url=url) as span:
+        try:
+            response = send(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            metrics.HTTP_RESPONSES.inc(site=site, status="error")
+            raise
+        finally:
+            metrics.HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start, site=site, host=host
+            )
+        metrics.HTTP_RESPONSES.inc(site=site, status=response.status_code)
+        size = 0 if kwargs.get("stream") else len(response.content)
+        instrument.current_event.get().add("bytes", size)
+        span.set(host=host, status=response.status_code, bytes=size)
+    return response
+
+
+class IncompletePageError(ValueError):
+    """页面不完整（被截断）"""
+
+
+class HttpSession(requests.Session):
+    """经过中间件发送请求的 Session"""
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = float(os.environ.get("HTTP_TIMEOUT", "30"))
+        send = super().request
+        for middleware in reversed([_instrument, *_middlewares]):
+            send = partial(middleware, send)
+        return send(method, url, **kwargs)
+
+    def send(self, request, **kwargs):
+        """按块读取响应体，超过 HTTP_DEADLINE 时抛出 ReadTimeout"""
+        stream = kwargs.get("stream", False)
+        limit = float(os.environ.get("HTTP_DEADLINE", "60"))
+        deadline = time.monotonic() + limit
+        kwargs["stream"] = True
+        response = super().send(request, **kwargs)
+        if stream:
+            return response
+
+        chunks = []
+        try:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                chunks.append(chunk)
+                if time.monotonic() > deadline:
+                    raise requests.exceptions.ReadTimeout(
+                        f"读取响应超过 {limit:g} 秒",
+                        request=request,
+                        response=response,
+                    )
+        except BaseException:
+            response.close()
+            raise
+        # 与 requests 非流式读取的结果相同，之后 response.content 直接返回
+        response._content = b"".join(chunks)
+        response._content_consumed = True
+        return response
+
+
+_session: Optional[HttpSession] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> HttpSession:
+    """获取共享的 Session"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = HttpSession()
+        return _session
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """用共享的 Session 发送 GET 请求"""
+    return get_session().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """用共享的 Session 发送 POST 请求"""
+    return get_session().post(url, **kwargs)
+
+
+def get_html(url: str, **kwargs) -> str:
+    """
+    获取网页 HTML（UTF-8）
+
+    Args:
+        url (str): 网页地址
+        **kwargs: 传给 requests 的其他参数，如 headers、timeout
+
+    Returns:
+        str: HTML 内容
+
+    Raises:
+        requests.HTTPError: 状态码为 4xx、5xx
+        IncompletePageError: 页面以 <html> 开始却没有 </html>，即被截断
+    """
+    response = get(url, **kwargs)
+    response.raise_for_status()
+    response.encoding = "utf-8"
+    html = response.text
+    head = html[:1024].lower()
+    if "<html" in head and "</html>" not in html[-1024:].lower():
+        raise IncompletePageError(f"页面不完整（{len(response.content)} 字节）: {url}")
+    return html
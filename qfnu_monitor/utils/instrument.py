@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+监控阶段埋点
+monitor() 的每个阶段（fetch、parse、load、diff、push、save）用 stage() 包住，
+除记录运行指标（见 metrics）外，还产生一条结构化事件：
+
+    {"ts": 1700000000.123, "cycle": "20240101-120000", "site": "jwc_gg",
+     "stage": "fetch", "duration": 0.412, "ok": true, "bytes": 35120}
+
+- 事件交给已注册的输出（sink），内置 JSON Lines 文件输出，也可以 add_sink() 注册任意函数
+- 阶段内可用 event.set() 附加字段，如公告数；阶段内的 HTTP 请求自动累加响应字节数
+- 每轮结束时按网站和阶段汇总耗时，输出一张表
+- 启用链路追踪时每个阶段同时是一个 span（见 tracing）
+- 没有输出、不需要汇总且未启用追踪时为空操作，只记录运行指标
+
+STAGE_EVENTS 指定事件文件（"-" 为标准错误输出），STAGE_SUMMARY=0 关闭每轮的汇总表；
+事件文件可以用 python -m qfnu_monitor.stages 统计各阶段耗时的分位数
+"""
+
+import datetime
+import json
+import os
+import sys
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from qfnu_monitor.utils import metrics, tracing
+
+Sink = Callable[[Dict[str, Any]], None]
+
+# 汇总表的列顺序，其他阶段排在后面
+STAGE_ORDER = ("fetch", "parse", "load", "diff", "push", "save", "total")
+
+
+class StageEvent:
+    """一个阶段的事件，阶段结束时发出"""
+
+    __slots__ = ("site", "stage", "fields")
+
+    def __init__(self, site: str, stage: str):
+        self.site = site
+        self.stage = stage
+        self.fields: Dict[str, Any] = {}
+
+    def set(self, **fields):
+        """附加字段"""
+        self.fields.update(fields)
+
+    def add(self, name: str, amount: int):
+        """累加数值字段"""
+        self.fields[name] = self.fields.get(name, 0) + amount
+
+
+class _NullEvent:
+    """空操作模式下的事件，附加的字段直接丢弃"""
+
+    __slots__ = ()
+
+    def set(self, **fields):
+        pass
+
+    def add(self, name: str, amount: int):
+        pass
+
+
+NULL_EVENT = _NullEvent()
+
+# 当前所在阶段的事件，HTTP 请求据此累加字节数
+current_event: ContextVar[Any] = ContextVar("current_event", default=NULL_EVENT)
+
+
+class JsonLinesSink:
+    """把事件逐行写入 JSON Lines 文件（可在多个线程中调用）"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): 文件路径，"-" 表示标准错误输出
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        if path != "-":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def __call__(self, event: Dict[str, Any]):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self.path == "-":
+                sys.stderr.write(line)
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class Recorder:
+    """阶段事件的分发和每轮汇总"""
+
+    def __init__(self):
+        self.sinks: List[Sink] = []
+        self.summary = True
+        self.cycle = ""
+        self._lock = threading.Lock()
+        # (网站, 阶段) -> [次数, 总耗时, 错误数]
+        self._totals: Dict[Tuple[str, str], List[float]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks) or self.summary
+
+    def emit(self, event: Dict[str, Any]):
+        if self.summary:
+            key = (event["site"], event["stage"])
+            with self._lock:
+                totals = self._totals.setdefault(key, [0, 0.0, 0])
+                totals[0] += 1
+                totals[1] += event["duration"]
+                totals[2] += not event["ok"]
+        for sink in self.sinks:
+            try:
+                sink(event)
+            except Exception as e:
+                logging.error(f"阶段事件输出失败: {e}")
+
+    def begin_cycle(self):
+        """开始新一轮，清空上一轮的汇总"""
+        self.cycle = datetime.datetime.now().strftime("%Y%m%d-%H%M%S.%f")[:-3]
+        with self._lock:
+            self._totals.clear()
+
+    def summary_table(self) -> str:
+        """
+        本轮各网站各阶段的耗时表（毫秒，多次调用的阶段为合计，出错的阶段带 !）
+
+        Returns:
+            str: 表格文本，本轮没有事件时为空字符串
+        """
+        with self._lock:
+            totals = dict(self._totals)
+        if not totals:
+            return ""
+
+        stages = sorted(
+            {stage for _, stage in totals},
+            key=lambda s: (STAGE_ORDER.index(s) if s in STAGE_ORDER else 99, s),
+        )
+        sites = sorted({site for site, _ in totals})
+        width = max(len(site) for site in sites) + 2
+        lines = [f"{'网站':<{width - 2}}" + "".join(f"{s:>10}" for s in stages)]
+        for site in sites:
+            cells = []
+            for stage in stages:
+                count, duration, errors = totals.get((site, stage), (0, 0.0, 0))
+                cell = f"{duration * 1000:.1f}" if count else "-"
+                cells.append(f"{cell + ('!' if errors else ''):>10}")
+            lines.append(f"{site:<{width}}" + "".join(cells))
+        return "\n".join(lines)
+
+
+RECORDER = Recorder()
+
+
+def configure(events: Optional[str] = None, summary: Optional[bool] = None):
+    """
+    按参数或环境变量配置输出
+
+    Args:
+        events (str, optional): 事件文件路径，默认读取 STAGE_EVENTS，为空时不输出事件
+        summary (bool, optional): 是否每轮输出汇总表，默认读取 STAGE_SUMMARY（默认开启）
+    """
+    events = os.environ.get("STAGE_EVENTS", "") if events is None else events
+    if summary is None:
+        summary = os.environ.get("STAGE_SUMMARY", "1").lower() not in ("0", "false")
+    RECORDER.sinks = [JsonLinesSink(events)] if events else []
+    RECORDER.summary = summary
+
+
+def add_sink(sink: Sink):
+    """注册事件输出，sink(event) 在阶段结束的线程中调用"""
+    RECORDER.sinks.append(sink)
+
+
+def remove_sink(sink: Sink):
+    if sink in RECORDER.sinks:
+        RECORDER.sinks.remove(sink)
+
+
+@contextmanager
+def stage(site: str, name: str, **fields) -> Iterator[Any]:
+    """
+    记录监控阶段：运行指标之外，启用时发出一条阶段事件
+
+        with instrument.stage("jwc_gg", "parse") as event:
+            notices = self.get_notices(soup)
+            event.set(notices=len(notices))
+
+    Args:
+        site (str): 网站标识
+        name (str): 阶段名
+        **fields: 事件的附加字段
+
+    Yields:
+        StageEvent: 可附加字段的事件，未启用时为空操作对象
+    """
+    if not RECORDER.enabled and not tracing.TRACER.enabled:
+        with metrics.stage(site, name):
+            yield NULL_EVENT
+        return
+
+    event = StageEvent(site, name)
+    event.fields.update(fields)
+    token = current_event.set(event)
+    ts = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        with metrics.stage(site, name), tracing.span(
+            f"{site}/{name}", "stage", site=site
+        ) as span:
+            try:
+                yield event
+            finally:
+                span.set(**event.fields)
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        current_event.reset(token)
+        record = {
+            "ts": round(ts, 3),
+            "cycle": RECORDER.cycle,
+            "site": site,
+            "stage": name,
+            "duration": round(duration, 6),
+            "ok": error is None,
+        }
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        record.update(event.fields)
+        if RECORDER.enabled:
+            RECORDER.emit(record)
@@ -1,6 +1,102 @@
+"""
+日志组件
+
+记录日志的线程只把记录放入队列，由后台线程写入控制台和日志文件，抓取和推送不会因写日志阻塞：
+- 日志写入 logs/monitor.log，按天（LOG_ROTATE=midnight，默认）或按大小
+  （LOG_ROTATE=size，LOG_MAX_BYTES，默认 10MB）轮转
+- 轮转出的文件用 gzip 压缩（LOG_COMPRESS=0 关闭），保留 LOG_BACKUP_COUNT 个（默认 7），
+  并删除超过 LOG_RETENTION_DAYS 天（默认 7，0 为不按天数清理）的轮转文件和旧版本的日志文件
+- 配置日志时和每次轮转时清理一次，日志目录中只有少量文件，不会像旧版本那样逐个检查数百个文件
+- 进程退出时写完队列中剩余的日志
+- 默认记录器在第一次记录日志时才配置，此时入口已经加载了 .env，LOG_* 配置可以写在 .env 中
+"""
+
+import atexit
+import gzip
 import logging
+import logging.handlers
 import os
-import datetime
+import queue
+import shutil
+import time
+
+PROJECT_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir)
+)
+
+# 旧版本每次运行生成的日志文件前缀，按保留天数一并清理
+LEGACY_PREFIX = "monitor_"
+
+_listeners = {}
+
+
+def _compress_namer(name):
+    return name + ".gz"
+
+
+def _compress_rotator(source, dest):
+    """把轮转出的日志压缩为 gzip"""
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _prune(handler, retention_days):
+    """删除超过保留天数的轮转文件和旧版本的日志文件"""
+    log_dir, base_name = os.path.split(handler.baseFilename)
+    deadline = time.time() - retention_days * 86400
+    for entry in os.scandir(log_dir):
+        if entry.name == base_name:
+            continue
+        if not (
+            entry.name.startswith(base_name + ".")
+            or entry.name.startswith(LEGACY_PREFIX)
+        ):
+            continue
+        try:
+            if entry.stat().st_mtime < deadline:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def _file_handler(log_file):
+    """按环境变量创建轮转的文件处理器"""
+    rotate = os.environ.get("LOG_ROTATE", "midnight").lower()
+    backup_count = int(os.environ.get("LOG_BACKUP_COUNT", "7"))
+    if rotate == "size":
+        handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=int(os.environ.get("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True,
+        )
+    else:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            log_file,
+            when=rotate,
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True,
+        )
+
+    if os.environ.get("LOG_COMPRESS", "1").lower() not in ("0", "false"):
+        handler.namer = _compress_namer
+        handler.rotator = _compress_rotator
+
+    retention_days = float(os.environ.get("LOG_RETENTION_DAYS", "7"))
+    if retention_days > 0:
+        # 已部署的日志目录中可能留有大量旧版本的 monitor_*.log，配置时先清理一次
+        _prune(handler, retention_days)
+        do_rollover = handler.doRollover
+
+        def rollover():
+            do_rollover()
+            _prune(handler, retention_days)
+
+        handler.doRollover = rollover
+    return handler
 
 
 def setup_logger(name=None, log_file=None):
@@ -9,7 +105,7 @@ def setup_logger(name=None, log_file=None):
 
     Args:
         name: 日志记录器名称，如果为None则获取root logger
-        log_file: 日志文件路径
+        log_file: 日志文件路径，默认为项目根目录下的 logs/monitor.log
 
     Returns:
         配置好的logger对象
@@ -17,64 +113,91 @@ def setup_logger(name=None, log_file=None):
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
 
-    # 确定项目根目录
-    project_root = os.path.abspath(
-        os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir)
-    )
-
     # 默认日志文件路径
     if log_file is None:
-        logs_dir = os.path.join(project_root, "logs")
-
-        current_time = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        log_file = os.path.join(logs_dir, f"monitor_{current_time}.log")
+        logs_dir = os.environ.get("LOG_DIR") or os.path.join(PROJECT_ROOT, "logs")
+        log_file = os.path.join(logs_dir, "monitor.log")
 
     log_dir = os.path.dirname(log_file)
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
 
-    # 创建文件处理器，使用UTF-8编码
-    file_handler = logging.FileHandler(log_file, encoding="utf-8")
-
-    # 创建控制台处理器
-    console_handler = logging.StreamHandler()
-
     # 创建格式化器
     formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 
-    # 设置处理器的格式化器
+    # 文件和控制台处理器在后台线程中执行
+    file_handler = _file_handler(log_file)
+    console_handler = logging.StreamHandler()
     file_handler.setFormatter(formatter)
     console_handler.setFormatter(formatter)
 
+    # 重复设置同一个记录器时先停止之前的后台线程
+    previous = _listeners.pop(name, None)
+    if previous is not None:
+        previous.stop()
+        for handler in previous.handlers:
+            handler.close()
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    listener.start()
+    _listeners[name] = listener
+
     # 清除现有处理器
     logger.handlers = []
 
-    # 添加处理器到记录器
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # 添加队列处理器到记录器
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
 
     return logger
 
 
-# 创建默认logger
-logger = setup_logger()
+def shutdown():
+    """停止后台线程，写完队列中剩余的日志"""
+    for listener in list(_listeners.values()):
+        listener.stop()
+        for handler in listener.handlers:
+            handler.flush()
+    _listeners.clear()
+
+
+atexit.register(shutdown)
+
+
+# 默认logger（root logger），第一次记录日志时配置
+logger = logging.getLogger()
+_configured = False
+
+
+def setup():
+    """按环境变量配置默认logger，只在第一次调用时生效"""
+    global _configured
+    if not _configured:
+        _configured = True
+        setup_logger()
 
 
 def info(msg):
     """记录信息日志"""
+    setup()
     logger.info(msg)
 
 
 def warning(msg):
     """记录警告日志"""
+    setup()
     logger.warning(msg)
 
 
 def error(msg):
     """记录错误日志"""
+    setup()
     logger.error(msg)
 
 
 def debug(msg):
     """记录调试日志"""
+    setup()
     logger.debug(msg)
@@ -0,0 +1,600 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+消息处理组件
+- 公告消息模板：每个模板按渠道编译一次（编译时检查格式），渲染时逐段收集后一次拼接
+- 支持飞书富文本 / 消息卡片、OneBot 文本 / 消息段数组
+- 按平台的大小限制切分过长的消息
+
+模板中可以使用公告的任意字段和 {index}（序号），标题可以使用 {count} 和渲染时传入的上下文，
+如 {site_name}、{noun}；缺少的字段按空字符串处理
+"""
+
+import json
+import operator
+import string
+from itertools import chain, repeat, starmap
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+
+def json_length(text: str) -> int:
+    """文本写入 JSON 请求体后的字节数（json.dumps 默认把中文转义为 \\uXXXX）"""
+    return len(json.dumps(text)) - 2
+
+
+def _hard_split(text: str, limit: int, measure: Callable[[str], int]) -> List[str]:
+    """逐字符切分，用于单行就超过限制的情况"""
+    parts = []
+    current = ""
+    size = 0
+    for char in text:
+        char_size = measure(char)
+        if current and size + char_size > limit:
+            parts.append(current)
+            current, size = "", 0
+        current += char
+        size += char_size
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _pack(
+    pieces: List[str], separator: str, limit: int, measure: Callable[[str], int]
+) -> List[str]:
+    """将片段依次合并，每部分不超过 limit"""
+    parts = []
+    current = None
+    for piece in pieces:
+        candidate = piece if current is None else current + separator + piece
+        if measure(candidate) <= limit:
+            current = candidate
+            continue
+        if current is not None:
+            parts.append(current)
+        current = piece
+    if current is not None:
+        parts.append(current)
+    return parts
+
+
+def split_message(
+    text: str, limit: int, measure: Callable[[str], int] = len
+) -> List[str]:
+    """
+    切分过长的消息，尽量在公告之间（空行处）断开，保持原有顺序
+
+    单条公告超过限制时按行切分，单行仍超过限制时按字符切分
+
+    Args:
+        text (str): 消息内容
+        limit (int): 每部分的最大长度
+        measure (callable): 长度计算方式，默认按字符数，可传入 json_length 等
+
+    Returns:
+        List[str]: 切分后的各部分，未超过限制时只有一部分
+    """
+    if measure(text) <= limit:
+        return [text]
+
+    pieces = []
+    for block in text.split("\n\n"):
+        if measure(block) <= limit:
+            pieces.append(block)
+            continue
+        lines = []
+        for line in block.split("\n"):
+            if measure(line) <= limit:
+                lines.append(line)
+            else:
+                lines.extend(_hard_split(line, limit, measure))
+        pieces.extend(_pack(lines, "\n", limit, measure))
+
+    return [part for part in _pack(pieces, "\n\n", limit, measure) if part.strip()]
+
+
+def pack_items(
+    items: List[Any], limit: int, measure: Callable[[Any], int]
+) -> List[List[Any]]:
+    """
+    按顺序把元素分组，每组的大小之和不超过 limit（单个元素超过限制时单独成组）
+
+    Args:
+        items (list): 元素列表，如卡片元素、消息段
+        limit (int): 每组的最大大小
+        measure (callable): 单个元素的大小
+
+    Returns:
+        List[list]: 分组后的元素
+    """
+    groups: List[List[Any]] = []
+    current: List[Any] = []
+    size = 0
+    for item in items:
+        item_size = measure(item)
+        if current and size + item_size > limit:
+            groups.append(current)
+            current, size = [], 0
+        current.append(item)
+        size += item_size
+    if current:
+        groups.append(current)
+    return groups
+
+
+class Line(NamedTuple):
+    """模板中的一行"""
+
+    # 格式字符串，如 "📅 {date}"
+    text: str
+    # 该字段为空时跳过这一行
+    when: Optional[str] = None
+    # 只在这些渠道中输出，为空时所有渠道都输出
+    channels: Optional[Tuple[str, ...]] = None
+
+
+class _Fields(dict):
+    """缺少的字段渲染为空字符串"""
+
+    def __missing__(self, key):
+        return ""
+
+
+_formatter = string.Formatter()
+
+
+def _parse_fields(text: str) -> List[str]:
+    """
+    检查一行的格式字符串，返回其中的字段名
+
+    Raises:
+        ValueError: 格式错误、字段不是公告的字段名或格式说明中嵌套了字段
+    """
+    fields = []
+    for _, field, spec, conversion in _formatter.parse(text):
+        if field is None:
+            continue
+        if not field.isidentifier():
+            raise ValueError(f"模板字段只能是公告的字段名: {{{field}}}")
+        if conversion not in (None, "r", "s", "a"):
+            raise ValueError(
+                f"模板字段的转换只能是 !r、!s 或 !a: {{{field}!{conversion}}}"
+            )
+        if spec and "{" in spec:
+            raise ValueError(f"模板字段的格式说明不能包含字段: {{{field}:{spec}}}")
+        fields.append(field)
+    return fields
+
+
+# 位置参数的种类：字段值（截断的字段已截断）、截断字段切片后的值、截断时追加的省略号
+VALUE, CUT, SUFFIX = "value", "cut", "suffix"
+
+
+def _compile_line(
+    text: str, truncate: Dict[str, int]
+) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    把一行的格式字符串改为按出现顺序的位置参数
+
+    需要截断且没有转换和格式说明的字段拆成两个参数：切片后的值和省略号，
+    切片和拼接都在 str.format 中完成
+
+    Returns:
+        Tuple[str, list]: (格式字符串, 各位置参数的 (字段名, 种类))
+    """
+    parts = []
+    arguments = []
+    for literal, field, spec, conversion in _formatter.parse(text):
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if field in truncate and field != "index" and not spec and not conversion:
+            parts.append("{}{}")
+            arguments += [(field, CUT), (field, SUFFIX)]
+            continue
+        conversion = f"!{conversion}" if conversion else ""
+        spec = f":{spec}" if spec else ""
+        parts.append(f"{{{conversion}{spec}}}")
+        arguments.append((field, VALUE))
+    return "".join(parts), arguments
+
+
+def _read(
+    notices: List[Dict[str, Any]], names: List[str], getter: Callable[[Any], Any]
+) -> List[Sequence[Any]]:
+    """
+    按列读取公告的字段，缺少的字段为空字符串
+
+    Args:
+        notices (List[dict]): 公告
+        names (List[str]): 字段名（不重复）
+        getter (Callable): 这些字段的 operator.itemgetter
+
+    Returns:
+        List[Sequence]: 与 names 对应的各列
+    """
+    if not notices:
+        return [()] * len(names)
+    try:
+        # 公告通常都有这些字段，一次取出全部字段再转置
+        if len(names) == 1:
+            return [list(map(getter, notices))]
+        return list(zip(*map(getter, notices)))
+    except KeyError:
+        return [
+            list(map(dict.get, notices, repeat(name), repeat(""))) for name in names
+        ]
+
+
+def _truncated(values: Sequence[Any], limit: int, kind: str) -> Iterable[Any]:
+    """截断字段的一列参数，字段全为字符串时切片和长度比较都在 C 中完成"""
+    if set(map(type, values)) <= {str}:
+        if kind == CUT:
+            return list(map(operator.getitem, values, repeat(slice(limit))))
+        if kind == SUFFIX:
+            longer = map(operator.lt, repeat(limit), map(len, values))
+            return list(map(("", "...").__getitem__, longer))
+    elif kind == SUFFIX:
+        return repeat("")
+    return [
+        (
+            value[:limit] + "..."
+            if isinstance(value, str) and len(value) > limit
+            else value
+        )
+        for value in values
+    ]
+
+
+def _truth(values: Sequence[Any]) -> Iterable[bool]:
+    """一列字段是否非空，全部非空或全部为空时不逐个判断"""
+    if all(values):
+        return repeat(True, len(values))
+    if not any(values):
+        return repeat(False, len(values))
+    return map(bool, values)
+
+
+class _Formats(dict):
+    """条件行是否输出的组合 -> 一条公告的格式字符串，第一次用到时生成"""
+
+    def __init__(self, lines: List[Tuple[str, str, Optional[str]]], tail: str):
+        super().__init__()
+        self._lines = lines
+        self._tail = tail
+
+    def __missing__(self, flags: Tuple[bool, ...]) -> str:
+        included = iter(flags)
+        parts = []
+        lead = ""
+        for text, skipped, when in self._lines:
+            if when is None or next(included):
+                parts.append(lead + text)
+                lead = "\n"
+            else:
+                parts.append(skipped)
+        text = self[flags] = "".join(parts) + self._tail
+        return text
+
+
+class CompiledTemplate:
+    """
+    按渠道编译后的模板
+
+    只保留该渠道的行并检查格式，字段改为按出现顺序的位置参数；不输出的条件行换成
+    输出为空的占位字段（{!s:.0}），各种条件组合的格式字符串参数相同。渲染时按列
+    读取各公告的字段，一批公告的正文只调用一次 str.format
+    """
+
+    def __init__(self, header: str, lines: List[Line], truncate: Dict[str, int]):
+        list(_formatter.parse(header))
+        self._header = header.format_map
+
+        self._arguments: List[Tuple[str, str]] = []
+        compiled_lines = []
+        for line in lines:
+            _parse_fields(line.text)
+            text, arguments = _compile_line(line.text, truncate)
+            self._arguments += arguments
+            compiled_lines.append((text, "{!s:.0}" * len(arguments), line.when))
+
+        # 每次渲染按列读取的字段（不含序号）
+        conditions = [line.when for line in lines if line.when is not None]
+        self._names = list(
+            dict.fromkeys(
+                field
+                for field in [field for field, _ in self._arguments] + conditions
+                if field != "index"
+            )
+        )
+        self._getter = operator.itemgetter(*self._names) if self._names else None
+        # 各位置参数的 (列号（序号为 None）, 截断长度, 种类)
+        self._plan = [
+            (
+                None if field == "index" else self._names.index(field),
+                truncate.get(field),
+                kind,
+            )
+            for field, kind in self._arguments
+        ]
+        self._flags = [self._names.index(field) for field in conditions]
+        self._block_formats = _Formats(compiled_lines, "")
+        self._body_formats = _Formats(compiled_lines, "\n\n")
+
+    def _columns(
+        self, notices: List[Dict[str, Any]], start: int
+    ) -> Tuple[Iterable[Tuple[bool, ...]], List[Iterable[Any]]]:
+        """各公告的条件组合，以及按位置参数排列的各列"""
+        fields = _read(notices, self._names, self._getter) if self._names else []
+
+        columns: List[Iterable[Any]] = []
+        for position, limit, kind in self._plan:
+            if position is None:
+                columns.append(range(start, start + len(notices)))
+            elif limit is None:
+                columns.append(fields[position])
+            else:
+                columns.append(_truncated(fields[position], limit, kind))
+
+        # 截断不改变字段是否为空
+        if self._flags:
+            flags: Iterable[Tuple[bool, ...]] = zip(
+                *[_truth(fields[position]) for position in self._flags]
+            )
+        else:
+            flags = repeat((), len(notices))
+        return flags, columns
+
+    def title(self, count: int, context: Dict[str, Any]) -> str:
+        """消息标题"""
+        return self._header(_Fields(context, count=count))
+
+    def blocks(self, notices: Iterable[Dict[str, Any]], start: int = 1) -> List[str]:
+        """每条公告渲染为一段（不含结尾的空行）"""
+        notices = list(notices)
+        flags, columns = self._columns(notices, start)
+        texts = map(self._block_formats.__getitem__, flags)
+        return list(starmap(str.format, zip(texts, *columns)))
+
+    def body(
+        self, notices: Iterable[Dict[str, Any]], start: int = 1, head: str = ""
+    ) -> str:
+        """
+        全部公告的正文，每条公告后空一行
+
+        Args:
+            notices (Iterable[dict]): 公告
+            start (int): 第一条公告的序号
+            head (str): 正文前的文本（如标题），与正文一起生成，避免再复制一遍长正文
+        """
+        notices = list(notices)
+        flags, columns = self._columns(notices, start)
+        text = head.replace("{", "{{").replace("}", "}}") + "".join(
+            map(self._body_formats.__getitem__, flags)
+        )
+        return text.format(*chain.from_iterable(zip(*columns)))
+
+
+class MessageTemplate:
+    """公告消息模板"""
+
+    def __init__(
+        self,
+        header: str,
+        lines: List[Line],
+        truncate: Optional[Dict[str, Dict[str, int]]] = None,
+    ):
+        """
+        定义模板
+
+        Args:
+            header (str): 标题格式，如 "📢 {site_name}有{count}条新{noun}"
+            lines (List[Line]): 每条公告的各行
+            truncate (dict, optional): 字段截断长度，如 {"description": {"feishu": 100}}
+        """
+        self.header = header
+        self.lines = lines
+        self.truncate = truncate or {}
+        self._compiled: Dict[str, CompiledTemplate] = {}
+
+    def compile(self, channel: str) -> CompiledTemplate:
+        """获取该渠道编译后的模板（每个渠道只编译一次）"""
+        compiled = self._compiled.get(channel)
+        if compiled is None:
+            lines = [
+                line
+                for line in self.lines
+                if not line.channels or channel in line.channels
+            ]
+            truncate = {
+                name: limits[channel]
+                for name, limits in self.truncate.items()
+                if channel in limits
+            }
+            compiled = self._compiled[channel] = CompiledTemplate(
+                self.header, lines, truncate
+            )
+        return compiled
+
+
+TEMPLATES: Dict[str, MessageTemplate] = {}
+
+
+def register_template(name: str, template: MessageTemplate) -> MessageTemplate:
+    """注册模板，监控器和通知事件通过名称引用模板"""
+    TEMPLATES[name] = template
+    return template
+
+
+def get_template(template: Any) -> MessageTemplate:
+    """按名称获取模板，也可以直接传入模板对象"""
+    if isinstance(template, MessageTemplate):
+        return template
+    if template not in TEMPLATES:
+        raise KeyError(f"未注册的消息模板: {template}")
+    return TEMPLATES[template]
+
+
+# 标题、日期、链接
+register_template(
+    "standard",
+    MessageTemplate(
+        header="📢 {site_name}有{count}条新{noun}",
+        lines=[Line("【{index}】{title}"), Line("📅 {date}"), Line("🔗 {link}")],
+    ),
+)
+
+# 带发布者、浏览量和简介，简介在飞书中保留 100 字、OneBot 中保留 80 字
+register_template(
+    "detailed",
+    MessageTemplate(
+        header="📢 {site_name}有{count}条新{noun}",
+        lines=[
+            Line("【{index}】{title}"),
+            Line("📅 发布时间：{date}"),
+            Line("👤 发布者：{publisher}", when="publisher"),
+            Line("👁️ 浏览量：{hits}", when="hits"),
+            Line("🆕 最新公告", when="is_new"),
+            Line("📝 简介：{description}", when="description"),
+            Line("🔗 链接：{link}", channels=("feishu",)),
+            Line("🔗 {link}", channels=("onebot",)),
+        ],
+        truncate={"description": {"feishu": 100, "onebot": 80}},
+    ),
+)
+
+
+class Section(NamedTuple):
+    """一组使用同一模板的公告，汇总消息由多个小节组成"""
+
+    template: Any
+    context: Dict[str, Any]
+    notices: List[Dict[str, Any]]
+    # 站点标识，如 jwc_gg
+    site: str = ""
+
+
+def digest_title(count: int) -> str:
+    """汇总消息的标题"""
+    return f"📢 曲阜师范大学有{count}条新公告"
+
+
+def render_title(sections: List[Section], channel: str = "feishu") -> str:
+    """消息标题，多个小节时为汇总标题"""
+    if len(sections) == 1:
+        section = sections[0]
+        compiled = get_template(section.template).compile(channel)
+        return compiled.title(len(section.notices), section.context)
+    return digest_title(sum(len(section.notices) for section in sections))
+
+
+def render_post(sections: List[Section], channel: str = "feishu") -> Tuple[str, str]:
+    """
+    渲染为标题和正文（飞书富文本、邮件、webhook 使用）
+
+    多个小节时各小节的标题作为小标题
+
+    Returns:
+        Tuple[str, str]: (标题, 正文)
+    """
+    if len(sections) == 1:
+        section = sections[0]
+        compiled = get_template(section.template).compile(channel)
+        return (
+            compiled.title(len(section.notices), section.context),
+            compiled.body(section.notices),
+        )
+
+    texts = []
+    for template, context, notices, _ in sections:
+        compiled = get_template(template).compile(channel)
+        texts.append(
+            f"{compiled.title(len(notices), context)}\n\n{compiled.body(notices)}"
+        )
+    return render_title(sections, channel), "\n".join(texts)
+
+
+def render_text(sections: List[Section], channel: str = "onebot") -> str:
+    """渲染为纯文本消息（OneBot 使用）"""
+    if len(sections) == 1:
+        section = sections[0]
+        compiled = get_template(section.template).compile(channel)
+        title = compiled.title(len(section.notices), section.context)
+        return compiled.body(section.notices, head=title + "\n\n")
+
+    parts = [render_title(sections, channel) + "\n\n"]
+    for template, context, notices, _ in sections:
+        compiled = get_template(template).compile(channel)
+        parts.append(compiled.title(len(notices), context) + "\n\n")
+        parts.append(compiled.body(notices))
+    return "".join(parts)
+
+
+def render_segments(
+    sections: List[Section], channel: str = "onebot"
+) -> List[Dict[str, Any]]:
+    """渲染为 OneBot 消息段数组，每条公告一个文本段，便于按段切分"""
+    segments = [
+        {"type": "text", "data": {"text": render_title(sections, channel) + "\n\n"}}
+    ]
+    for template, context, notices, _ in sections:
+        compiled = get_template(template).compile(channel)
+        if len(sections) > 1:
+            title = compiled.title(len(notices), context) + "\n\n"
+            segments.append({"type": "text", "data": {"text": title}})
+        segments.extend(
+            {"type": "text", "data": {"text": block + "\n\n"}}
+            for block in compiled.blocks(notices)
+        )
+    return segments
+
+
+def render_card_elements(
+    sections: List[Section], channel: str = "feishu"
+) -> List[Dict[str, Any]]:
+    """渲染为飞书消息卡片的元素列表，每条公告一个 lark_md 文本块，公告之间有分割线"""
+    elements: List[Dict[str, Any]] = []
+    for template, context, notices, _ in sections:
+        compiled = get_template(template).compile(channel)
+        if len(sections) > 1:
+            title = compiled.title(len(notices), context)
+            elements.append(
+                {"tag": "div", "text": {"tag": "lark_md", "content": f"**{title}**"}}
+            )
+        for block in compiled.blocks(notices):
+            if elements:
+                elements.append({"tag": "hr"})
+            elements.append(
+                {"tag": "div", "text": {"tag": "lark_md", "content": block}}
+            )
+    return elements
+
+
+def build_card(title: str, elements: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """组装飞书消息卡片"""
+    return {
+        "config": {"wide_screen_mode": True},
+        "header": {
+            "template": "blue",
+            "title": {"tag": "plain_text", "content": title},
+        },
+        "elements": elements,
+    }
+
+
+def render_card(sections: List[Section], channel: str = "feishu") -> Dict[str, Any]:
+    """渲染为飞书消息卡片"""
+    return build_card(
+        render_title(sections, channel), render_card_elements(sections, channel)
+    )
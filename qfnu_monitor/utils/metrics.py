@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+运行指标
+按 Prometheus 文本格式导出监控各阶段的耗时和计数，用于定位慢的网站或阶段：
+- 直方图：每个网站的 HTTP 请求耗时、各阶段（fetch、parse、load、diff、push、save）耗时，
+  每个渠道的推送耗时，每轮监控耗时
+- 计数器：新公告数、错误数（按阶段）、HTTP 响应数（按状态码，含 304）、重试次数、推送结果
+- 仪表：存档大小、待推送事件数、OneBot 最近一次投递的吞吐
+
+常驻运行时通过本地 HTTP 端口提供（METRICS_PORT，默认 9108，0 表示不启动），
+--once 运行时在每轮结束后写入文本文件（METRICS_FILE，默认 data/metrics/qfnu_monitor.prom），
+可由 node_exporter 的 textfile collector 采集
+
+不依赖 prometheus_client，指标只在进程内累计
+"""
+
+import bisect
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 耗时直方图的默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# 当前正在处理的网站，HTTP 请求的指标按它打标签
+current_site: ContextVar[str] = ContextVar("current_site", default="")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """指标基类，按标签取值分别累计"""
+
+    kind = "untyped"
+    # HELP、TYPE 行使用的名称后缀
+    family_suffix = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"指标 {self.name} 的标签应为 {self.label_names}，实际为 {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """(名称后缀, 标签, 值)"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        family = self.name + self.family_suffix
+        lines = [
+            f"# HELP {family} {self.documentation}",
+            f"# TYPE {family} {self.kind}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """只增不减的计数器"""
+
+    kind = "counter"
+    # 样本名带 _total，HELP、TYPE 与样本同名（与 prometheus_client 的文本格式一致）
+    family_suffix = "_total"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            ("_total", _format_labels(self.label_names, key), value)
+            for key, value in items
+        ]
+
+
+class Gauge(Metric):
+    """可任意设置的仪表"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            ("", _format_labels(self.label_names, key), value) for key, value in items
+        ]
+
+
+class Histogram(Metric):
+    """分桶直方图"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # [各桶计数, 总和, 总数]
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                data[0][index] += 1
+            data[1] += value
+            data[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """记录 with 块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        data = self._values.get(self._key(labels))
+        return data[2] if data else 0
+
+    def sum(self, **labels) -> float:
+        data = self._values.get(self._key(labels))
+        return data[1] if data else 0.0
+
+    def samples(self):
+        with self._lock:
+            items = sorted(
+                (key, list(counts), total, count)
+                for key, (counts, total, count) in self._values.items()
+            )
+        samples = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    self.label_names + ("le",), key + (_format_value(bound),)
+                )
+                samples.append(("_bucket", labels, cumulative))
+            labels = _format_labels(self.label_names + ("le",), key + ("+Inf",))
+            samples.append(("_bucket", labels, count))
+            labels = _format_labels(self.label_names, key)
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, count))
+        return samples
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已存在: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def clear(self):
+        """清空所有指标的取值（保留指标定义）"""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labels))
+
+
+def gauge(name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labels))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labels: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labels, buckets))
+
+
+HTTP_REQUEST_SECONDS = histogram(
+    "qfnu_monitor_http_request_seconds",
+    "抓取网站的 HTTP 请求耗时",
+    ("site", "host"),
+)
+HTTP_RESPONSES = counter(
+    "qfnu_monitor_http_responses",
+    "HTTP 响应数，status 为状态码，请求失败时为 error",
+    ("site", "status"),
+)
+STAGE_SECONDS = histogram(
+    "qfnu_monitor_stage_seconds",
+    "监控各阶段耗时（fetch 抓取、parse 解析、load/save 读写状态、diff 对比、push 入队）",
+    ("site", "stage"),
+)
+NEW_NOTICES = counter("qfnu_monitor_new_notices", "发现的新公告数", ("site",))
+ERRORS = counter("qfnu_monitor_errors", "各阶段的错误数", ("site", "stage"))
+RETRIES = counter(
+    "qfnu_monitor_retries",
+    "重试次数，kind 为 request（渠道内的请求重试）或 event（发件箱重新推送事件）",
+    ("channel", "kind"),
+)
+NOTIFY_SECONDS = histogram(
+    "qfnu_monitor_notify_seconds", "每个渠道推送一个事件的耗时", ("channel",)
+)
+NOTIFY_RESULTS = counter(
+    "qfnu_monitor_notify_results",
+    "推送结果数，result 为 sent、failed 或 skipped",
+    ("channel", "result"),
+)
+ONEBOT_MESSAGES = counter(
+    "qfnu_monitor_onebot_messages",
+    "OneBot 投递引擎发送的消息数，result 为 sent 或 failed",
+    ("account", "result"),
+)
+ONEBOT_THROUGHPUT = gauge(
+    "qfnu_monitor_onebot_throughput", "OneBot 最近一次投递的吞吐（条/秒）"
+)
+ARCHIVE_BYTES = gauge("qfnu_monitor_archive_bytes", "公告存档大小（字节）", ("site",))
+OUTBOX_PENDING = gauge("qfnu_monitor_outbox_pending", "发件箱中待推送的事件数")
+CYCLE_SECONDS = histogram(
+    "qfnu_monitor_cycle_seconds",
+    "每轮监控（检查全部网站并推送）的耗时",
+    buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600),
+)
+LAST_CYCLE = gauge(
+    "qfnu_monitor_last_cycle_timestamp_seconds", "最近一轮监控结束的时间戳"
+)
+
+
+@contextmanager
+def stage(site: str, name: str) -> Iterator[None]:
+    """
+    记录监控阶段的耗时，阶段内抛出异常时计入错误数后继续抛出
+
+    阶段内发出的 HTTP 请求按该网站打标签
+
+    Args:
+        site (str): 网站标识，如 jwc_gg
+        name (str): 阶段名，如 fetch、parse、load、diff、push、save
+    """
+    token = current_site.set(site)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.inc(site=site, stage=name)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, site=site, stage=name)
+        current_site.reset(token)
+
+
+def update_archive_sizes(data_dir: str):
+    """统计每个网站的存档目录大小"""
+    archive_dir = os.path.join(data_dir, "archive")
+    if not os.path.isdir(archive_dir):
+        return
+    for entry in os.scandir(archive_dir):
+        if not entry.is_dir():
+            continue
+        size = 0
+        for root, _, files in os.walk(entry.path):
+            for name in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        ARCHIVE_BYTES.set(size, site=entry.name)
+
+
+def default_metrics_file(data_dir: str) -> str:
+    """文本文件的路径，默认为数据目录下的 metrics/qfnu_monitor.prom"""
+    return os.environ.get("METRICS_FILE") or os.path.join(
+        data_dir, "metrics", "qfnu_monitor.prom"
+    )
+
+
+def write_textfile(path: str):
+    """
+    把当前指标写入文本文件（先写临时文件再替换，采集时不会读到半个文件）
+
+    Args:
+        path (str): 文件路径
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp_path, path)
+
+
+def start_http_server(port: int, host: str = "127.0.0.1"):
+    """
+    在后台线程中提供 /metrics
+
+    Args:
+        port (int): 端口
+        host (str): 监听地址，默认只监听本机
+
+    Returns:
+        ThreadingHTTPServer: 服务对象，调用 shutdown() 停止
+    """
+    # 只有常驻运行时才提供指标服务，--once 不导入 http.server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(
+        target=server.serve_forever, name="metrics-http", daemon=True
+    )
+    thread.start()
+    logging.info(f"指标服务已启动: http://{host}:{port}/metrics")
+    return server
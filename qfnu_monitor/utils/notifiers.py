@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+通知渠道注册表
+每个渠道实现 Notifier 接口并注册，发件箱按注册表向所有已配置的渠道并行推送
+
+内置渠道：
+- feishu：飞书自定义机器人
+- onebot：OneBot v11 群消息
+- webhook：通用 webhook，POST JSON 并带 Idempotency-Key 请求头
+- email：SMTP 邮件，Message-ID 由幂等键生成
+
+消息在推送时由事件中的公告和模板渲染（见 message 模块），飞书可通过
+FEISHU_MESSAGE_FORMAT=card 改用消息卡片，OneBot 可通过 ONEBOT_MESSAGE_FORMAT=segments
+改用消息段数组
+
+新增渠道时继承 Notifier，实现 configured() 和 deliver()，再调用 register_notifier() 注册
+"""
+
+import abc
+import hashlib
+import hmac
+import json
+import os
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+import requests
+from qfnu_monitor.utils.feishu import FeishuClient, get_feishu_client
+from qfnu_monitor.utils.message import (
+    Section,
+    pack_items,
+    render_card_elements,
+    render_post,
+    render_segments,
+    render_text,
+    render_title,
+    split_message,
+)
+from qfnu_monitor.utils.delivery import get_delivery_engine
+from qfnu_monitor.utils.groups import get_registry
+from qfnu_monitor.utils.onebot import get_onebot_sender
+from qfnu_monitor.utils.subscriptions import get_router
+
+# 只有一个目标的渠道（webhook、邮件、默认飞书机器人）在订阅规则中的目标名
+DEFAULT_TARGET = "default"
+
+
+def part_key(key: str, index: int, total: int) -> str:
+    """消息被切分时每一部分的幂等键"""
+    return key if total == 1 else f"{key}#{index}"
+
+
+def event_sections(event: Dict[str, Any]) -> List[Section]:
+    """事件中的各小节（汇总事件有多个小节）"""
+    return [
+        Section(
+            section["template"],
+            section["context"],
+            section["notices"],
+            section.get("site", event["site"]),
+        )
+        for section in event["sections"]
+    ]
+
+
+def event_notices(event: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """事件中的全部公告"""
+    return [notice for section in event["sections"] for notice in section["notices"]]
+
+
+class Notifier(abc.ABC):
+    """通知渠道基类，子类必须实现 configured 和 deliver"""
+
+    # 渠道名，同时作为事件中渠道状态的键
+    name = ""
+    # 使用模板中哪个渠道的格式（Line.channels、truncate 中的渠道名）
+    template_channel = "feishu"
+    # 单次推送的超时秒数，超时记为失败并在之后重试
+    timeout = 60
+
+    def render_post(
+        self, event: Dict[str, Any], sections: Optional[List[Section]] = None
+    ) -> Tuple[str, str]:
+        """渲染为 (标题, 正文)，sections 为按订阅规则筛选后的小节"""
+        if sections is None:
+            sections = event_sections(event)
+        return render_post(sections, self.template_channel)
+
+    def batches(
+        self, event: Dict[str, Any], targets: List[str]
+    ) -> List[Tuple[List[str], List[Section]]]:
+        """
+        按订阅规则为各目标筛选公告，收到相同公告的目标归为一组，每组只渲染一次
+
+        Args:
+            event (dict): 通知事件
+            targets (List[str]): 目标列表
+
+        Returns:
+            list: [(目标列表, 小节)]，没有订阅任何公告的目标不在其中
+        """
+        routed = get_router().route(self.name, targets, event_sections(event))
+        groups: Dict[Any, Tuple[List[str], List[Section]]] = {}
+        for target, sections in routed.items():
+            signature = tuple(
+                (section.site, tuple(id(notice) for notice in section.notices))
+                for section in sections
+            )
+            groups.setdefault(signature, ([], sections))[0].append(target)
+        return list(groups.values())
+
+    @abc.abstractmethod
+    def configured(self) -> bool:
+        """渠道是否已配置"""
+
+    def timeout_for(self, event: Dict[str, Any], state: Dict[str, Any]) -> float:
+        """本次推送的超时秒数，默认为 timeout"""
+        return self.timeout
+
+    @abc.abstractmethod
+    def deliver(
+        self, event: Dict[str, Any], state: Dict[str, Any], key: str
+    ) -> Optional[str]:
+        """
+        推送一个事件
+
+        Args:
+            event (dict): 通知事件
+            state (dict): 该渠道的状态，已送达的幂等键追加到 state["delivered"]
+            key (str): 本次推送的幂等键前缀
+
+        Returns:
+            str: 错误信息，成功时返回 None
+        """
+
+
+class FeishuNotifier(Notifier):
+    """
+    飞书自定义机器人
+
+    默认机器人（FEISHU_BOT_URL）的目标名为 default；订阅规则中带 url、secret 的
+    飞书目标是其他群的机器人，各自按订阅规则接收公告
+    """
+
+    name = "feishu"
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, str], FeishuClient] = {}
+
+    def configured(self) -> bool:
+        return bool(self._targets())
+
+    def _targets(self) -> Dict[str, Optional[Tuple[str, str]]]:
+        """目标名 -> (url, secret)，默认机器人为 None"""
+        targets: Dict[str, Optional[Tuple[str, str]]] = {}
+        if os.environ.get("FEISHU_BOT_URL") and os.environ.get("FEISHU_BOT_SECRET"):
+            targets[DEFAULT_TARGET] = None
+        router = get_router()
+        for target in router.targets(self.name):
+            options = router.rule(self.name, target).options
+            if target != DEFAULT_TARGET and options.get("url"):
+                targets[target] = (options["url"], options.get("secret", ""))
+        return targets
+
+    def _client(self, bot: Optional[Tuple[str, str]]) -> FeishuClient:
+        if bot is None:
+            return get_feishu_client()
+        if bot not in self._clients:
+            self._clients[bot] = FeishuClient(*bot)
+        return self._clients[bot]
+
+    def _render(self, event, sections):
+        """渲染为 (是否为卡片, 标题, 卡片元素或正文)"""
+        use_card = os.environ.get("FEISHU_MESSAGE_FORMAT", "post") == "card"
+        if use_card:
+            title = render_title(sections, self.template_channel)
+            return True, title, render_card_elements(sections, self.template_channel)
+        return (False, *self.render_post(event, sections))
+
+    def _split(self, client, message):
+        """切分为 [(发送方法, 参数...)]，超过大小限制时为多条"""
+        is_card, title, body = message
+        if is_card:
+            return [(client.send_card, card) for card in client.split_card(title, body)]
+        return [(client.send_post, *part) for part in client.split(title, body)]
+
+    def deliver(self, event, state, key):
+        bots = self._targets()
+        # 首次发送时确定目标，重试期间配置变化不影响该事件
+        targets = [t for t in state.setdefault("targets", list(bots)) if t in bots]
+
+        errors = []
+        for batch, sections in self.batches(event, targets):
+            message = self._render(event, sections)
+            for target in batch:
+                client = self._client(bots[target])
+                target_key = key if target == DEFAULT_TARGET else f"{key}:{target}"
+                parts = self._split(client, message)
+
+                # 逐部分发送并记录，重试时跳过已送达的部分
+                for index, (send, *args) in enumerate(parts, 1):
+                    current_key = part_key(target_key, index, len(parts))
+                    if current_key in state["delivered"]:
+                        continue
+                    result = send(*args)
+                    if "error" in result:
+                        errors.append(f"{target}: {result['error']}")
+                        break
+                    state["delivered"].append(current_key)
+        return "; ".join(errors) or None
+
+
+class OneBotNotifier(Notifier):
+    """
+    OneBot v11 群消息
+
+    目标群组来自 ONEBOT_TARGET_GROUPS、群组注册表和订阅规则，按订阅规则分组渲染后
+    交给投递引擎按账号分片并发发送，逐群记录送达情况
+    """
+
+    name = "onebot"
+    template_channel = "onebot"
+
+    @staticmethod
+    def _default_configured() -> bool:
+        """环境变量中的默认账号是否已配置"""
+        if os.environ.get("ONEBOT_TRANSPORT", "http").strip().lower() == "ws":
+            return bool(os.environ.get("ONEBOT_WS_URL"))
+        return bool(os.environ.get("ONEBOT_HTTP_URL"))
+
+    def configured(self) -> bool:
+        return self._default_configured() or bool(get_registry().accounts)
+
+    def _groups(self) -> List[str]:
+        """当前的全部目标群组"""
+        extra = get_router().targets(self.name)
+        if self._default_configured():
+            extra = [*get_onebot_sender().target_groups, *extra]
+        return list(get_registry().groups(extra))
+
+    def timeout_for(self, event, state):
+        # 按群组数和各账号的发送速率估算，群组较多时不会因固定的超时中断
+        groups = state.get("targets") or self._groups()
+        registry = get_registry()
+        capacity = get_delivery_engine().capacity(
+            registry.account_of(group_id) for group_id in groups
+        )
+        if capacity <= 0:
+            return self.timeout
+        return self.timeout + len(groups) / capacity
+
+    def _parts(self, event, sections, max_length):
+        """渲染为消息的各部分，超过长度限制时切分"""
+        if os.environ.get("ONEBOT_MESSAGE_FORMAT", "text") == "segments":
+            segments = render_segments(sections, self.template_channel)
+            return pack_items(
+                segments, max_length, lambda segment: len(segment["data"]["text"])
+            )
+        return split_message(render_text(sections, self.template_channel), max_length)
+
+    def deliver(self, event, state, key):
+        # 首次发送时确定目标群组，重试期间群组配置变化不影响该事件
+        groups = state.setdefault("targets", self._groups())
+        max_length = int(os.environ.get("ONEBOT_MAX_LENGTH", "4000"))
+        delivered = set(state["delivered"])
+
+        # 每个群组待发送的各部分，已送达的部分跳过
+        jobs = {}
+        for batch, sections in self.batches(event, groups):
+            parts = self._parts(event, sections, max_length)
+            keys = [
+                part_key(key, index, len(parts)) for index in range(1, len(parts) + 1)
+            ]
+            for group_id in batch:
+                todo = [
+                    (current_key, part)
+                    for current_key, part in zip(keys, parts)
+                    if f"{current_key}:{group_id}" not in delivered
+                ]
+                if todo:
+                    jobs[group_id] = todo
+        if not jobs:
+            return None
+
+        stats = get_delivery_engine().deliver(jobs, state["delivered"].append)
+        failed = list(stats["errors"])
+        if failed:
+            shown = ",".join(failed[:10]) + ("等" if len(failed) > 10 else "")
+            return f"{len(failed)}个群组发送失败: {shown}"
+        return None
+
+
+class WebhookNotifier(Notifier):
+    """
+    通用 webhook
+
+    向 NOTIFY_WEBHOOK_URL POST JSON：{"id", "event_id", "site", "title", "content", "notices"}，
+    请求头 Idempotency-Key 为幂等键，配置 NOTIFY_WEBHOOK_SECRET 时附带
+    X-Signature: sha256=<请求体的 HMAC-SHA256>，2xx 视为成功
+    """
+
+    name = "webhook"
+    timeout = 30
+
+    def __init__(self):
+        self.session = requests.Session()
+
+    def configured(self) -> bool:
+        return bool(os.environ.get("NOTIFY_WEBHOOK_URL"))
+
+    def deliver(self, event, state, key):
+        if key in state["delivered"]:
+            return None
+        batches = self.batches(event, [DEFAULT_TARGET])
+        if not batches:
+            # 订阅规则筛选后没有需要推送的公告
+            return None
+
+        sections = batches[0][1]
+        title, content = self.render_post(event, sections)
+        notices = [notice for section in sections for notice in section.notices]
+        body = json.dumps(
+            {
+                "id": key,
+                "event_id": event["id"],
+                "site": event["site"],
+                "title": title,
+                "content": content,
+                "notices": notices,
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Idempotency-Key": key}
+        secret = os.environ.get("NOTIFY_WEBHOOK_SECRET")
+        if secret:
+            signature = hmac.new(secret.encode("utf-8"), body, hashlib.sha256)
+            headers["X-Signature"] = f"sha256={signature.hexdigest()}"
+
+        try:
+            response = self.session.post(
+                os.environ["NOTIFY_WEBHOOK_URL"],
+                data=body,
+                headers=headers,
+                timeout=self.timeout,
+            )
+        except requests.exceptions.RequestException as e:
+            return f"网络请求失败: {str(e)}"
+        if not 200 <= response.status_code < 300:
+            return f"webhook 返回 HTTP {response.status_code}: {response.text[:200]}"
+
+        logging.info(f"webhook 推送成功: {event['id']}")
+        state["delivered"].append(key)
+        return None
+
+
+class EmailNotifier(Notifier):
+    """
+    SMTP 邮件
+
+    环境变量：SMTP_HOST、SMTP_PORT、SMTP_USER、SMTP_PASSWORD、SMTP_FROM、
+    SMTP_TO（逗号分隔）、SMTP_SECURITY（ssl / starttls / none，默认 ssl）
+    """
+
+    name = "email"
+    timeout = 30
+
+    def configured(self) -> bool:
+        return bool(os.environ.get("SMTP_HOST") and os.environ.get("SMTP_TO"))
+
+    def _connect(self):
+        import smtplib
+
+        host = os.environ["SMTP_HOST"]
+        security = os.environ.get("SMTP_SECURITY", "ssl").strip().lower()
+        default_port = {"ssl": 465, "starttls": 587}.get(security, 25)
+        port = int(os.environ.get("SMTP_PORT", default_port))
+
+        if security == "ssl":
+            smtp = smtplib.SMTP_SSL(host, port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(host, port, timeout=self.timeout)
+            if security == "starttls":
+                smtp.starttls()
+
+        user = os.environ.get("SMTP_USER")
+        if user:
+            smtp.login(user, os.environ.get("SMTP_PASSWORD", ""))
+        return smtp
+
+    def deliver(self, event, state, key):
+        if key in state["delivered"]:
+            return None
+        batches = self.batches(event, [DEFAULT_TARGET])
+        if not batches:
+            return None
+
+        # 邮件相关模块只在配置了邮件渠道时导入
+        import smtplib
+        from email.message import EmailMessage
+        from email.utils import formatdate
+
+        title, content = self.render_post(event, batches[0][1])
+        recipients = [
+            address.strip()
+            for address in os.environ["SMTP_TO"].split(",")
+            if address.strip()
+        ]
+        sender = os.environ.get("SMTP_FROM") or os.environ.get("SMTP_USER", "")
+
+        mail = EmailMessage()
+        mail["Subject"] = title
+        mail["From"] = sender
+        mail["To"] = ", ".join(recipients)
+        mail["Date"] = formatdate(localtime=True)
+        # 由幂等键生成固定的 Message-ID，重试产生的重复邮件可被邮件客户端识别
+        mail["Message-ID"] = f"<{key.replace(':', '.')}@qfnu-monitor>"
+        mail.set_content(content)
+
+        try:
+            with self._connect() as smtp:
+                smtp.send_message(mail, from_addr=sender, to_addrs=recipients)
+        except (smtplib.SMTPException, OSError) as e:
+            return f"邮件发送失败: {str(e)}"
+
+        logging.info(f"邮件推送成功: {event['id']} -> {len(recipients)} 个收件人")
+        state["delivered"].append(key)
+        return None
+
+
+NOTIFIERS: Dict[str, Notifier] = {}
+
+
+def register_notifier(notifier: Notifier) -> Notifier:
+    """
+    注册通知渠道，同名渠道会被替换
+
+    未实现 configured / deliver 的子类在创建实例时即报错（TypeError），不会等到推送时
+
+    Raises:
+        TypeError: 不是 Notifier 实例
+        ValueError: 渠道名为空
+    """
+    if not isinstance(notifier, Notifier):
+        raise TypeError(f"通知渠道必须继承 Notifier: {notifier!r}")
+    if not notifier.name:
+        raise ValueError(f"通知渠道未设置 name: {type(notifier).__name__}")
+    NOTIFIERS[notifier.name] = notifier
+    return notifier
+
+
+def get_notifier(name: str) -> Optional[Notifier]:
+    """按名称获取通知渠道"""
+    return NOTIFIERS.get(name)
+
+
+def configured_notifiers() -> List[str]:
+    """已配置的渠道名列表"""
+    return [name for name, notifier in NOTIFIERS.items() if notifier.configured()]
+
+
+for _notifier in (
+    FeishuNotifier(),
+    OneBotNotifier(),
+    WebhookNotifier(),
+    EmailNotifier(),
+):
+    register_notifier(_notifier)
@@ -3,40 +3,191 @@
 
 """
 OneBot v11 协议消息发送组件
-支持向指定群组发送消息
+支持向指定群组发送消息，多个群组并发发送并按接口限流
+
+传输方式由 ONEBOT_TRANSPORT 选择：
+- http（默认）：每条消息一次 HTTP 请求，线程池并发
+- ws：正向 WebSocket 长连接，多条消息连续发出后统一等待响应
+
+便捷函数共用一个长期存在的发送器（连接池、请求头只建立一次），
+相关环境变量或 .env 变化时自动重建，旧发送器在进行中的发送结束后关闭
 """
 
 import requests
+import contextlib
+import functools
+import importlib.util
 import json
 import os
+import time
 import logging
-from typing import List, Dict, Any, Union
-from dotenv import load_dotenv
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Iterator, Mapping, Optional, Union
+from requests.adapters import HTTPAdapter
+from qfnu_monitor.utils.config import env_fingerprint, reload_env_if_changed
+from qfnu_monitor.utils.ratelimit import get_bucket
+from qfnu_monitor.utils.onebot_ws import OneBotWebSocketClient
+
+# 影响发送器的环境变量，任一变化都会重建共享发送器
+ONEBOT_CONFIG_KEYS = (
+    "ONEBOT_TRANSPORT",
+    "ONEBOT_HTTP_URL",
+    "ONEBOT_WS_URL",
+    "ONEBOT_ACCESS_TOKEN",
+    "ONEBOT_TARGET_GROUPS",
+    "ONEBOT_MAX_WORKERS",
+    "ONEBOT_RATE_LIMIT",
+    "ONEBOT_RATE_BURST",
+)
+
+# 配置变化后，旧发送器等待进行中的发送结束的最长时间（秒），之后关闭连接
+RETIRE_GRACE = 60.0
+
+
+def _in_flight(method):
+    """记录进行中的发送，retire() 据此等待发送结束"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.acquire()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.release()
 
-load_dotenv()
+    return wrapper
 
 
 class OneBotSender:
     """OneBot v11 协议消息发送器"""
 
-    def __init__(self):
+    def __init__(self, config: Optional[Mapping[str, str]] = None):
         """
         初始化OneBot发送器
-        从环境变量读取配置信息
+
+        Args:
+            config (Mapping, optional): 配置项（键与环境变量同名），默认读取环境变量；
+                群组注册表中的其他账号通过 from_account 传入各自的配置
         """
-        self.onebot_url = os.environ.get("ONEBOT_HTTP_URL")
-        self.access_token = os.environ.get("ONEBOT_ACCESS_TOKEN")
-        self.target_groups = self._parse_target_groups()
+        env = os.environ if config is None else config
+        self.transport = env.get("ONEBOT_TRANSPORT", "http").strip().lower()
+        self.onebot_url = env.get("ONEBOT_HTTP_URL")
+        self.ws_url = env.get("ONEBOT_WS_URL")
+        self.access_token = env.get("ONEBOT_ACCESS_TOKEN")
+        self.target_groups = self._parse_target_groups(env)
+        # 并发发送的线程数
+        self.max_workers = max(1, int(env.get("ONEBOT_MAX_WORKERS", "5")))
+        # 每秒最多调用 send_group_msg 的次数（按接口地址共享），0 表示不限
+        self.rate_limit = float(env.get("ONEBOT_RATE_LIMIT", "5"))
+        self.rate_burst = float(env.get("ONEBOT_RATE_BURST", "0"))
 
         # 验证配置
-        if not self.onebot_url:
+        if self.transport not in ("http", "ws"):
+            logging.error(f"不支持的 OneBot 传输方式: {self.transport}")
+            raise ValueError(f"不支持的 OneBot 传输方式: {self.transport}")
+
+        if self.transport == "ws" and not self.ws_url:
+            logging.error("OneBot WebSocket URL 未配置，请设置环境变量 ONEBOT_WS_URL")
+            raise ValueError("OneBot WebSocket URL 未配置")
+
+        if self.transport == "ws" and importlib.util.find_spec("websocket") is None:
+            # 在创建时报错，而不是等到第一次发送
+            logging.error(
+                "OneBot WebSocket 传输需要 websocket-client，请执行 pip install websocket-client"
+            )
+            raise ValueError("OneBot WebSocket 传输需要 websocket-client")
+
+        if self.transport == "http" and not self.onebot_url:
             logging.error("OneBot HTTP URL 未配置，请设置环境变量 ONEBOT_HTTP_URL")
             raise ValueError("OneBot HTTP URL 未配置")
 
-        if not self.target_groups:
+        if config is None and not self.target_groups:
             logging.warning("未配置目标群组，请设置环境变量 ONEBOT_TARGET_GROUPS")
 
-    def _parse_target_groups(self) -> List[str]:
+        self.api_url = (
+            f"{self.onebot_url.rstrip('/')}/send_group_msg" if self.onebot_url else None
+        )
+        self.headers = self._build_headers()
+        # 限流按实际使用的接口地址共享
+        self.endpoint = self.ws_url if self.transport == "ws" else self.onebot_url
+        # WebSocket 客户端在首次发送时才建立连接
+        self.ws_client = (
+            OneBotWebSocketClient(self.ws_url, self.access_token)
+            if self.transport == "ws"
+            else None
+        )
+
+        # 复用连接，连接池大小与并发线程数一致
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # 线程池随发送器长期存在，线程按需创建
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="onebot"
+        )
+        # 进行中的发送数
+        self._active = 0
+        self._idle = threading.Condition()
+
+    @classmethod
+    def from_account(cls, options: Mapping[str, Any]) -> "OneBotSender":
+        """
+        按群组注册表中的账号配置创建发送器
+
+        Args:
+            options (Mapping): 账号配置，如 {"http_url": ..., "rate_limit": 5}，
+                键为去掉 ONEBOT_ 前缀的小写环境变量名
+
+        Returns:
+            OneBotSender: 发送器
+        """
+        return cls(
+            {f"ONEBOT_{key.upper()}": str(value) for key, value in options.items()}
+        )
+
+    def close(self):
+        """关闭线程池、连接池和 WebSocket 连接"""
+        self.executor.shutdown(wait=False)
+        self.session.close()
+        if self.ws_client is not None:
+            self.ws_client.close()
+
+    def acquire(self):
+        """标记为使用中，release() 之前 retire() 不会关闭发送器"""
+        with self._idle:
+            self._active += 1
+
+    def release(self):
+        """结束 acquire() 的使用"""
+        with self._idle:
+            self._active -= 1
+            self._idle.notify_all()
+
+    def retire(self, grace: float = RETIRE_GRACE):
+        """
+        停用发送器，进行中的发送结束后（最多等待 grace 秒）在后台关闭
+
+        配置变化时旧发送器可能仍在其他线程中使用，不能立即关闭，
+        也不能交给垃圾回收（线程池、连接池和 WebSocket 读线程不会随之释放）
+
+        Args:
+            grace (float): 最长等待秒数
+        """
+
+        def close_when_idle():
+            with self._idle:
+                self._idle.wait_for(lambda: self._active == 0, grace)
+            self.close()
+
+        threading.Thread(
+            target=close_when_idle, name="onebot-retire", daemon=True
+        ).start()
+
+    def _parse_target_groups(self, env: Mapping[str, str]) -> List[str]:
         """
         解析目标群组ID列表
         从环境变量 ONEBOT_TARGET_GROUPS 中读取，支持逗号分隔
@@ -44,7 +195,7 @@ class OneBotSender:
         Returns:
             List[str]: 群组ID列表
         """
-        groups_str = os.environ.get("ONEBOT_TARGET_GROUPS", "")
+        groups_str = env.get("ONEBOT_TARGET_GROUPS", "")
         if not groups_str:
             return []
 
@@ -67,6 +218,7 @@ class OneBotSender:
 
         return headers
 
+    @_in_flight
     def send_group_message(
         self, group_id: str, message: Union[str, List[Dict[str, Any]]]
     ) -> Dict[str, Any]:
@@ -82,12 +234,42 @@ class OneBotSender:
         Returns:
             Dict[str, Any]: API响应结果
         """
+        if self.transport == "ws":
+            return self._wait_ws(group_id, self._send_ws(group_id, message))
+
         if not self.onebot_url:
             return {"error": "OneBot URL 未配置"}
 
-        # 构建API端点
-        api_url = f"{self.onebot_url.rstrip('/')}/send_group_msg"
+        data = self._build_params(group_id, message)
+
+        response = None
+        try:
+            response = self.session.post(
+                self.api_url, data=json.dumps(data), timeout=10
+            )
+            # 网关错误等返回的 HTML 页面不是 OneBot 响应，按状态码报错
+            if response.status_code >= 500:
+                error_msg = f"HTTP {response.status_code}"
+            else:
+                return self._handle_result(group_id, response.json())
+        except ValueError as e:
+            # 包括 requests 的 JSONDecodeError（同时也是 RequestException）
+            error_msg = f"响应解析失败: {str(e)}"
+        except requests.exceptions.RequestException as e:
+            error_msg = f"网络请求失败: {str(e)}"
+        except Exception as e:
+            error_msg = f"未知错误: {str(e)}"
+
+        content = response.text[:200] if response is not None else ""
+        logging.error(
+            f"OneBot消息发送失败 - 群组: {group_id}, {error_msg}，响应内容: {content}"
+        )
+        return {"error": error_msg}
 
+    def _build_params(
+        self, group_id: str, message: Union[str, List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """构建 send_group_msg 的参数"""
         # 处理消息格式
         if isinstance(message, str):
             # 字符串格式：转换为消息段格式
@@ -97,45 +279,95 @@ class OneBotSender:
             formatted_message = message
 
         # 构建请求数据（group_id 保持字符串格式以匹配示例）
-        data = {"group_id": group_id, "message": formatted_message}
-
-        headers = self._build_headers()
+        return {"group_id": group_id, "message": formatted_message}
 
-        try:
-            response = requests.post(
-                api_url, headers=headers, data=json.dumps(data), timeout=10
-            )
-
-            result = response.json()
-
-            if result.get("status") == "ok":
-                logging.info(f"OneBot消息发送成功 - 群组: {group_id}")
-                return result
-            else:
-                error_msg = result.get("message", "未知错误")
-                logging.error(
-                    f"OneBot消息发送失败 - 群组: {group_id}, 错误: {error_msg}，响应内容: {result}"
-                )
-                return {"error": error_msg}
-
-        except requests.exceptions.RequestException as e:
-            error_msg = f"网络请求失败: {str(e)}"
+    def _handle_result(self, group_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """根据 OneBot 响应判断发送结果（HTTP 与 WebSocket 共用）"""
+        if result.get("status") == "ok":
+            logging.info(f"OneBot消息发送成功 - 群组: {group_id}")
+            return result
+        else:
+            error_msg = result.get("message", "未知错误")
             logging.error(
-                f"OneBot消息发送失败 - 群组: {group_id}, {error_msg}，响应内容: {result}"
+                f"OneBot消息发送失败 - 群组: {group_id}, 错误: {error_msg}，响应内容: {result}"
             )
             return {"error": error_msg}
-        except json.JSONDecodeError as e:
-            error_msg = f"响应解析失败: {str(e)}"
-            logging.error(
-                f"OneBot消息发送失败 - 群组: {group_id}, {error_msg}，响应内容: {result}"
-            )
+
+    def _send_ws(
+        self, group_id: str, message: Union[str, List[Dict[str, Any]]]
+    ) -> Future:
+        """通过 WebSocket 发出 send_group_msg，不等待响应"""
+        return self.ws_client.call_async(
+            "send_group_msg", self._build_params(group_id, message)
+        )
+
+    def _wait_ws(self, group_id: str, future: Future) -> Dict[str, Any]:
+        """等待 WebSocket 响应并转换为发送结果"""
+        try:
+            result = future.result(self.ws_client.timeout)
+        except FutureTimeoutError:
+            error_msg = "等待响应超时"
+            logging.error(f"OneBot消息发送失败 - 群组: {group_id}, {error_msg}")
             return {"error": error_msg}
         except Exception as e:
-            error_msg = f"未知错误: {str(e)}"
-            logging.error(
-                f"OneBot消息发送失败 - 群组: {group_id}, {error_msg}，响应内容: {result}"
-            )
+            error_msg = f"WebSocket 发送失败: {str(e)}"
+            logging.error(f"OneBot消息发送失败 - 群组: {group_id}, {error_msg}")
             return {"error": error_msg}
+        return self._handle_result(group_id, result)
+
+    @_in_flight
+    def _fan_out(
+        self, group_ids: List[str], message: Union[str, List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        并发向多个群组发送消息
+
+        HTTP 传输使用发送器的线程池并发请求；WebSocket 传输在同一连接上
+        连续发出全部请求再统一等待响应。两种方式共用同一接口的令牌桶，
+        避免超过 OneBot 实现的频率限制
+
+        Returns:
+            Dict[str, Any]: 发送结果汇总，包含每个群组的耗时
+        """
+        bucket = get_bucket(self.endpoint, self.rate_limit, self.rate_burst)
+        start = time.perf_counter()
+
+        if self.transport == "ws":
+            pending = []
+            for group_id in group_ids:
+                bucket.acquire()
+                pending.append((time.perf_counter(), self._send_ws(group_id, message)))
+            outcomes = []
+            for group_id, (sent_at, future) in zip(group_ids, pending):
+                result = self._wait_ws(group_id, future)
+                outcomes.append((result, time.perf_counter() - sent_at))
+        else:
+
+            def send(group_id):
+                bucket.acquire()
+                sent_at = time.perf_counter()
+                result = self.send_group_message(group_id, message)
+                return result, time.perf_counter() - sent_at
+
+            outcomes = list(self.executor.map(send, group_ids))
+
+        results = {}
+        latencies = {}
+        success_count = 0
+        for group_id, (result, latency) in zip(group_ids, outcomes):
+            results[group_id] = result
+            latencies[group_id] = round(latency, 3)
+            if "error" not in result:
+                success_count += 1
+
+        return {
+            "total_groups": len(group_ids),
+            "success_count": success_count,
+            "failed_count": len(group_ids) - success_count,
+            "results": results,
+            "latencies": latencies,
+            "elapsed": round(time.perf_counter() - start, 3),
+        }
 
     def send_to_all_groups(
         self, message: Union[str, List[Dict[str, Any]]]
@@ -155,26 +387,13 @@ class OneBotSender:
             logging.warning("没有配置目标群组")
             return {"error": "没有配置目标群组"}
 
-        results = {}
-        success_count = 0
-
-        for group_id in self.target_groups:
-            result = self.send_group_message(group_id, message)
-            results[group_id] = result
-
-            if "error" not in result:
-                success_count += 1
-
-        summary = {
-            "total_groups": len(self.target_groups),
-            "success_count": success_count,
-            "failed_count": len(self.target_groups) - success_count,
-            "results": results,
-        }
+        summary = self._fan_out(self.target_groups, message)
+        success_count = summary["success_count"]
 
         if success_count > 0:
             logging.info(
-                f"OneBot批量发送完成: {success_count}/{len(self.target_groups)} 个群组发送成功"
+                f"OneBot批量发送完成: {success_count}/{len(self.target_groups)} 个群组发送成功，"
+                f"耗时{summary['elapsed']}秒"
             )
         else:
             logging.error("OneBot批量发送失败: 所有群组发送均失败")
@@ -199,29 +418,65 @@ class OneBotSender:
         if not group_ids:
             return {"error": "群组列表为空"}
 
-        results = {}
-        success_count = 0
-
-        for group_id in group_ids:
-            result = self.send_group_message(group_id, message)
-            results[group_id] = result
-
-            if "error" not in result:
-                success_count += 1
-
-        summary = {
-            "total_groups": len(group_ids),
-            "success_count": success_count,
-            "failed_count": len(group_ids) - success_count,
-            "results": results,
-        }
+        summary = self._fan_out(group_ids, message)
 
         logging.info(
-            f"OneBot指定群组发送完成: {success_count}/{len(group_ids)} 个群组发送成功"
+            f"OneBot指定群组发送完成: {summary['success_count']}/{len(group_ids)} 个群组发送成功，"
+            f"耗时{summary['elapsed']}秒"
         )
         return summary
 
 
+_sender: Optional[OneBotSender] = None
+_sender_fingerprint = None
+_sender_lock = threading.Lock()
+
+
+def get_onebot_sender(acquire: bool = False) -> OneBotSender:
+    """
+    获取共享的OneBot发送器
+
+    首次调用时创建，之后直接复用；.env 或相关环境变量变化时重新创建
+
+    Args:
+        acquire (bool): 在取得发送器的同一把锁内标记为使用中（见 OneBotSender.acquire），
+            调用方发送结束后须调用 release()；此后其他线程重建发送器时，旧发送器会等待这次
+            发送结束再关闭。只读取配置时不需要
+
+    Returns:
+        OneBotSender: 发送器
+
+    Raises:
+        ValueError: OneBot HTTP URL / WebSocket URL 未配置
+    """
+    global _sender, _sender_fingerprint
+
+    reload_env_if_changed()
+    fingerprint = env_fingerprint(ONEBOT_CONFIG_KEYS)
+    with _sender_lock:
+        if _sender is None or fingerprint != _sender_fingerprint:
+            previous = _sender
+            _sender = OneBotSender()
+            _sender_fingerprint = fingerprint
+            if previous is not None:
+                # 旧发送器可能仍在其他线程中使用，发送结束后再关闭
+                previous.retire()
+                logging.info("OneBot配置已变化，已重新创建发送器")
+        if acquire:
+            _sender.acquire()
+        return _sender
+
+
+@contextlib.contextmanager
+def using_onebot_sender() -> Iterator[OneBotSender]:
+    """with 块内使用共享的发送器，块结束前发送器不会因配置变化被关闭"""
+    sender = get_onebot_sender(acquire=True)
+    try:
+        yield sender
+    finally:
+        sender.release()
+
+
 # 便捷函数，保持与feishu模块相似的接口
 def onebot_send_all(message: Union[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
     """
@@ -236,8 +491,8 @@ def onebot_send_all(message: Union[str, List[Dict[str, Any]]]) -> Dict[str, Any]
         Dict[str, Any]: 发送结果
     """
     try:
-        sender = OneBotSender()
-        return sender.send_to_all_groups(message)
+        with using_onebot_sender() as sender:
+            return sender.send_to_all_groups(message)
     except Exception as e:
         error_msg = f"OneBot发送失败: {str(e)}"
         logging.error(error_msg)
@@ -260,8 +515,8 @@ def onebot_send_groups(
         Dict[str, Any]: 发送结果
     """
     try:
-        sender = OneBotSender()
-        return sender.send_to_specific_groups(group_ids, message)
+        with using_onebot_sender() as sender:
+            return sender.send_to_specific_groups(group_ids, message)
     except Exception as e:
         error_msg = f"OneBot发送失败: {str(e)}"
         logging.error(error_msg)
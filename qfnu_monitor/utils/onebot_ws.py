@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OneBot v11 正向 WebSocket 客户端
+保持一条长连接，断线自动重连，通过 echo 字段匹配请求与响应，
+多个动作可以连续发出后再统一等待结果（流水线）
+
+依赖 websocket-client：pip install websocket-client
+"""
+
+import itertools
+import json
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+
+class OneBotWebSocketClient:
+    """OneBot v11 正向 WebSocket 客户端"""
+
+    def __init__(
+        self,
+        url: str,
+        access_token: Optional[str] = None,
+        timeout: float = 10,
+        max_reconnect_interval: float = 30,
+    ):
+        """
+        初始化客户端（不会立即连接，首次调用动作时建立连接）
+
+        Args:
+            url (str): WebSocket 地址，如 ws://127.0.0.1:3001
+            access_token (str, optional): 访问令牌
+            timeout (float): 连接和等待响应的超时秒数
+            max_reconnect_interval (float): 重连退避的最大间隔秒数
+        """
+        try:
+            import websocket
+        except ImportError as e:
+            raise ImportError(
+                "OneBot WebSocket 传输需要 websocket-client，请执行 pip install websocket-client"
+            ) from e
+
+        self._websocket = websocket
+        self.url = url
+        self.access_token = access_token
+        self.timeout = timeout
+        self.max_reconnect_interval = max_reconnect_interval
+
+        self._ws = None
+        self._connected = threading.Event()
+        self._closed = threading.Event()
+        self._send_lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._echo_counter = itertools.count(1)
+        self._receiver: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        """启动接收线程（负责连接、接收和重连）"""
+        with self._start_lock:
+            if self._receiver is None or not self._receiver.is_alive():
+                self._closed.clear()
+                self._receiver = threading.Thread(
+                    target=self._run, name="onebot-ws", daemon=True
+                )
+                self._receiver.start()
+
+    def _connect(self):
+        header = []
+        if self.access_token:
+            header.append(f"Authorization: Bearer {self.access_token}")
+        ws = self._websocket.create_connection(
+            self.url, header=header, timeout=self.timeout
+        )
+        # 接收线程阻塞等待消息，不设读超时
+        ws.settimeout(None)
+        return ws
+
+    def _run(self):
+        """接收循环，断线后按指数退避重连"""
+        interval = 1.0
+        while not self._closed.is_set():
+            try:
+                self._ws = self._connect()
+            except Exception as e:
+                logging.warning(
+                    f"OneBot WebSocket 连接失败，{interval:.0f}秒后重试: {e}"
+                )
+                self._closed.wait(interval)
+                interval = min(interval * 2, self.max_reconnect_interval)
+                continue
+
+            interval = 1.0
+            self._connected.set()
+            logging.info(f"OneBot WebSocket 已连接: {self.url}")
+            try:
+                while not self._closed.is_set():
+                    self._dispatch(self._ws.recv())
+            except Exception as e:
+                if not self._closed.is_set():
+                    logging.warning(f"OneBot WebSocket 连接断开，准备重连: {e}")
+            finally:
+                self._connected.clear()
+                self._fail_pending(ConnectionError("OneBot WebSocket 连接断开"))
+                try:
+                    self._ws.close()
+                except Exception:
+                    pass
+
+    def _dispatch(self, raw: Any):
+        """将响应交给对应 echo 的请求，事件上报直接忽略"""
+        if not raw:
+            return
+        try:
+            payload = json.loads(raw)
+        except (TypeError, ValueError):
+            logging.warning(f"OneBot WebSocket 收到无法解析的消息: {raw!r}")
+            return
+
+        echo = payload.get("echo") if isinstance(payload, dict) else None
+        if echo is None:
+            return
+        with self._pending_lock:
+            future = self._pending.pop(str(echo), None)
+        if future is not None and not future.done():
+            future.set_result(payload)
+
+    def _fail_pending(self, error: Exception):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def call_async(self, action: str, params: Dict[str, Any]) -> Future:
+        """
+        发出动作请求，不等待响应
+
+        Args:
+            action (str): 动作名，如 send_group_msg
+            params (dict): 动作参数
+
+        Returns:
+            Future: 结果为 OneBot 响应字典
+        """
+        self._start()
+        future: Future = Future()
+        if not self._connected.wait(self.timeout):
+            future.set_exception(ConnectionError("OneBot WebSocket 未连接"))
+            return future
+
+        echo = str(next(self._echo_counter))
+        with self._pending_lock:
+            self._pending[echo] = future
+        frame = json.dumps({"action": action, "params": params, "echo": echo})
+        try:
+            with self._send_lock:
+                self._ws.send(frame)
+        except Exception as e:
+            with self._pending_lock:
+                self._pending.pop(echo, None)
+            future.set_exception(ConnectionError(f"OneBot WebSocket 发送失败: {e}"))
+        return future
+
+    def call(
+        self, action: str, params: Dict[str, Any], timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        发出动作请求并等待响应
+
+        Raises:
+            ConnectionError: 连接不可用
+            concurrent.futures.TimeoutError: 等待响应超时
+        """
+        return self.call_async(action, params).result(timeout or self.timeout)
+
+    def close(self):
+        """关闭连接并停止重连"""
+        self._closed.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        self._fail_pending(ConnectionError("OneBot WebSocket 已关闭"))
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+通知发件箱
+监控器发现新公告后只把通知事件写入发件箱，由分发器在监控周期结束后统一推送：
+- 每个事件一个文件（data/outbox/<事件ID>.json），随数据目录一起提交，跨运行持久保存
+- 每个渠道单独记录状态、尝试次数和下次重试时间，失败后按指数退避重试
+- 同一事件的各渠道（见 notifiers 注册表）并行推送，每个渠道有独立的超时
+- 每次发送都有幂等键（事件ID:渠道[:群号]），已送达的键记录在事件中，重试时跳过
+- 推送过程中每送达一条就追加到检查点文件（<事件ID>.checkpoint.jsonl），
+  进程在向大量群组推送的中途退出时，下次运行从检查点继续
+- 全部渠道完成后删除事件文件，事件ID写入已送达记录，相同事件不会重复入队
+- 汇总模式（NOTIFY_DIGEST=1）下，同一周期或汇总窗口内推送渠道相同的多个事件合并为一条消息推送
+- 事件只保存公告、模板名和模板上下文，消息在推送时按各渠道的格式渲染
+- 超过平台大小限制的消息按公告边界切分为多条，按顺序发送
+
+推送是至少一次语义：发送成功但记录前进程中断时，下次运行会再发一次
+"""
+
+import copy
+import hashlib
+import json
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Tuple
+from qfnu_monitor.utils import metrics, tracing
+from qfnu_monitor.utils.message import get_template
+from qfnu_monitor.utils.notifiers import (
+    Notifier,
+    configured_notifiers,
+    get_notifier,
+)
+from qfnu_monitor.utils.search_index import notice_key
+from qfnu_monitor.utils.storage import write_json
+
+CHECKPOINT_SUFFIX = ".checkpoint.jsonl"
+
+PENDING = "pending"
+DELIVERED = "delivered"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class DeliveredKeys(list):
+    """已送达的幂等键，追加时同时写入检查点文件（可在多个线程中追加）"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, keys: List[str], path: str, channel: str):
+        super().__init__(keys)
+        self.path = path
+        self.channel = channel
+
+    def append(self, key: str):
+        super().append(key)
+        line = json.dumps({"channel": self.channel, "key": key}, ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class Outbox:
+    """持久化的通知发件箱"""
+
+    def __init__(
+        self,
+        data_dir: str,
+        max_attempts: int = 8,
+        base_delay: float = 60,
+        max_delay: float = 3600,
+        retention_days: int = 30,
+        digest: Optional[bool] = None,
+        digest_window: Optional[float] = None,
+    ):
+        """
+        初始化发件箱
+
+        Args:
+            data_dir (str): 数据目录，事件保存在其下的 outbox/
+            max_attempts (int): 每个渠道的最大尝试次数，超过后移入 outbox/failed/
+            base_delay (float): 首次重试前的等待秒数，之后每次翻倍
+            max_delay (float): 重试等待的上限秒数
+            retention_days (int): 已送达事件ID的保留天数（用于入队去重）
+            digest (bool, optional): 是否合并推送，默认读取环境变量 NOTIFY_DIGEST
+            digest_window (float, optional): 汇总窗口秒数，最早的事件等待这么久后
+                才合并推送，默认读取 NOTIFY_DIGEST_WINDOW，0 表示每次分发都推送
+        """
+        self.outbox_dir = os.path.join(data_dir, "outbox")
+        self.failed_dir = os.path.join(self.outbox_dir, "failed")
+        self.ledger_file = os.path.join(self.outbox_dir, "delivered.json")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retention = retention_days * 86400
+        if digest is None:
+            digest = os.environ.get("NOTIFY_DIGEST", "").lower() in ("1", "true", "yes")
+        if digest_window is None:
+            digest_window = float(os.environ.get("NOTIFY_DIGEST_WINDOW", "0"))
+        self.digest = digest
+        self.digest_window = digest_window
+
+    @staticmethod
+    def event_id(site: str, notices: List[Dict[str, Any]]) -> str:
+        """由站点和公告标识计算事件ID，同一批公告总是得到相同的ID"""
+        keys = sorted(notice_key(notice) for notice in notices)
+        digest = hashlib.sha1("\n".join([site, *keys]).encode("utf-8")).hexdigest()
+        return f"{site}-{digest[:16]}"
+
+    def _event_path(self, event_id: str) -> str:
+        return os.path.join(self.outbox_dir, f"{event_id}.json")
+
+    def _checkpoint_path(self, event_id: str) -> str:
+        return os.path.join(self.outbox_dir, f"{event_id}{CHECKPOINT_SUFFIX}")
+
+    def _restore_checkpoint(self, event: Dict[str, Any]):
+        """把检查点中记录的送达合并到事件中（上次推送中途退出时）"""
+        path = self._checkpoint_path(event["id"])
+        if not os.path.exists(path):
+            return
+        restored = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 写入中途退出时最后一行可能不完整
+                    continue
+                state = event["channels"].get(record.get("channel"))
+                if state is not None and record["key"] not in state["delivered"]:
+                    state["delivered"].append(record["key"])
+                    restored += 1
+        if restored:
+            logging.info(f"通知事件{event['id']}从检查点恢复了{restored}条送达记录")
+
+    def _load_ledger(self) -> Dict[str, int]:
+        try:
+            with open(self.ledger_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.error(f"读取发件箱送达记录失败: {e}")
+            return {}
+
+    def enqueue(
+        self,
+        site: str,
+        notices: List[Dict[str, Any]],
+        template: str = "standard",
+        context: Optional[Dict[str, Any]] = None,
+        channels: Optional[List[str]] = None,
+    ) -> Optional[str]:
+        """
+        将通知事件写入发件箱（写入完成后才返回，失败时抛出异常）
+
+        Args:
+            site (str): 站点标识，如 jwc_gg
+            notices (list): 本次的新公告
+            template (str): 消息模板名，见 message.register_template
+            context (dict, optional): 模板上下文，如 {"site_name": ..., "noun": "公告"}
+            channels (list, optional): 需要推送的渠道，默认为已配置的全部渠道
+
+        Returns:
+            str: 事件ID，事件已在发件箱、已送达或没有可用渠道时返回 None
+        """
+        event_id = self.event_id(site, notices)
+        path = self._event_path(event_id)
+        if os.path.exists(path) or event_id in self._load_ledger():
+            logging.info(f"通知事件{event_id}已在发件箱中或已送达，跳过")
+            return None
+
+        # 模板名写错时在入队时就报错，而不是推送时才失败
+        get_template(template)
+        channels = channels or configured_notifiers()
+        if not channels:
+            logging.warning("未配置任何通知渠道，不推送新公告")
+            return None
+
+        now = int(time.time())
+        event = {
+            "id": event_id,
+            "site": site,
+            "created_at": now,
+            "sections": [
+                {
+                    "site": site,
+                    "template": template,
+                    "context": context or {},
+                    "notices": notices,
+                }
+            ],
+            "channels": {
+                channel: {
+                    "status": PENDING,
+                    "attempts": 0,
+                    "next_attempt": now,
+                    "delivered": [],
+                }
+                for channel in channels
+            },
+        }
+        os.makedirs(self.outbox_dir, exist_ok=True)
+        write_json(path, event)
+        logging.info(f"已将{len(notices)}条公告的通知加入发件箱: {event_id}")
+        return event_id
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """按入队时间返回发件箱中的事件"""
+        if not os.path.isdir(self.outbox_dir):
+            return []
+
+        events = []
+        filenames = os.listdir(self.outbox_dir)
+        for filename in filenames:
+            path = os.path.join(self.outbox_dir, filename)
+            if filename.endswith(CHECKPOINT_SUFFIX):
+                # 事件已完成但推送线程超时后仍写入的检查点
+                if filename[: -len(CHECKPOINT_SUFFIX)] + ".json" not in filenames:
+                    os.remove(path)
+                continue
+            if not filename.endswith(".json") or path == self.ledger_file:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    event = json.load(f)
+                self._restore_checkpoint(event)
+                events.append(event)
+            except Exception as e:
+                logging.error(f"读取通知事件{filename}失败: {e}")
+        return sorted(events, key=lambda event: (event["created_at"], event["id"]))
+
+    @staticmethod
+    def _untouched(event: Dict[str, Any]) -> bool:
+        """事件的所有渠道都还未尝试过推送（含中途退出、检查点中已有送达的）"""
+        return all(
+            state["status"] == PENDING
+            and not state["attempts"]
+            and not state["delivered"]
+            for state in event["channels"].values()
+        )
+
+    def _merge_digest(self, now: float, wait: bool = True) -> List[str]:
+        """
+        汇总模式：把还未推送过的事件合并为汇总事件
+
+        推送渠道相同的事件合并为一个汇总事件，渠道不同的事件分别合并，不会推送到
+        原事件没有的渠道；已经尝试过推送的事件保持原样按各自的进度重试
+
+        Args:
+            now (float): 当前时间戳
+            wait (bool): 是否等待汇总窗口结束
+
+        Returns:
+            List[str]: 仍在汇总窗口内、本次不推送的事件ID
+        """
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for event in self.pending():
+            if self._untouched(event):
+                groups.setdefault(tuple(sorted(event["channels"])), []).append(event)
+
+        held = []
+        for events in groups.values():
+            oldest = min(event["created_at"] for event in events)
+            if wait and now - oldest < self.digest_window:
+                held.extend(event["id"] for event in events)
+            elif len(events) > 1:
+                self._write_digest(events, now)
+        return held
+
+    def _write_digest(self, events: List[Dict[str, Any]], now: float) -> str:
+        """把渠道相同的多个事件合并为一个汇总事件写入发件箱，返回汇总事件ID"""
+        source_ids = sorted(event["id"] for event in events)
+        digest_id = (
+            "digest-"
+            + hashlib.sha1("\n".join(source_ids).encode("utf-8")).hexdigest()[:16]
+        )
+        sections = [section for event in events for section in event["sections"]]
+
+        int_now = int(now)
+        digest = {
+            "id": digest_id,
+            "site": "digest",
+            "created_at": int_now,
+            "merged_from": source_ids,
+            "sections": sections,
+            "channels": {
+                channel: {
+                    "status": PENDING,
+                    "attempts": 0,
+                    "next_attempt": int_now,
+                    "delivered": [],
+                }
+                for channel in events[0]["channels"]
+            },
+        }
+        # 先写入汇总事件再移除原事件，中途退出最多重复推送，不会丢失
+        write_json(self._event_path(digest_id), digest)
+        ledger = self._load_ledger()
+        for event_id in source_ids:
+            ledger[event_id] = int_now
+            os.remove(self._event_path(event_id))
+        write_json(self.ledger_file, ledger)
+        logging.info(f"已将{len(source_ids)}个通知事件合并为汇总通知: {digest_id}")
+        return digest_id
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+
+    def _finish(self, event: Dict[str, Any]):
+        """事件的全部渠道已完成：记录送达并移出发件箱，有失败渠道时保留到 failed/"""
+        path = self._event_path(event["id"])
+        if any(state["status"] == FAILED for state in event["channels"].values()):
+            os.makedirs(self.failed_dir, exist_ok=True)
+            write_json(os.path.join(self.failed_dir, f"{event['id']}.json"), event)
+            logging.error(f"通知事件{event['id']}多次推送失败，已移入{self.failed_dir}")
+
+        now = int(time.time())
+        ledger = self._load_ledger()
+        ledger[event["id"]] = now
+        ledger = {
+            event_id: finished_at
+            for event_id, finished_at in ledger.items()
+            if now - finished_at <= self.retention
+        }
+        write_json(self.ledger_file, ledger)
+        os.remove(path)
+        self._remove_checkpoint(event["id"])
+
+    def _remove_checkpoint(self, event_id: str):
+        try:
+            os.remove(self._checkpoint_path(event_id))
+        except FileNotFoundError:
+            pass
+
+    def _deliver_all(
+        self, event: Dict[str, Any], due: List[Tuple[str, Notifier]]
+    ) -> Dict[str, Tuple[Optional[str], Dict[str, Any], float]]:
+        """
+        并行推送一个事件到多个渠道
+
+        每个渠道使用状态的副本，超时的渠道保留原状态（之后重试时可能重复推送）
+
+        Returns:
+            dict: 渠道名 -> (错误信息, 新状态, 耗时秒数)，超时的渠道新状态为 None
+        """
+        outcomes = {}
+        if not due:
+            return outcomes
+
+        def run(notifier, state, key):
+            start = time.perf_counter()
+            with tracing.span(
+                f"notify {notifier.name}", "notify", event=event["id"]
+            ) as span:
+                try:
+                    error = notifier.deliver(event, state, key)
+                except Exception as e:
+                    error = f"未知错误: {str(e)}"
+                if error:
+                    span.set(error=error)
+            return error, state, time.perf_counter() - start
+
+        executor = ThreadPoolExecutor(max_workers=len(due), thread_name_prefix="notify")
+        checkpoint = self._checkpoint_path(event["id"])
+        start = time.monotonic()
+        futures = []
+        for channel, notifier in due:
+            state = copy.deepcopy(event["channels"][channel])
+            state["delivered"] = DeliveredKeys(state["delivered"], checkpoint, channel)
+            timeout = float(
+                os.environ.get("NOTIFY_TIMEOUT", notifier.timeout_for(event, state))
+            )
+            key = f"{event['id']}:{channel}"
+            futures.append(
+                (channel, timeout, executor.submit(run, notifier, state, key))
+            )
+
+        for channel, timeout, future in futures:
+            remaining = max(0.0, start + timeout - time.monotonic())
+            try:
+                outcomes[channel] = future.result(remaining)
+            except FutureTimeoutError:
+                outcomes[channel] = (
+                    f"推送超时（{timeout:g}秒）",
+                    None,
+                    time.monotonic() - start,
+                )
+        # 超时的推送线程不等待，由线程自行结束
+        executor.shutdown(wait=False)
+        return outcomes
+
+    def dispatch(
+        self, now: Optional[float] = None, force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        推送发件箱中到期的事件
+
+        Args:
+            now (float, optional): 当前时间戳，默认取系统时间
+            force (bool): 忽略重试等待时间，立即推送全部待推送的事件
+
+        Returns:
+            dict: 本次的 sent、failed、skipped 次数，仍待推送的 pending 事件数，
+                以及 notifiers 中每个渠道的次数和最长耗时
+        """
+        now = time.time() if now is None else now
+        summary = {"sent": 0, "failed": 0, "skipped": 0, "pending": 0, "notifiers": {}}
+
+        def count(channel, field, elapsed=0.0):
+            stats = summary["notifiers"].setdefault(
+                channel, {"sent": 0, "failed": 0, "skipped": 0, "elapsed": 0.0}
+            )
+            stats[field] += 1
+            stats["elapsed"] = round(max(stats["elapsed"], elapsed), 3)
+            summary[field] += 1
+            metrics.NOTIFY_RESULTS.inc(channel=channel, result=field)
+            if field != "skipped":
+                metrics.NOTIFY_SECONDS.observe(elapsed, channel=channel)
+
+        # 强制推送时不等待汇总窗口
+        held = self._merge_digest(now, wait=not force) if self.digest else []
+
+        for event in self.pending():
+            if event["id"] in held:
+                summary["pending"] += 1
+                continue
+
+            due = []
+            for channel, state in event["channels"].items():
+                if state["status"] != PENDING:
+                    continue
+                if state["next_attempt"] > now and not force:
+                    continue
+
+                notifier = get_notifier(channel)
+                if notifier is None or not notifier.configured():
+                    state["status"] = SKIPPED
+                    count(channel, "skipped")
+                    logging.warning(f"{channel}未配置，跳过通知事件{event['id']}")
+                    continue
+                if state["attempts"]:
+                    metrics.RETRIES.inc(channel=channel, kind="event")
+                due.append((channel, notifier))
+
+            timed_out = False
+            for channel, (error, state, elapsed) in self._deliver_all(
+                event, due
+            ).items():
+                if state is None:
+                    # 超时的推送仍在进行，已送达的部分由检查点在下次运行时恢复
+                    timed_out = True
+                    state = event["channels"][channel]
+                event["channels"][channel] = state
+                state["attempts"] += 1
+                if error is None:
+                    state["status"] = DELIVERED
+                    state["delivered_at"] = int(now)
+                    state.pop("last_error", None)
+                    count(channel, "sent", elapsed)
+                    continue
+
+                state["last_error"] = error
+                count(channel, "failed", elapsed)
+                if state["attempts"] >= self.max_attempts:
+                    state["status"] = FAILED
+                else:
+                    state["next_attempt"] = int(now + self._backoff(state["attempts"]))
+                logging.error(
+                    f"通知事件{event['id']}推送到{channel}失败"
+                    f"（第{state['attempts']}次）: {error}"
+                )
+
+            # 每个事件处理完立即落盘，中途退出也不会重复推送已送达的部分
+            if all(state["status"] != PENDING for state in event["channels"].values()):
+                self._finish(event)
+            else:
+                write_json(self._event_path(event["id"]), event)
+                summary["pending"] += 1
+                # 送达记录已写入事件，检查点不再需要
+                if not timed_out:
+                    self._remove_checkpoint(event["id"])
+
+        metrics.OUTBOX_PENDING.set(summary["pending"])
+        return summary
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+性能剖析
+用 cProfile 和 tracemalloc 运行一轮监控或单个监控器，生成：
+- <名称>-<时间>.prof：pstats 原始数据，可用 snakeviz、gprof2dot 等工具查看
+- <名称>-<时间>.txt：按累计耗时和自身耗时排序的函数列表、内存峰值和分配最多的代码行
+
+tracemalloc 会让 Python 代码变慢，报告中的耗时适合比较各函数的占比，不代表真实的绝对耗时
+"""
+
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def _stats_section(profiler: cProfile.Profile, sort: str, limit: int) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue().strip()
+
+
+def profile_call(
+    func: Callable[[], Any],
+    name: str,
+    output_dir: str,
+    limit: int = 30,
+    memory: bool = True,
+) -> Dict[str, Any]:
+    """
+    剖析一次调用并写出报告
+
+    Args:
+        func (callable): 无参数的函数
+        name (str): 报告名称，如 cycle、jwc_gg
+        output_dir (str): 报告目录
+        limit (int): 每个排序列出的函数数
+        memory (bool): 是否用 tracemalloc 统计内存
+
+    Returns:
+        dict: report（文本报告路径）、stats（pstats 文件路径）、elapsed（秒）、
+            peak（内存峰值字节数，未统计内存时为 None）
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    base = os.path.join(output_dir, f"{name}-{stamp}")
+
+    profiler = cProfile.Profile()
+    if memory:
+        tracemalloc.start(10)
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        func()
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        peak = current = None
+        snapshot = None
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    profiler.dump_stats(f"{base}.prof")
+
+    sections = [
+        f"性能剖析: {name}",
+        f"时间: {stamp}，耗时 {elapsed:.3f} 秒"
+        + ("（含 tracemalloc 开销）" if memory else ""),
+    ]
+    if memory:
+        sections.append(
+            f"内存峰值: {_format_size(peak)}，结束时仍占用: {_format_size(current)}"
+        )
+    sections.append(
+        "=== 按累计耗时（cumulative）===\n"
+        + _stats_section(profiler, "cumulative", limit)
+    )
+    sections.append(
+        "=== 按自身耗时（tottime）===\n" + _stats_section(profiler, "tottime", limit)
+    )
+
+    if snapshot is not None:
+        snapshot = snapshot.filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            )
+        )
+        lines = ["=== 结束时仍占用内存最多的代码行 ==="]
+        for stat in snapshot.statistics("lineno")[:limit]:
+            frame = stat.traceback[0]
+            lines.append(
+                f"{_format_size(stat.size):>10}  {stat.count:>7}个  "
+                f"{frame.filename}:{frame.lineno}"
+            )
+        sections.append("\n".join(lines))
+
+    with open(f"{base}.txt", "w", encoding="utf-8") as f:
+        f.write("\n\n".join(sections) + "\n")
+
+    return {
+        "report": f"{base}.txt",
+        "stats": f"{base}.prof",
+        "elapsed": elapsed,
+        "peak": peak,
+    }
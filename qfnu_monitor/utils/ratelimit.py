@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+限流组件
+线程安全的令牌桶，用于限制对推送接口的调用频率
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """令牌桶限流器"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        初始化令牌桶
+
+        Args:
+            rate (float): 每秒补充的令牌数，小于等于 0 表示不限流
+            capacity (float, optional): 桶容量（允许的突发数量），默认等于 rate 且至少为 1
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """
+        获取令牌，令牌不足时阻塞等待
+
+        Args:
+            tokens (float): 需要的令牌数
+            timeout (float, optional): 最长等待秒数，为空时一直等待
+
+        Returns:
+            bool: 是否获取成功
+        """
+        if self.rate <= 0:
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+_buckets: Dict[Tuple[str, float, float], TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(key: str, rate: float, capacity: Optional[float] = None) -> TokenBucket:
+    """
+    获取共享的令牌桶，同一接口的多个发送器共用一个限额
+
+    Args:
+        key (str): 限流对象标识，如接口地址
+        rate (float): 每秒令牌数
+        capacity (float, optional): 桶容量
+    """
+    bucket_key = (key, float(rate), float(capacity or 0))
+    with _buckets_lock:
+        if bucket_key not in _buckets:
+            _buckets[bucket_key] = TokenBucket(rate, capacity)
+        return _buckets[bucket_key]
@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+公告全文检索索引
+基于 SQLite 的持久化倒排索引，中文按字符二元组（bigram）切分，
+并按（日期、站点）建立有序索引，支持按日期范围查询
+
+索引只保存派生数据，可随时从存档重建：
+    data/index/notices.sqlite3
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import logging
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from qfnu_monitor.utils.archive import normalize_date
+
+# 索引结构版本，结构变化时自动重建
+SCHEMA_VERSION = 2
+# 标题命中比简介、正文更重要
+TITLE_WEIGHT = 3
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+@lru_cache(maxsize=None)
+def _patterns():
+    """分词用的正则：汉字范围很大，编译需要数毫秒，只在第一次分词时编译"""
+    return (
+        re.compile(r"[\u3400-\u9fff\uf900-\ufaff]+|[a-z0-9]+"),
+        re.compile(r"[\u3400-\u9fff\uf900-\ufaff]"),
+    )
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    site TEXT NOT NULL,
+    key TEXT NOT NULL,
+    title TEXT NOT NULL,
+    link TEXT NOT NULL,
+    date TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    UNIQUE (site, key)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+CREATE INDEX IF NOT EXISTS docs_date ON docs (date, site);
+CREATE INDEX IF NOT EXISTS docs_site_date ON docs (site, date);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    切分文本
+
+    连续的汉字切分为二元组（单个汉字保留为一元），英文和数字按整词保留
+
+    Args:
+        text (str): 待切分文本
+
+    Returns:
+        List[str]: 词项列表（可能重复）
+    """
+    token_pattern, cjk_pattern = _patterns()
+    tokens = []
+    for run in token_pattern.findall((text or "").lower()):
+        if cjk_pattern.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def notice_key(notice: Dict[str, Any]) -> str:
+    """公告的唯一标识：优先使用 id，其次链接，最后标题"""
+    return str(notice.get("id") or notice.get("link") or notice.get("title", ""))
+
+
+# 记录中参与关键词匹配的文本：标题、简介和正文以空格连接
+_TEXT_SQL = " || ' ' || ".join(
+    f"coalesce(json_extract(data, '$.{field}'), '')"
+    for field in ("title", "description", "body")
+)
+
+
+class NoticeIndex:
+    """公告倒排索引"""
+
+    def __init__(self, data_dir: str, index_file: Optional[str] = None):
+        """
+        初始化索引
+
+        Args:
+            data_dir (str): 数据目录（包含 *_notices.json 和 archive/）
+            index_file (str, optional): 索引文件路径，默认 data/index/notices.sqlite3
+        """
+        self.data_dir = data_dir
+        self.archive_dir = os.path.join(data_dir, "archive")
+        self.index_file = index_file or os.path.join(
+            data_dir, "index", "notices.sqlite3"
+        )
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        # 只有建立过索引时才用到 sqlite3，推送等不检索的运行不导入
+        import sqlite3
+
+        self.conn = sqlite3.connect(self.index_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        """创建表结构，版本不一致时清空旧索引（之后 sync 会重建）"""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            with self.conn:
+                for table in ("docs", "postings", "sources", "meta"):
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        self.conn.executescript(_SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        """关闭索引"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _get_meta(self, key: str) -> int:
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _add_meta(self, key: str, delta: int):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value",
+            (key, delta),
+        )
+
+    def add(self, site: str, notices: Iterable[Dict[str, Any]]) -> int:
+        """
+        添加或更新公告（同一站点下相同标识的公告会被替换）
+
+        Args:
+            site (str): 站点标识
+            notices (Iterable[dict]): 公告列表
+
+        Returns:
+            int: 写入的公告数量
+        """
+        count = 0
+        for notice in notices:
+            key = notice_key(notice)
+            if not key:
+                continue
+
+            terms: Dict[str, int] = {}
+            for term in tokenize(notice.get("title", "")):
+                terms[term] = terms.get(term, 0) + TITLE_WEIGHT
+            for field in ("description", "body"):
+                for term in tokenize(notice.get(field, "")):
+                    terms[term] = terms.get(term, 0) + 1
+            length = sum(terms.values())
+
+            old = self.conn.execute(
+                "SELECT id, length FROM docs WHERE site = ? AND key = ?", (site, key)
+            ).fetchone()
+            if old:
+                self.conn.execute("DELETE FROM postings WHERE doc_id = ?", (old[0],))
+                self.conn.execute("DELETE FROM docs WHERE id = ?", (old[0],))
+                self._add_meta("doc_count", -1)
+                self._add_meta("total_length", -old[1])
+
+            cursor = self.conn.execute(
+                "INSERT INTO docs (site, key, title, link, date, length, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    site,
+                    key,
+                    notice.get("title", ""),
+                    notice.get("link", "") or "",
+                    normalize_date(notice.get("date", "")),
+                    length,
+                    json.dumps(notice, ensure_ascii=False),
+                ),
+            )
+            self.conn.executemany(
+                "INSERT INTO postings (term, doc_id, tf, length) VALUES (?, ?, ?, ?)",
+                [(term, cursor.lastrowid, tf, length) for term, tf in terms.items()],
+            )
+            self._add_meta("doc_count", 1)
+            self._add_meta("total_length", length)
+            count += 1
+        return count
+
+    def _source_state(self, path: str):
+        row = self.conn.execute(
+            "SELECT position, mtime FROM sources WHERE path = ?", (path,)
+        ).fetchone()
+        return row if row else (0, 0.0)
+
+    def _set_source_state(self, path: str, position: int, mtime: float):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sources (path, position, mtime) VALUES (?, ?, ?)",
+            (path, position, mtime),
+        )
+
+    def _sync_shard(self, site: str, path: str) -> int:
+        """增量索引存档分片：只读取上次索引位置之后追加的行"""
+        rel_path = os.path.relpath(path, self.data_dir)
+        position, _ = self._source_state(rel_path)
+        size = os.path.getsize(path)
+        if size == position:
+            return 0
+        if size < position:
+            # 分片被重写过，从头重新索引（相同标识的公告会被替换）
+            position = 0
+
+        with open(path, "rb") as f:
+            f.seek(position)
+            chunk = f.read(size - position)
+
+        # 只处理完整的行，未写完的行留到下次
+        end = chunk.rfind(b"\n") + 1
+        notices = []
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                notices.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                logging.error(f"索引存档分片时跳过损坏记录: {path}, {e}")
+
+        count = self.add(site, notices)
+        self._set_source_state(rel_path, position + end, os.path.getmtime(path))
+        return count
+
+    def _sync_current(self, site: str, path: str) -> int:
+        """索引当前公告文件，文件未变化时跳过"""
+        rel_path = os.path.relpath(path, self.data_dir)
+        _, mtime = self._source_state(rel_path)
+        current_mtime = os.path.getmtime(path)
+        if current_mtime == mtime:
+            return 0
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                notices = json.load(f)
+        except Exception as e:
+            logging.error(f"索引公告文件失败: {path}, {e}")
+            return 0
+
+        count = self.add(site, notices)
+        self._set_source_state(rel_path, 0, current_mtime)
+        return count
+
+    def sync(self) -> int:
+        """
+        增量同步索引：读取存档分片新追加的内容和有变化的当前公告文件
+
+        Returns:
+            int: 本次新索引（或更新）的公告数量
+        """
+        count = 0
+        with self.conn:
+            if os.path.isdir(self.archive_dir):
+                for site in sorted(os.listdir(self.archive_dir)):
+                    site_dir = os.path.join(self.archive_dir, site)
+                    if not os.path.isdir(site_dir):
+                        continue
+                    for filename in sorted(os.listdir(site_dir)):
+                        if filename.endswith(".jsonl"):
+                            count += self._sync_shard(
+                                site, os.path.join(site_dir, filename)
+                            )
+
+            if os.path.isdir(self.data_dir):
+                for filename in sorted(os.listdir(self.data_dir)):
+                    if filename.endswith("_notices.json"):
+                        site = filename[: -len("_notices.json")]
+                        count += self._sync_current(
+                            site, os.path.join(self.data_dir, filename)
+                        )
+
+        if count:
+            logging.info(f"检索索引已更新{count}条公告")
+        return count
+
+    def rebuild(self) -> int:
+        """清空并重建索引"""
+        with self.conn:
+            for table in ("docs", "postings", "sources", "meta"):
+                self.conn.execute(f"DELETE FROM {table}")
+        return self.sync()
+
+    def _postings(
+        self, term: str, site: Optional[str], candidates: Optional[Dict[int, float]]
+    ):
+        """读取词项的倒排表（文档编号、词频、文档长度），候选集较小时只查询候选文档"""
+        sql = "SELECT p.doc_id, p.tf, p.length FROM postings p"
+        params: List[Any] = []
+        if site:
+            sql += " JOIN docs d ON d.id = p.doc_id AND d.site = ?"
+            params.append(site)
+        sql += " WHERE p.term = ?"
+        params.append(term)
+        if candidates is not None and len(candidates) <= 500:
+            sql += f" AND p.doc_id IN ({','.join('?' * len(candidates))})"
+            params.extend(candidates)
+        return self.conn.execute(sql, params)
+
+    def search(
+        self, query: str, site: Optional[str] = None, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        检索公告，要求命中查询中的全部词项，按 BM25 得分和日期排序
+        耗时与最少见词项的文档频率成正比（python -m benchmarks.search_index）
+
+        Args:
+            query (str): 查询文本，如 "补考"
+            site (str, optional): 只检索指定站点
+            limit (int): 最多返回的结果数量
+
+        Returns:
+            List[dict]: 结果列表，包含 site、score 和公告字段
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        doc_count = self._get_meta("doc_count")
+        if not doc_count:
+            return []
+        avg_length = self._get_meta("total_length") / doc_count
+
+        df = {
+            term: self.conn.execute(
+                "SELECT COUNT(*) FROM postings WHERE term = ?", (term,)
+            ).fetchone()[0]
+            for term in terms
+        }
+        if not all(df.values()):
+            return []
+
+        # 按文档频率从低到高求交集并累加 BM25 得分，候选集不超过最少见词项的倒排表
+        scores: Optional[Dict[int, float]] = None
+        for term in sorted(terms, key=df.get):
+            idf = math.log(1 + (doc_count - df[term] + 0.5) / (df[term] + 0.5))
+            matched = {}
+            for doc_id, tf, length in self._postings(term, site, scores):
+                if scores is not None and doc_id not in scores:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                matched[doc_id] = (scores[doc_id] if scores else 0.0) + idf * tf * (
+                    BM25_K1 + 1
+                ) / (tf + norm)
+            scores = matched
+            if not scores:
+                return []
+
+        # 二元组拼接可能误命中，只对靠前的候选加载原文核对整个查询串
+        needle = query.strip().lower()
+        results = []
+        for doc_id, score in heapq.nlargest(
+            limit * 3, scores.items(), key=itemgetter(1)
+        ):
+            doc_site, data = self.conn.execute(
+                "SELECT site, data FROM docs WHERE id = ?", (doc_id,)
+            ).fetchone()
+            notice = json.loads(data)
+            text = " ".join(
+                str(notice.get(field, "")) for field in ("title", "description", "body")
+            ).lower()
+            if needle not in text:
+                score *= 0.5
+            results.append({**notice, "site": doc_site, "score": round(score, 4)})
+
+        results.sort(
+            key=lambda item: (item["score"], item.get("date", "")), reverse=True
+        )
+        return results[:limit]
+
+    def query(
+        self,
+        site: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        keyword: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        ascending: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        按站点、日期范围和关键词查询公告，逐条返回结果
+
+        日期范围通过（日期、站点）有序索引定位，复杂度与结果数量相关，
+        与存档总量无关
+
+        Args:
+            site (str, optional): 站点标识，如 jwc_gg
+            start_date (str, optional): 起始日期（含），YYYY-MM-DD 或 YYYY-MM
+            end_date (str, optional): 结束日期（含）
+            keyword (str, optional): 标题、简介或正文中包含的关键词
+            limit (int, optional): 最多返回的数量
+            offset (int): 跳过的数量
+            ascending (bool): 是否按日期升序，默认最新的在前
+
+        Yields:
+            dict: 公告，附带 site 字段
+        """
+        conditions = []
+        params: List[Any] = []
+        if site:
+            conditions.append("site = ?")
+            params.append(site)
+        if start_date:
+            conditions.append("date >= ?")
+            params.append(normalize_date(start_date) or start_date)
+        if end_date:
+            # 结束日期只有年月时包含整月
+            conditions.append("date <= ?")
+            params.append((normalize_date(end_date) or end_date) + "\uffff")
+
+        if keyword:
+            terms = list(dict.fromkeys(tokenize(keyword)))
+            if terms:
+                conditions.append(
+                    "id IN ("
+                    + " INTERSECT ".join(
+                        "SELECT doc_id FROM postings WHERE term = ?" for _ in terms
+                    )
+                    + ")"
+                )
+                params.extend(terms)
+            # 倒排表只能筛出候选，再核对标题、简介和正文是否包含完整关键词
+            # （与 search 相同，不匹配链接、日期和 JSON 键名）
+            conditions.append(f"instr(lower({_TEXT_SQL}), ?) > 0")
+            params.append(keyword.strip().lower())
+
+        order = "ASC" if ascending else "DESC"
+        sql = "SELECT site, data FROM docs"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY date {order}, id {order} LIMIT ? OFFSET ?"
+        params.extend([limit if limit is not None else -1, offset])
+
+        for doc_site, data in self.conn.execute(sql, params):
+            yield {**json.loads(data), "site": doc_site}
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+状态文件读写组件
+数据目录会被定时任务提交到仓库，写入格式尽量让每轮的 git 变更最小：
+- 每条公告占一行，新增或淘汰一条公告只改动一行
+- 键按字母序输出，相同内容总是得到相同文本
+- 内容未变化时不写文件，写入时先写临时文件再原子替换
+- 公告按发布先后排列（最早的在前），超出数量时从头部归档
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, List
+
+
+def dumps_record(record: Dict[str, Any]) -> str:
+    """将一条记录序列化为单行 JSON，键按字母序"""
+    return json.dumps(record, ensure_ascii=False, sort_keys=True)
+
+
+def dumps_notices(notices: List[Dict[str, Any]]) -> str:
+    """
+    序列化公告列表：合法的 JSON 数组，每条公告一行
+
+    Args:
+        notices (list): 公告列表
+
+    Returns:
+        str: 以换行结尾的文本
+    """
+    if not notices:
+        return "[]\n"
+    return "[\n" + ",\n".join(dumps_record(notice) for notice in notices) + "\n]\n"
+
+
+def write_text_if_changed(path: str, text: str) -> bool:
+    """
+    写入文本文件，内容未变化时跳过
+
+    Args:
+        path (str): 文件路径
+        text (str): 文件内容
+
+    Returns:
+        bool: 是否实际写入
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return True
+
+
+def write_notices(path: str, notices: List[Dict[str, Any]]) -> bool:
+    """
+    保存公告列表
+
+    Args:
+        path (str): 文件路径
+        notices (list): 公告列表
+
+    Returns:
+        bool: 是否实际写入
+    """
+    return write_text_if_changed(path, dumps_notices(notices))
+
+
+_DATE_PATTERN = re.compile(r"(\d{4})\D(\d{1,2})\D(\d{1,2})")
+
+
+def chronological(notices: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    按发布日期从早到晚排列公告，日期相同时保持原有先后
+
+    没有可识别日期的公告沿用前一条公告的日期，即留在原来的相邻位置
+
+    Args:
+        notices (list): 公告列表
+
+    Returns:
+        list: 排列后的新列表
+    """
+    keys = []
+    last = (0, 0, 0)
+    for notice in notices:
+        match = _DATE_PATTERN.search(str(notice.get("date") or ""))
+        if match:
+            last = tuple(int(part) for part in match.groups())
+        keys.append(last)
+    order = sorted(range(len(notices)), key=keys.__getitem__)
+    return [notices[i] for i in order]
+
+
+def reorder_notices(path: str, notices: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    读取公告记录后统一为按发布先后排列，顺序有变化时写回文件
+
+    旧版本首次运行时按网站顺序（最新的在前）保存，之后每批新公告也是最新的在前，
+    这样的文件按位置归档会先归档仍在列表页上的公告；第一次读取时重排并写回，之后不再改动
+
+    Args:
+        path (str): 公告记录文件
+        notices (list): 从文件读取的公告列表
+
+    Returns:
+        list: 按发布先后排列的公告列表
+    """
+    ordered = chronological(notices)
+    if ordered != notices:
+        write_notices(path, ordered)
+    return ordered
+
+
+def write_json(path: str, data: Any) -> bool:
+    """以缩进、键有序的格式保存 JSON（用于清单等小文件）"""
+    text = json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True) + "\n"
+    return write_text_if_changed(path, text)
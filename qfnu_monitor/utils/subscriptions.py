@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+群组订阅规则
+每个渠道的每个目标（QQ 群、飞书机器人等）可以只订阅部分公告：
+
+    {
+        "onebot": {
+            "123456": {"keywords": ["考试", "成绩"]},
+            "654321": {"keywords": ["招生"], "sites": ["zsb_tzgg", "zsb_zskx"]},
+            "*": {"exclude": ["讲座"]}
+        },
+        "feishu": {
+            "default": {"exclude": ["招聘"]},
+            "admissions": {"url": "...", "secret": "...", "sites": ["zsb_zskx"]}
+        }
+    }
+
+- keywords：标题包含任一关键词才推送，为空时不限
+- sites：只推送这些站点的公告，为空时不限
+- exclude：标题包含任一排除词时不推送
+- "*" 为该渠道未单独配置的目标使用的规则；没有规则的目标接收全部公告
+
+所有规则的关键词和排除词构建为一个 Aho-Corasick 自动机，每条标题只扫描一遍即可得到
+命中的全部目标，匹配耗时与规则数量无关（不区分大小写）
+
+规则文件默认为项目根目录的 subscriptions.json，可用环境变量 NOTIFY_SUBSCRIPTIONS 指定，
+文件修改后自动重新加载。文件可能包含机器人地址和密钥，不纳入版本库
+（见 examples/subscriptions.example.json）
+"""
+
+import json
+import os
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from qfnu_monitor.utils.config import PROJECT_ROOT
+from qfnu_monitor.utils.message import Section
+
+DEFAULT_SUBSCRIPTIONS_FILE = os.path.join(PROJECT_ROOT, "subscriptions.json")
+
+# 未单独配置的目标使用的规则名
+WILDCARD = "*"
+
+
+class AhoCorasick:
+    """多模式串匹配自动机"""
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        构建自动机
+
+        Args:
+            patterns (Iterable[str]): 模式串，按顺序编号
+        """
+        self.patterns = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+
+        for index, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (index,)
+
+        # 按层构建失败指针，并把失败状态的输出合并进来
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._output[next_state] += self._output[fail]
+
+    def search(self, text: str) -> Set[int]:
+        """
+        查找文本中出现的模式串
+
+        Args:
+            text (str): 文本
+
+        Returns:
+            Set[int]: 出现的模式串编号
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class Rule(NamedTuple):
+    """一个目标的订阅规则"""
+
+    keywords: Tuple[str, ...] = ()
+    sites: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = ()
+    # 目标的其他配置，如飞书机器人的 url、secret
+    options: Dict[str, Any] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "Rule":
+        def words(name):
+            return tuple(str(word).strip().lower() for word in config.get(name, ()))
+
+        return cls(
+            keywords=words("keywords"),
+            sites=tuple(config.get("sites", ())),
+            exclude=words("exclude"),
+            options={
+                key: value
+                for key, value in config.items()
+                if key not in ("keywords", "sites", "exclude")
+            },
+        )
+
+
+class SubscriptionRouter:
+    """按订阅规则把公告分配给各渠道的目标"""
+
+    def __init__(self, config: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        编译订阅规则
+
+        Args:
+            config (dict, optional): 渠道 -> 目标 -> 规则，格式见模块说明
+        """
+        self.rules: Dict[str, Dict[str, Rule]] = {
+            channel: {
+                str(target): Rule.from_config(rule or {})
+                for target, rule in targets.items()
+            }
+            for channel, targets in (config or {}).items()
+        }
+
+        # 每个词对应的 (渠道, 目标, 是否为排除词)
+        words: Dict[str, List[Tuple[str, str, bool]]] = {}
+        for channel, targets in self.rules.items():
+            for target, rule in targets.items():
+                for word in rule.keywords:
+                    words.setdefault(word, []).append((channel, target, False))
+                for word in rule.exclude:
+                    words.setdefault(word, []).append((channel, target, True))
+        self._word_targets = list(words.values())
+        self._automaton = AhoCorasick(words)
+        self._hits_cache: Dict[str, Dict[Tuple[str, str], Tuple[bool, bool]]] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> "SubscriptionRouter":
+        """从 JSON 文件加载规则，文件不存在时不做过滤"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def targets(self, channel: str) -> List[str]:
+        """规则中单独配置的目标（不含 "*"）"""
+        return [t for t in self.rules.get(channel, {}) if t != WILDCARD]
+
+    def rule(self, channel: str, target: str) -> Optional[Rule]:
+        """目标的规则，没有单独配置时使用 "*" 的规则"""
+        rules = self.rules.get(channel, {})
+        return rules.get(target, rules.get(WILDCARD))
+
+    def _hits(self, title: str) -> Dict[Tuple[str, str], Tuple[bool, bool]]:
+        """标题命中的 (渠道, 目标) -> (命中关键词, 命中排除词)"""
+        hits = self._hits_cache.get(title)
+        if hits is not None:
+            return hits
+
+        hits = {}
+        for index in self._automaton.search(title.lower()):
+            for channel, target, excluded in self._word_targets[index]:
+                keyword_hit, exclude_hit = hits.get((channel, target), (False, False))
+                hits[(channel, target)] = (
+                    keyword_hit or not excluded,
+                    exclude_hit or excluded,
+                )
+        # 同一批公告会在多个渠道中路由，缓存扫描结果
+        if len(self._hits_cache) >= 4096:
+            self._hits_cache.clear()
+        self._hits_cache[title] = hits
+        return hits
+
+    def route(
+        self, channel: str, targets: List[str], sections: List[Section]
+    ) -> Dict[str, List[Section]]:
+        """
+        为每个目标筛选公告
+
+        Args:
+            channel (str): 渠道名
+            targets (List[str]): 目标列表
+            sections (List[Section]): 事件中的各小节
+
+        Returns:
+            Dict[str, List[Section]]: 目标 -> 只含该目标订阅的公告的小节，
+                没有订阅任何公告的目标不在结果中
+        """
+        rules = {target: self.rule(channel, target) for target in targets}
+        if not any(rules.values()):
+            return {target: sections for target in targets}
+
+        routed: Dict[str, List[Section]] = {target: [] for target in targets}
+        for section in sections:
+            selected: Dict[str, List[Dict[str, Any]]] = {}
+            for notice in section.notices:
+                hits = self._hits(notice.get("title", ""))
+                for target, rule in rules.items():
+                    if rule is None:
+                        selected.setdefault(target, []).append(notice)
+                        continue
+                    if rule.sites and section.site not in rule.sites:
+                        continue
+                    # 没有单独配置的目标使用 "*" 的命中结果
+                    name = target if target in self.rules[channel] else WILDCARD
+                    keyword_hit, exclude_hit = hits.get((channel, name), (False, False))
+                    if exclude_hit or (rule.keywords and not keyword_hit):
+                        continue
+                    selected.setdefault(target, []).append(notice)
+
+            for target, notices in selected.items():
+                routed[target].append(section._replace(notices=notices))
+        return {target: routed[target] for target in targets if routed[target]}
+
+
+_router: Optional[SubscriptionRouter] = None
+_router_key: Optional[Tuple[str, float]] = None
+_router_lock = threading.Lock()
+
+
+def subscriptions_file() -> str:
+    """订阅规则文件路径"""
+    return os.environ.get("NOTIFY_SUBSCRIPTIONS") or DEFAULT_SUBSCRIPTIONS_FILE
+
+
+def get_router() -> SubscriptionRouter:
+    """
+    获取共享的订阅路由，规则文件修改后重新编译
+
+    规则文件格式错误时记录错误并继续使用上一次的规则
+
+    Returns:
+        SubscriptionRouter: 订阅路由
+    """
+    global _router, _router_key
+
+    path = subscriptions_file()
+    try:
+        key = (path, os.path.getmtime(path))
+    except OSError:
+        key = (path, 0.0)
+
+    with _router_lock:
+        if _router is None or key != _router_key:
+            try:
+                _router = SubscriptionRouter.from_file(path)
+                if key[1]:
+                    logging.info(f"已加载订阅规则: {path}")
+            except (ValueError, AttributeError, TypeError) as e:
+                logging.error(f"订阅规则 {path} 格式错误: {e}")
+                if _router is None:
+                    _router = SubscriptionRouter()
+            _router_key = key
+        return _router
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地链路追踪
+记录一轮监控中的嵌套耗时区间（span）：每轮、每个监控器、每个阶段、每个 HTTP 请求
+（新建连接时还有 connect 和其中的 dns+tcp，二者之差为 TLS 握手）、每次渠道推送和
+每条 OneBot / 飞书消息，并带有网站、主机、状态码、字节数等属性
+
+每轮结束后导出为 Chrome Trace Event 格式的 JSON 文件，可以离线在 https://ui.perfetto.dev
+或 chrome://tracing 中打开；不同线程（并行推送、OneBot 分片）显示为不同的泳道
+
+--trace / TRACE_FILE 指定文件后启用，路径中的 {cycle} 替换为轮次，否则每轮覆盖同一文件；
+未启用时 span() 为空操作
+"""
+
+import json
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Span:
+    """一个耗时区间"""
+
+    __slots__ = ("name", "category", "start", "duration", "thread", "attrs")
+
+    def __init__(self, name: str, category: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.thread = threading.current_thread()
+        self.start = time.perf_counter()
+        self.duration = 0.0
+
+    def set(self, **attrs):
+        """设置属性"""
+        self.attrs.update(attrs)
+
+
+class _NullSpan:
+    """未启用时的 span，属性直接丢弃"""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+# 当前所在的 span，用于判断 HTTP 请求、连接是否在追踪范围内
+current_span: ContextVar[Any] = ContextVar("current_span", default=NULL_SPAN)
+
+
+class Tracer:
+    """收集一轮的 span 并导出"""
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+        # perf_counter 与墙上时间的对应关系，导出时换算为微秒时间戳
+        self._epoch = time.time() - time.perf_counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def record(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    def export(self, cycle: str = "") -> Optional[str]:
+        """
+        把已收集的 span 写入文件并清空
+
+        Args:
+            cycle (str): 轮次，替换路径中的 {cycle}
+
+        Returns:
+            str: 写入的文件路径，未启用或没有 span 时为 None
+        """
+        with self._lock:
+            spans, self._spans = self._spans, []
+        if not self.enabled or not spans:
+            return None
+
+        pid = os.getpid()
+        threads: Dict[int, str] = {}
+        events: List[Dict[str, Any]] = []
+        for span in spans:
+            tid = span.thread.ident or 0
+            threads.setdefault(tid, span.thread.name)
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": round((self._epoch + span.start) * 1e6, 1),
+                    "dur": round(span.duration * 1e6, 1),
+                    "pid": pid,
+                    "tid": tid,
+                    "args": span.attrs,
+                }
+            )
+        for tid, name in threads.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": name},
+                }
+            )
+
+        path = self.path.replace("{cycle}", cycle or "trace")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{pid}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"traceEvents": events, "displayTimeUnit": "ms"},
+                f,
+                ensure_ascii=False,
+                default=str,
+            )
+        os.replace(tmp_path, path)
+        return path
+
+
+TRACER = Tracer()
+
+
+@contextmanager
+def span(name: str, category: str = "monitor", **attrs) -> Iterator[Any]:
+    """
+    记录一个耗时区间，区间内抛出的异常记为 error 属性后继续抛出
+
+        with tracing.span("HTTP GET", "http", host=host) as s:
+            response = send()
+            s.set(status=response.status_code)
+
+    Args:
+        name (str): 名称
+        category (str): 分类，如 cycle、monitor、stage、http、notify
+        **attrs: 属性
+
+    Yields:
+        Span: 可设置属性的 span，未启用时为空操作对象
+    """
+    if not TRACER.enabled:
+        yield NULL_SPAN
+        return
+
+    current = Span(name, category, attrs)
+    token = current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.start
+        current_span.reset(token)
+        TRACER.record(current)
+
+
+_patched = False
+
+
+def _patch_connections():
+    """记录 urllib3 新建连接的耗时：connect（含 TLS 握手）和其中的 dns+tcp"""
+    global _patched
+    if _patched:
+        return
+    _patched = True
+
+    try:
+        from urllib3.connection import HTTPConnection, HTTPSConnection
+    except ImportError:
+        return
+
+    def wrap(method, name):
+        def traced(conn, *args, **kwargs):
+            if current_span.get() is NULL_SPAN:
+                return method(conn, *args, **kwargs)
+            with span(name, "http", host=conn.host, port=conn.port):
+                return method(conn, *args, **kwargs)
+
+        return traced
+
+    HTTPConnection.connect = wrap(HTTPConnection.connect, "connect")
+    HTTPSConnection.connect = wrap(HTTPSConnection.connect, "connect")
+    HTTPConnection._new_conn = wrap(HTTPConnection._new_conn, "dns+tcp")
+
+
+def configure(path: Optional[str] = None):
+    """
+    按参数或环境变量启用追踪
+
+    Args:
+        path (str, optional): 导出文件路径，默认读取 TRACE_FILE，为空时不启用
+    """
+    path = os.environ.get("TRACE_FILE") if path is None else path
+    TRACER.path = path or None
+    if TRACER.enabled:
+        _patch_connections()
+        logging.info(f"已启用链路追踪，每轮结束后导出到 {TRACER.path}")
@@ -0,0 +1,37 @@
+import json
+import os
+
+from qfnu_monitor.utils.archive import ShardedArchive
+
+
+def notice(i, month):
+    return {
+        "title": f"公告{i}",
+        "date": f"2024-{month:02d}-01",
+        "link": f"http://a/{i}",
+    }
+
+
+def test_reader_indexes_shards_with_corrupt_records(tmp_path):
+    archive = ShardedArchive(str(tmp_path), "jwc_gg")
+    archive.append([notice(1, 1), notice(2, 1), notice(3, 2), notice(4, 2)])
+    with open(archive.shard_path("2024-01"), "a", encoding="utf-8") as f:
+        f.write('{"title": "损坏\n')
+        f.write(json.dumps(notice(5, 1), ensure_ascii=False) + "\n")
+
+    # 重建清单时跳过损坏记录
+    os.remove(archive.manifest_file)
+    archive = ShardedArchive(str(tmp_path), "jwc_gg")
+    assert archive.manifest["shards"]["2024-01"]["count"] == 3
+
+    with archive.open_reader() as reader:
+        assert len(reader) == 6
+        lines = []
+        for key in reader.keys:
+            with open(archive.shard_path(key), "rb") as f:
+                lines += f.read().splitlines()
+        assert [reader.raw(i) for i in range(len(reader))] == lines
+        # 损坏记录之后的记录和下一个分片的记录都能按下标取到
+        assert reader[3]["title"] == "公告5"
+        assert reader[4]["title"] == "公告3"
+        assert reader[-1]["title"] == "公告4"
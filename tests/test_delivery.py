@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import time
+import zlib
+
+import pytest
+
+from qfnu_monitor.utils import notifiers, subscriptions
+from qfnu_monitor.utils.delivery import DeliveryEngine
+from qfnu_monitor.utils.onebot import OneBotSender
+from qfnu_monitor.utils.outbox import Outbox
+
+ACCOUNT = {"http_url": "http://127.0.0.1:9", "rate_limit": 0, "max_workers": 3}
+
+
+def write_registry(path, accounts, groups, mtime=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"accounts": accounts, "groups": groups}, f)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def registry_file(tmp_path, monkeypatch):
+    path = tmp_path / "groups.json"
+    monkeypatch.setenv("ONEBOT_GROUPS_FILE", str(path))
+    return path
+
+
+class Recorder:
+    """代替实际发送，记录 (线程名, 群号, 消息)，群号在 failing 中时返回错误"""
+
+    def __init__(self):
+        self.calls = []
+        self.failing = set()
+        self._lock = threading.Lock()
+
+    def send(self, group_id, message):
+        with self._lock:
+            self.calls.append((threading.current_thread().name, group_id, message))
+        if group_id in self.failing:
+            return {"error": "群不存在"}
+        return {"status": "ok"}
+
+    def groups(self):
+        return sorted(group_id for _, group_id, _ in self.calls)
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    recorder = Recorder()
+    monkeypatch.setattr(
+        OneBotSender,
+        "send_group_message",
+        lambda sender, group_id, message: recorder.send(group_id, message),
+    )
+    return recorder
+
+
+def wait_closed(sender, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if sender.executor._shutdown:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_account_config_change_retires_previous_sender(registry_file):
+    account = {"http_url": "http://127.0.0.1:9", "rate_limit": 0}
+    write_registry(registry_file, {"bot2": account}, {"1": {"account": "bot2"}}, 1000)
+    engine = DeliveryEngine()
+    first = engine.sender("bot2")
+    assert engine.sender("bot2") is first
+
+    account["max_workers"] = 2
+    write_registry(registry_file, {"bot2": account}, {"1": {"account": "bot2"}}, 2000)
+    second = engine.sender("bot2")
+
+    assert second is not first
+    assert second.max_workers == 2
+    assert wait_closed(first)
+    second.close()
+
+
+def test_groups_are_sharded_by_account_and_group_hash(registry_file):
+    groups = {str(i): {"account": "bot2"} for i in range(20)}
+    groups["99"] = {"account": "missing"}
+    write_registry(registry_file, {"bot2": ACCOUNT}, groups)
+    engine = DeliveryEngine()
+
+    errors = {}
+    shards = engine._shards(list(groups), errors)
+
+    expected = {}
+    for i in range(20):
+        shard = zlib.crc32(str(i).encode("utf-8")) % ACCOUNT["max_workers"]
+        expected.setdefault(("bot2", shard), []).append(str(i))
+    assert shards == expected
+    assert list(errors) == ["99"]
+    # 分片只取决于群号，重复计算结果相同
+    assert engine._shards(list(groups), {}) == shards
+    engine.sender("bot2").close()
+
+
+def test_deliver_keeps_group_order_and_stops_after_failure(registry_file, sent):
+    groups = [str(i) for i in range(6)]
+    write_registry(
+        registry_file, {"bot2": ACCOUNT}, {g: {"account": "bot2"} for g in groups}
+    )
+    sent.failing.add("3")
+    jobs = {g: [(f"k{n}", f"{g}-{n}") for n in range(3)] for g in groups}
+    delivered = []
+    engine = DeliveryEngine(global_rate=0)
+
+    stats = engine.deliver(jobs, delivered.append)
+
+    assert stats["messages"] == 18
+    assert stats["sent"] == 15
+    assert stats["failed"] == 1
+    assert list(stats["errors"]) == ["3"]
+    assert stats["accounts"] == {"bot2": {"sent": 15, "failed": 1}}
+    for g in groups:
+        calls = [call for call in sent.calls if call[1] == g]
+        expected = [f"{g}-0"] if g == "3" else [f"{g}-{n}" for n in range(3)]
+        assert [message for _, _, message in calls] == expected
+        # 同一群组的消息由同一个分片线程发送
+        assert len({thread for thread, _, _ in calls}) == 1
+    assert sorted(delivered) == sorted(
+        f"k{n}:{g}" for g in groups if g != "3" for n in range(3)
+    )
+    engine.sender("bot2").close()
+
+
+def test_dispatch_resumes_from_checkpoint(tmp_path, registry_file, sent, monkeypatch):
+    monkeypatch.setenv("NOTIFY_SUBSCRIPTIONS", str(tmp_path / "subscriptions.json"))
+    monkeypatch.setattr(subscriptions, "_router", None)
+    monkeypatch.delenv("ONEBOT_HTTP_URL", raising=False)
+    monkeypatch.delenv("ONEBOT_TRANSPORT", raising=False)
+    monkeypatch.delenv("NOTIFY_TIMEOUT", raising=False)
+    engine = DeliveryEngine(global_rate=0)
+    monkeypatch.setattr(notifiers, "get_delivery_engine", lambda: engine)
+    write_registry(
+        registry_file, {"bot2": ACCOUNT}, {g: {"account": "bot2"} for g in "123"}
+    )
+
+    outbox = Outbox(str(tmp_path / "data"), digest=False)
+    notice = {"title": "期末考试安排", "date": "2025-01-02", "link": "http://a/1"}
+    context = {"site_name": "教务处", "noun": "公告"}
+    event_id = outbox.enqueue("jwc_gg", [notice], context=context, channels=["onebot"])
+
+    # 上次推送送达群 1 后进程退出，检查点最后一行只写了一半
+    key = f"{event_id}:onebot"
+    with open(outbox._checkpoint_path(event_id), "w", encoding="utf-8") as f:
+        f.write(json.dumps({"channel": "onebot", "key": f"{key}:1"}) + "\n")
+        f.write('{"channel": "onebot", "ke')
+
+    sent.failing.add("3")
+    summary = outbox.dispatch(force=True)
+    assert sent.groups() == ["2", "3"]
+    assert summary["failed"] == 1
+    (event,) = outbox.pending()
+    assert event["channels"]["onebot"]["delivered"] == [f"{key}:1", f"{key}:2"]
+    # 送达记录已写入事件，检查点已删除
+    assert not os.path.exists(outbox._checkpoint_path(event_id))
+
+    sent.calls.clear()
+    sent.failing.clear()
+    summary = outbox.dispatch(force=True)
+    assert sent.groups() == ["3"]
+    assert summary["sent"] == 1
+    assert outbox.pending() == []
+    engine.sender("bot2").close()
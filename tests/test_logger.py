@@ -0,0 +1,37 @@
+import os
+import time
+
+from qfnu_monitor.utils import logger
+
+
+def touch(path, age_days):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("old\n")
+    mtime = time.time() - age_days * 86400
+    os.utime(path, (mtime, mtime))
+
+
+def test_setup_prunes_legacy_and_rotated_logs_by_default(tmp_path, monkeypatch):
+    monkeypatch.delenv("LOG_RETENTION_DAYS", raising=False)
+    touch(tmp_path / "monitor_20240101_000000.log", 30)
+    touch(tmp_path / "monitor.log.2024-01-01.gz", 30)
+    touch(tmp_path / "monitor_20240301_000000.log", 1)
+    touch(tmp_path / "other.log", 30)
+
+    logger.setup_logger("test_prune", str(tmp_path / "monitor.log"))
+    logger.shutdown()
+
+    assert sorted(os.listdir(tmp_path)) == [
+        "monitor_20240301_000000.log",
+        "other.log",
+    ]
+
+
+def test_retention_zero_keeps_old_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOG_RETENTION_DAYS", "0")
+    touch(tmp_path / "monitor_20240101_000000.log", 30)
+
+    logger.setup_logger("test_keep", str(tmp_path / "monitor.log"))
+    logger.shutdown()
+
+    assert os.listdir(tmp_path) == ["monitor_20240101_000000.log"]
@@ -0,0 +1,124 @@
+import pytest
+
+from benchmarks.render_messages import (
+    CONTEXT,
+    legacy_feishu,
+    legacy_onebot,
+    make_notices,
+)
+from qfnu_monitor.utils.message import (
+    Line,
+    MessageTemplate,
+    Section,
+    render_post,
+    render_segments,
+    render_text,
+)
+
+JWC_CONTEXT = {"site_name": "曲阜师范大学教务处", "noun": "公告"}
+
+JWC_NOTICES = [
+    {
+        "title": "关于2024年补考安排的通知",
+        "link": "https://jwc.qfnu.edu.cn/info/1.htm",
+        "date": "2024-03-01",
+    },
+    {
+        "title": "关于{选课}的通知",
+        "link": "https://jwc.qfnu.edu.cn/info/2.htm",
+        "date": "2024-03-02",
+    },
+]
+
+# 覆盖条件行和截断的边界：无发布者、浏览量为 0、简介恰好 80 / 100 字、无简介
+ZSKX_NOTICES = make_notices(6) + [
+    {
+        "title": "无发布者",
+        "date": "2024-07-01",
+        "link": "https://zsb.qfnu.edu.cn/article/a",
+        "publisher": "",
+        "hits": 0,
+        "is_new": False,
+        "description": "简" * 80,
+    },
+    {
+        "title": "简介恰好一百字",
+        "date": "2024-07-02",
+        "link": "https://zsb.qfnu.edu.cn/article/b",
+        "publisher": "招生办",
+        "hits": 3,
+        "is_new": True,
+        "description": "简" * 100,
+    },
+    {
+        "title": "无简介",
+        "date": "2024-07-03",
+        "link": "https://zsb.qfnu.edu.cn/article/c",
+        "publisher": "招生办",
+        "hits": 1,
+        "is_new": False,
+        "description": "",
+    },
+]
+
+
+def baseline_jwc_feishu(notices):
+    """基线版本 qfnu_jwc_gg.push_to_feishu 中的消息"""
+    title = f"📢 曲阜师范大学教务处有{len(notices)}条新公告"
+    content = ""
+    for i, notice in enumerate(notices, 1):
+        content += f"【{i}】{notice['title']}\n"
+        content += f"📅 {notice['date']}\n"
+        content += f"🔗 {notice['link']}\n\n"
+    return title, content
+
+
+def baseline_jwc_onebot(notices):
+    """基线版本 qfnu_jwc_gg.push_to_onebot 中的消息"""
+    message = f"📢 曲阜师范大学教务处有{len(notices)}条新公告\n\n"
+    for i, notice in enumerate(notices, 1):
+        message += f"【{i}】{notice['title']}\n"
+        message += f"📅 {notice['date']}\n"
+        message += f"🔗 {notice['link']}\n\n"
+    return message
+
+
+def test_standard_template_matches_baseline_messages():
+    sections = [Section("standard", JWC_CONTEXT, JWC_NOTICES)]
+    assert render_post(sections, "feishu") == baseline_jwc_feishu(JWC_NOTICES)
+    assert render_text(sections, "onebot") == baseline_jwc_onebot(JWC_NOTICES)
+
+
+def test_detailed_template_matches_baseline_messages():
+    sections = [Section("detailed", CONTEXT, ZSKX_NOTICES)]
+    assert render_post(sections, "feishu") == legacy_feishu(ZSKX_NOTICES)
+    assert render_text(sections, "onebot") == legacy_onebot(ZSKX_NOTICES)
+
+
+def test_segments_concatenate_to_text():
+    sections = [Section("detailed", CONTEXT, ZSKX_NOTICES)]
+    segments = render_segments(sections, "onebot")
+    assert "".join(s["data"]["text"] for s in segments) == render_text(
+        sections, "onebot"
+    )
+
+
+def test_conditional_first_line_and_format_specs():
+    template = MessageTemplate(
+        header="{count}条",
+        lines=[Line("[{tag}]", when="tag"), Line("{index:>2}. {title!r}")],
+    )
+    compiled = template.compile("onebot")
+    blocks = compiled.blocks([{"tag": "新", "title": "a"}, {"title": "b"}])
+    assert blocks == ["[新]\n 1. 'a'", " 2. 'b'"]
+    assert compiled.title(2, {}) == "2条"
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["{title:{width}}", "{notice.title}", "{items[0]}", "{title!x}", "{title"],
+)
+def test_invalid_lines_fail_when_compiled(text):
+    template = MessageTemplate(header="{count}", lines=[Line(text)])
+    with pytest.raises(ValueError):
+        template.compile("feishu")
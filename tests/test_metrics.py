@@ -0,0 +1,22 @@
+from qfnu_monitor.utils.metrics import Counter, Gauge
+
+
+def test_counter_metadata_matches_sample_name():
+    metric = Counter("qfnu_test_events", "测试事件数", ["site"])
+    metric.inc(site="jwc_gg")
+    metric.inc(2, site="jwc_gg")
+    assert metric.render().splitlines() == [
+        "# HELP qfnu_test_events_total 测试事件数",
+        "# TYPE qfnu_test_events_total counter",
+        'qfnu_test_events_total{site="jwc_gg"} 3',
+    ]
+
+
+def test_gauge_keeps_its_name():
+    metric = Gauge("qfnu_test_pending", "待推送事件数")
+    metric.set(4)
+    assert metric.render().splitlines() == [
+        "# HELP qfnu_test_pending 待推送事件数",
+        "# TYPE qfnu_test_pending gauge",
+        "qfnu_test_pending 4",
+    ]
@@ -0,0 +1,36 @@
+import pytest
+
+from qfnu_monitor.utils import notifiers
+from qfnu_monitor.utils.notifiers import Notifier, register_notifier
+
+
+class IncompleteNotifier(Notifier):
+    name = "incomplete"
+
+    def configured(self):
+        return True
+
+
+class DummyNotifier(IncompleteNotifier):
+    name = "dummy"
+
+    def deliver(self, event, state, key):
+        return None
+
+
+def test_incomplete_notifier_cannot_be_registered():
+    with pytest.raises(TypeError):
+        register_notifier(IncompleteNotifier())
+
+
+def test_register_notifier_validates_instances(monkeypatch):
+    monkeypatch.setattr(notifiers, "NOTIFIERS", {})
+    with pytest.raises(TypeError):
+        register_notifier(DummyNotifier)
+    unnamed = DummyNotifier()
+    unnamed.name = ""
+    with pytest.raises(ValueError):
+        register_notifier(unnamed)
+
+    notifier = register_notifier(DummyNotifier())
+    assert notifiers.get_notifier("dummy") is notifier
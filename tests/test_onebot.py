@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from qfnu_monitor.utils import onebot
+from qfnu_monitor.utils.onebot import OneBotSender
+
+
+def make_sender():
+    return OneBotSender(
+        {"ONEBOT_HTTP_URL": "http://127.0.0.1:9", "ONEBOT_RATE_LIMIT": "0"}
+    )
+
+
+def wait_closed(sender, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if sender.executor._shutdown:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_retire_waits_for_in_flight_sends():
+    sender = make_sender()
+    started = threading.Event()
+    release = threading.Event()
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {"status": "ok", "retcode": 0}
+
+    def post(*args, **kwargs):
+        started.set()
+        release.wait(5)
+        return Response()
+
+    sender.session.post = post
+    results = []
+    worker = threading.Thread(
+        target=lambda: results.append(sender.send_group_message("1", "hi"))
+    )
+    worker.start()
+    assert started.wait(2)
+
+    sender.retire(grace=5)
+    assert not wait_closed(sender, timeout=0.2)
+
+    release.set()
+    worker.join(2)
+    assert results == [{"status": "ok", "retcode": 0}]
+    assert wait_closed(sender)
+
+
+def test_retire_closes_idle_sender_immediately():
+    sender = make_sender()
+    sender.retire()
+    assert wait_closed(sender)
+
+
+def test_config_change_retires_previous_shared_sender(monkeypatch):
+    monkeypatch.setattr(onebot, "_sender", None)
+    monkeypatch.setenv("ONEBOT_TRANSPORT", "http")
+    monkeypatch.setenv("ONEBOT_HTTP_URL", "http://127.0.0.1:9")
+    first = onebot.get_onebot_sender()
+    assert onebot.get_onebot_sender() is first
+
+    monkeypatch.setenv("ONEBOT_HTTP_URL", "http://127.0.0.1:10")
+    second = onebot.get_onebot_sender()
+
+    assert second is not first
+    assert wait_closed(first)
+    assert not second.executor._shutdown
+    second.close()
+
+
+def test_sender_in_use_is_not_closed_by_config_change(monkeypatch):
+    monkeypatch.setattr(onebot, "_sender", None)
+    monkeypatch.setenv("ONEBOT_TRANSPORT", "http")
+    monkeypatch.setenv("ONEBOT_HTTP_URL", "http://127.0.0.1:9")
+    monkeypatch.setenv("ONEBOT_TARGET_GROUPS", "1,2")
+    monkeypatch.setenv("ONEBOT_RATE_LIMIT", "0")
+
+    with onebot.using_onebot_sender() as first:
+        # 取得发送器后、开始发送前配置变化
+        monkeypatch.setenv("ONEBOT_HTTP_URL", "http://127.0.0.1:10")
+        second = onebot.get_onebot_sender()
+        assert second is not first
+        assert not wait_closed(first, timeout=0.2)
+
+        first.send_group_message = lambda group_id, message: {"retcode": 0}
+        summary = first.send_to_all_groups("hi")
+        assert summary["success_count"] == 2
+
+    assert wait_closed(first)
+    second.close()
+
+
+def test_ws_transport_without_websocket_client_fails_on_construction(monkeypatch):
+    find_spec = onebot.importlib.util.find_spec
+    monkeypatch.setattr(
+        onebot.importlib.util,
+        "find_spec",
+        lambda name, *args: None if name == "websocket" else find_spec(name, *args),
+    )
+    with pytest.raises(ValueError, match="websocket-client"):
+        OneBotSender({"ONEBOT_TRANSPORT": "ws", "ONEBOT_WS_URL": "ws://127.0.0.1:9"})
@@ -0,0 +1,206 @@
+import json
+import os
+import time
+
+import pytest
+
+from qfnu_monitor.utils import notifiers
+from qfnu_monitor.utils.notifiers import Notifier, part_key
+from qfnu_monitor.utils.outbox import DeliveredKeys, Outbox
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    return Outbox(str(tmp_path), digest=True, digest_window=600)
+
+
+def enqueue(outbox, site, channels, created_at=1000):
+    notices = [{"title": f"{site}公告", "link": f"http://{site}/1"}]
+    event_id = outbox.enqueue(site, notices, channels=channels)
+    path = outbox._event_path(event_id)
+    with open(path, "r", encoding="utf-8") as f:
+        event = json.load(f)
+    event["created_at"] = created_at
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(event, f)
+    return event_id
+
+
+class FlakyNotifier(Notifier):
+    """每个事件分两部分发送，第二部分先失败 failures 次"""
+
+    name = "flaky"
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+
+    def configured(self):
+        return True
+
+    def deliver(self, event, state, key):
+        for index in (1, 2):
+            current_key = part_key(key, index, 2)
+            if current_key in state["delivered"]:
+                continue
+            if index == 2 and self.failures:
+                self.failures -= 1
+                return "发送失败"
+            self.sent.append(current_key)
+            state["delivered"].append(current_key)
+        return None
+
+
+@pytest.fixture
+def flaky(monkeypatch):
+    notifier = FlakyNotifier()
+    monkeypatch.setattr(notifiers, "NOTIFIERS", {notifier.name: notifier})
+    return notifier
+
+
+@pytest.fixture
+def plain(tmp_path):
+    return Outbox(str(tmp_path), max_attempts=3, base_delay=60, digest=False)
+
+
+NOTICES = [{"title": "考试安排", "link": "http://jwc/1"}]
+
+
+def by_channels(events):
+    return {tuple(sorted(event["channels"])): event for event in events}
+
+
+def test_digest_keeps_channel_sets_apart(outbox):
+    both = [enqueue(outbox, site, ["feishu", "onebot"]) for site in ("a", "b")]
+    onebot = [enqueue(outbox, site, ["onebot"]) for site in ("c", "d")]
+    single = enqueue(outbox, "e", ["webhook"])
+
+    assert outbox._merge_digest(2000) == []
+
+    events = by_channels(outbox.pending())
+    assert set(events) == {("feishu", "onebot"), ("onebot",), ("webhook",)}
+    assert events[("feishu", "onebot")]["merged_from"] == sorted(both)
+    assert [s["site"] for s in events[("feishu", "onebot")]["sections"]] == ["a", "b"]
+    assert events[("onebot",)]["merged_from"] == sorted(onebot)
+    # 渠道唯一的事件不需要合并
+    assert events[("webhook",)]["id"] == single
+
+    # 原事件记入送达记录，不会再次入队
+    assert outbox.enqueue("a", [{"title": "a公告", "link": "http://a/1"}]) is None
+
+
+def test_digest_window_is_per_channel_set(outbox):
+    old = [enqueue(outbox, site, ["feishu"], created_at=1000) for site in ("a", "b")]
+    new = [enqueue(outbox, site, ["onebot"], created_at=1500) for site in ("c", "d")]
+
+    # 两组都在窗口内
+    assert sorted(outbox._merge_digest(1200)) == sorted(old + new)
+    assert len(outbox.pending()) == 4
+
+    # 只有较早的一组满窗口
+    assert sorted(outbox._merge_digest(1700)) == sorted(new)
+    events = outbox.pending()
+    assert sorted(event["id"] for event in events if "merged_from" not in event) == (
+        sorted(new)
+    )
+    assert by_channels(events)[("feishu",)]["merged_from"] == sorted(old)
+
+    # 强制推送时不等待窗口
+    assert outbox._merge_digest(1700, wait=False) == []
+    assert by_channels(outbox.pending())[("onebot",)]["merged_from"] == sorted(new)
+
+
+def test_attempted_events_are_not_merged(outbox):
+    retrying = enqueue(outbox, "a", ["feishu"])
+    fresh = [enqueue(outbox, site, ["feishu"]) for site in ("b", "c")]
+    path = outbox._event_path(retrying)
+    with open(path, "r", encoding="utf-8") as f:
+        event = json.load(f)
+    event["channels"]["feishu"]["attempts"] = 1
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(event, f)
+
+    outbox._merge_digest(2000)
+
+    ids = {event["id"]: event for event in outbox.pending()}
+    assert retrying in ids
+    (digest,) = [event for event in ids.values() if "merged_from" in event]
+    assert digest["merged_from"] == sorted(fresh)
+
+
+def test_enqueue_skips_queued_and_delivered_events(plain, flaky):
+    event_id = plain.enqueue("jwc_gg", NOTICES)
+    assert event_id is not None
+    # 已在发件箱中
+    assert plain.enqueue("jwc_gg", NOTICES) is None
+
+    assert plain.dispatch()["sent"] == 1
+    assert plain.pending() == []
+    # 已送达，记录在送达记录中
+    assert event_id in plain._load_ledger()
+    assert plain.enqueue("jwc_gg", NOTICES) is None
+    assert plain.enqueue("jwc_gg", NOTICES + [{"link": "http://jwc/2"}]) is not None
+
+
+def test_retry_with_backoff_skips_delivered_keys(plain, flaky):
+    flaky.failures = 2
+    event_id = plain.enqueue("jwc_gg", NOTICES)
+    key = f"{event_id}:flaky"
+    now = time.time()
+
+    assert plain.dispatch(now)["failed"] == 1
+    (state,) = [event["channels"]["flaky"] for event in plain.pending()]
+    assert state["attempts"] == 1
+    assert state["next_attempt"] == int(now + 60)
+    assert state["delivered"] == [f"{key}#1"]
+
+    # 未到重试时间
+    assert plain.dispatch(now + 30)["failed"] == 0
+    assert flaky.sent == [f"{key}#1"]
+
+    # 第二次失败后等待时间翻倍
+    assert plain.dispatch(now + 60)["failed"] == 1
+    (state,) = [event["channels"]["flaky"] for event in plain.pending()]
+    assert state["next_attempt"] == int(now + 60 + 120)
+
+    assert plain.dispatch(now + 180)["sent"] == 1
+    # 已送达的第一部分在重试时没有再发送
+    assert flaky.sent == [f"{key}#1", f"{key}#2"]
+    assert plain.pending() == []
+
+
+def test_event_moves_to_failed_after_max_attempts(plain, flaky):
+    flaky.failures = 10
+    event_id = plain.enqueue("jwc_gg", NOTICES)
+
+    for _ in range(plain.max_attempts):
+        plain.dispatch(force=True)
+
+    assert plain.pending() == []
+    with open(
+        os.path.join(plain.failed_dir, f"{event_id}.json"), encoding="utf-8"
+    ) as f:
+        state = json.load(f)["channels"]["flaky"]
+    assert state["status"] == "failed"
+    assert state["attempts"] == plain.max_attempts
+    assert state["last_error"] == "发送失败"
+    # 失败的事件同样不再入队
+    assert plain.enqueue("jwc_gg", NOTICES) is None
+
+
+def test_restart_resumes_from_checkpoint(tmp_path, plain, flaky):
+    event_id = plain.enqueue("jwc_gg", NOTICES)
+    key = f"{event_id}:flaky"
+    # 上次推送送达第一部分后进程退出，只留下检查点
+    checkpoint = plain._checkpoint_path(event_id)
+    DeliveredKeys([], checkpoint, "flaky").append(f"{key}#1")
+    with open(checkpoint, "a", encoding="utf-8") as f:
+        f.write('{"channel": "fla')
+
+    restarted = Outbox(str(tmp_path), digest=False)
+    (event,) = restarted.pending()
+    assert event["channels"]["flaky"]["delivered"] == [f"{key}#1"]
+
+    assert restarted.dispatch()["sent"] == 1
+    assert flaky.sent == [f"{key}#2"]
+    assert not os.path.exists(checkpoint)
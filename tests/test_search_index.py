@@ -0,0 +1,47 @@
+import pytest
+
+from qfnu_monitor.utils.search_index import NoticeIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    with NoticeIndex(str(tmp_path), str(tmp_path / "index.sqlite3")) as index:
+        with index.conn:
+            index.add(
+                "jwc_gg",
+                [
+                    {
+                        "title": "关于2024年补考安排的通知",
+                        "link": "https://jwc.qfnu.edu.cn/info/1.htm",
+                        "date": "2024-03-01",
+                    },
+                    {
+                        "title": "图书馆开放时间调整",
+                        "link": "https://lib.qfnu.edu.cn/info/2.htm",
+                        "date": "2024-03-02",
+                        "description": "详见 link 页面",
+                    },
+                    {
+                        "title": "jwc qfnu 系统维护",
+                        "link": "https://jwc.qfnu.edu.cn/info/3.htm",
+                        "date": "2024-03-03",
+                    },
+                ],
+            )
+        yield index
+
+
+def titles(rows):
+    return [row["title"] for row in rows]
+
+
+def test_keyword_matches_notice_text(index):
+    assert titles(index.query(keyword="补考")) == ["关于2024年补考安排的通知"]
+    assert titles(index.query(keyword="link")) == ["图书馆开放时间调整"]
+
+
+@pytest.mark.parametrize(
+    "keyword", ["http", "jwc.qfnu", "date", "title", "03-02", ":", '"', "{"]
+)
+def test_keyword_ignores_links_dates_and_json_keys(index, keyword):
+    assert list(index.query(keyword=keyword)) == []
@@ -0,0 +1,47 @@
+import json
+
+from qfnu_monitor.utils.storage import chronological, reorder_notices, write_notices
+
+
+def notice(title, date):
+    return {"title": title, "link": f"https://example.com/{title}", "date": date}
+
+
+def test_chronological_sorts_by_date_and_keeps_ties_stable():
+    notices = [
+        notice("c", "2024-03-02"),
+        notice("b", "2024-03-01"),
+        notice("b2", "2024-03-01"),
+        notice("a", "2024/2/28"),
+    ]
+    assert [n["title"] for n in chronological(notices)] == ["a", "b", "b2", "c"]
+
+
+def test_chronological_keeps_undated_notices_next_to_their_neighbour():
+    notices = [
+        notice("b", "2024-03-02"),
+        notice("undated", ""),
+        notice("a", "2024-03-01"),
+    ]
+    assert [n["title"] for n in chronological(notices)] == ["a", "b", "undated"]
+
+
+def test_reorder_notices_rewrites_legacy_file_once(tmp_path):
+    path = str(tmp_path / "site_notices.json")
+    # 旧版本：首次运行最新的在前，之后追加的一批也是最新的在前
+    legacy = [
+        notice("n3", "2024-03-03"),
+        notice("n2", "2024-03-02"),
+        notice("n1", "2024-03-01"),
+        notice("n5", "2024-03-05"),
+        notice("n4", "2024-03-04"),
+    ]
+    write_notices(path, legacy)
+
+    with open(path, encoding="utf-8") as f:
+        ordered = reorder_notices(path, json.load(f))
+
+    assert [n["title"] for n in ordered] == ["n1", "n2", "n3", "n4", "n5"]
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == ordered
+    assert write_notices(path, ordered) is False
@@ -0,0 +1,122 @@
+import os
+
+import pytest
+
+from qfnu_monitor.utils import subscriptions
+from qfnu_monitor.utils.message import Section
+from qfnu_monitor.utils.subscriptions import AhoCorasick, SubscriptionRouter
+
+
+def section(site, *titles):
+    return Section(None, {}, [{"title": title} for title in titles], site)
+
+
+def titles(routed):
+    return {
+        target: [notice["title"] for s in sections for notice in s.notices]
+        for target, sections in routed.items()
+    }
+
+
+SECTIONS = [
+    section("jwc_gg", "期末考试安排", "学术讲座通知", "成绩复核"),
+    section("zsb_zskx", "2025年招生简章", "招生咨询讲座"),
+]
+
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = AhoCorasick(["考试", "试安排", "安排", "", "讲座"])
+    assert automaton.search("期末考试安排") == {0, 1, 2}
+    assert automaton.search("无关标题") == set()
+
+
+def test_keywords_and_sites():
+    router = SubscriptionRouter(
+        {
+            "onebot": {
+                "1": {"keywords": ["考试", "成绩"]},
+                "2": {"keywords": ["招生"], "sites": ["zsb_zskx"]},
+            }
+        }
+    )
+    routed = router.route("onebot", ["1", "2"], SECTIONS)
+    assert titles(routed) == {
+        "1": ["期末考试安排", "成绩复核"],
+        "2": ["2025年招生简章", "招生咨询讲座"],
+    }
+    # 小节保留站点，只替换公告
+    assert [s.site for s in routed["2"]] == ["zsb_zskx"]
+
+
+def test_keywords_ignore_case():
+    router = SubscriptionRouter({"onebot": {"1": {"keywords": ["CET"]}}})
+    routed = router.route("onebot", ["1"], [section("jwc_gg", "cet-4 报名", "选课")])
+    assert titles(routed) == {"1": ["cet-4 报名"]}
+
+
+def test_exclude_overrides_keywords():
+    router = SubscriptionRouter(
+        {"onebot": {"1": {"keywords": ["招生"], "exclude": ["讲座"]}}}
+    )
+    routed = router.route("onebot", ["1"], SECTIONS)
+    assert titles(routed) == {"1": ["2025年招生简章"]}
+
+
+def test_wildcard_applies_to_unconfigured_targets():
+    router = SubscriptionRouter(
+        {"onebot": {"1": {"keywords": ["考试"]}, "*": {"exclude": ["讲座"]}}}
+    )
+    routed = router.route("onebot", ["1", "2", "3"], SECTIONS)
+    others = ["期末考试安排", "成绩复核", "2025年招生简章"]
+    assert titles(routed) == {"1": ["期末考试安排"], "2": others, "3": others}
+    assert router.targets("onebot") == ["1"]
+
+
+def test_targets_without_rules_receive_everything():
+    router = SubscriptionRouter({"onebot": {"1": {"keywords": ["考试"]}}, "feishu": {}})
+    assert router.route("feishu", ["default"], SECTIONS) == {"default": SECTIONS}
+    routed = router.route("onebot", ["1", "2"], SECTIONS)
+    assert titles(routed)["2"] == titles({"all": SECTIONS})["all"]
+
+
+def test_targets_without_matches_are_dropped():
+    router = SubscriptionRouter({"onebot": {"1": {"keywords": ["停课"]}}})
+    assert router.route("onebot", ["1"], SECTIONS) == {}
+
+
+def test_rules_are_per_channel():
+    router = SubscriptionRouter(
+        {
+            "onebot": {"1": {"keywords": ["考试"]}},
+            "feishu": {"1": {"exclude": ["考试"]}},
+        }
+    )
+    assert titles(router.route("onebot", ["1"], SECTIONS))["1"] == ["期末考试安排"]
+    assert "期末考试安排" not in titles(router.route("feishu", ["1"], SECTIONS))["1"]
+
+
+def test_get_router_reloads_changed_file(tmp_path, monkeypatch):
+    path = tmp_path / "subscriptions.json"
+    monkeypatch.setenv("NOTIFY_SUBSCRIPTIONS", str(path))
+    monkeypatch.setattr(subscriptions, "_router", None)
+    monkeypatch.setattr(subscriptions, "_router_key", None)
+
+    # 文件不存在时不过滤
+    assert subscriptions.get_router().rules == {}
+
+    path.write_text('{"onebot": {"1": {"keywords": ["考试"]}}}', encoding="utf-8")
+    router = subscriptions.get_router()
+    assert router.rule("onebot", "1").keywords == ("考试",)
+    assert subscriptions.get_router() is router
+
+    # 格式错误时继续使用上一次的规则
+    path.write_text('{"onebot": []}', encoding="utf-8")
+    os.utime(path, (1, 1))
+    assert subscriptions.get_router() is router
+
+
+@pytest.mark.parametrize("config", [{"onebot": {"1": None}}, {"onebot": {"1": {}}}])
+def test_empty_rule_matches_everything(config):
+    router = SubscriptionRouter(config)
+    routed = router.route("onebot", ["1"], SECTIONS)
+    assert len(titles(routed)["1"]) == 5